@@ -5,7 +5,9 @@ CREATE TABLE doctores (
     id_doctor INT PRIMARY KEY,
     nombre VARCHAR(100) NOT NULL,
     apellido VARCHAR(100) NOT NULL,
-    telefono VARCHAR(15) NOT NULL
+    telefono VARCHAR(15) NOT NULL,
+    INDEX idx_doctores_apellido_nombre (apellido, nombre),
+    INDEX idx_doctores_nombre_apellido (nombre, apellido)
 );
 
 CREATE TABLE pacientes (
@@ -14,7 +16,10 @@ CREATE TABLE pacientes (
     apellido VARCHAR(100) NOT NULL,
     telefono VARCHAR(15) NOT NULL,
     email VARCHAR(100),
-    fecha_nacimiento DATE
+    fecha_nacimiento DATE,
+    INDEX idx_pacientes_apellido_nombre (apellido, nombre),
+    INDEX idx_pacientes_nombre_apellido (nombre, apellido),
+    FULLTEXT INDEX ft_pacientes_nombre_apellido (nombre, apellido)
 );
 
 CREATE TABLE citas (
@@ -26,9 +31,41 @@ CREATE TABLE citas (
     motivo VARCHAR(200),
     estado ENUM('programada', 'completada', 'cancelada') DEFAULT 'programada',
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    recordatorio_enviado_en DATETIME NULL,
+    actualizado_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     FOREIGN KEY (id_paciente) REFERENCES pacientes(id_paciente),
     FOREIGN KEY (id_doctor) REFERENCES doctores(id_doctor),
-    UNIQUE KEY unique_fecha_hora (fecha, hora)
+    UNIQUE KEY unique_fecha_hora (fecha, hora),
+    UNIQUE KEY unique_doctor_fecha_hora (id_doctor, fecha, hora),
+    INDEX idx_citas_doctor_estado_fecha (id_doctor, estado, fecha),
+    INDEX idx_citas_paciente_estado_fecha (id_paciente, estado, fecha),
+    INDEX idx_citas_estado_fecha (estado, fecha),
+    INDEX idx_citas_paciente_fecha_hora (id_paciente, fecha, hora),
+    INDEX idx_citas_actualizado_en (actualizado_en)
+);
+
+-- Contadores por fecha, doctor y estado (ver app/resumen_citas.py)
+CREATE TABLE resumen_citas (
+    fecha DATE NOT NULL,
+    id_doctor INT NOT NULL,
+    estado ENUM('programada', 'completada', 'cancelada') NOT NULL,
+    total INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (fecha, id_doctor, estado)
+);
+
+-- Estadísticas por doctor, día, hora y estado (ver app/estadisticas.py)
+CREATE TABLE estadisticas_citas (
+    id_doctor INT NOT NULL,
+    fecha DATE NOT NULL,
+    hora TINYINT NOT NULL,
+    estado ENUM('programada', 'completada', 'cancelada') NOT NULL,
+    total INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (id_doctor, fecha, hora, estado),
+    INDEX idx_estadisticas_fecha (fecha)
+);
+
+CREATE TABLE estadisticas_pendientes (
+    fecha DATE PRIMARY KEY
 );
 
 INSERT INTO pacientes (id_paciente, nombre, apellido, telefono, email, fecha_nacimiento) VALUES
@@ -53,3 +90,21 @@ INSERT INTO usuarios (username, password_hash, nombre, es_admin, activo) VALUES
     'scrypt:32768:8:1$PM6tyKuu6Ic9J8dw$9223e18893a3a012ca3deda8db8b04677c3ec46615f0e6b9432096eb01c330a11e7c4a04cea52a63fd7e7d4c416ebaa7a15316784d8a3c8ab0923a643a923ede',
     'Administrador', TRUE, TRUE
 );
+
+CREATE TABLE correos_salientes (
+    id_correo INT AUTO_INCREMENT PRIMARY KEY,
+    destinatario VARCHAR(254) NOT NULL,
+    asunto VARCHAR(200) NOT NULL,
+    html MEDIUMTEXT NOT NULL,
+    remitente VARCHAR(254),
+    estado ENUM('pendiente', 'enviado', 'fallido') DEFAULT 'pendiente',
+    intentos INT NOT NULL DEFAULT 0,
+    proximo_intento DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    lote CHAR(32),
+    reservado_hasta DATETIME,
+    ultimo_error TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    enviado_en DATETIME,
+    INDEX idx_correos_estado_proximo (estado, proximo_intento),
+    INDEX idx_correos_lote (lote)
+);
@@ -0,0 +1,60 @@
+"""
+Actualiza la tabla de estadísticas de citas por doctor.
+
+Marca los días de las citas creadas o modificadas en los últimos minutos
+(incluidos los cambios hechos directamente en la base de datos) y recalcula
+todos los días pendientes. Pensado para cron, con una ventana mayor que el
+intervalo de ejecución:
+
+    python actualizar_estadisticas.py                     # cada 5 minutos, ventana de 15
+    python actualizar_estadisticas.py --reconstruir --desde 2024-01-01 --hasta 2025-12-31
+
+Las citas eliminadas directamente en la base de datos no dejan rastro:
+para esos casos usar --reconstruir sobre el rango afectado.
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+
+from app import create_app, mysql
+from app.estadisticas import marcar_cambios_recientes, marcar_rango, pendientes, refrescar
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Actualiza las estadísticas de citas por doctor')
+    parser.add_argument('--ventana', type=int, default=15,
+                        help='Minutos hacia atrás en los que buscar citas modificadas')
+    parser.add_argument('--reconstruir', action='store_true',
+                        help='Recalcular todos los días entre --desde y --hasta')
+    parser.add_argument('--desde', help='Primer día a reconstruir (YYYY-MM-DD)')
+    parser.add_argument('--hasta', help='Último día a reconstruir, inclusive (YYYY-MM-DD)')
+    args = parser.parse_args()
+
+    if args.reconstruir and not (args.desde and args.hasta):
+        parser.error('--reconstruir requiere --desde y --hasta')
+
+    app = create_app()
+    with app.app_context():
+        conn = mysql.connection
+        cur = conn.cursor()
+        try:
+            if args.reconstruir:
+                desde = datetime.strptime(args.desde, '%Y-%m-%d').date()
+                hasta = datetime.strptime(args.hasta, '%Y-%m-%d').date() + timedelta(days=1)
+                marcados = marcar_rango(cur, desde, hasta)
+            else:
+                marcados = marcar_cambios_recientes(cur, args.ventana)
+            conn.commit()
+            total = pendientes(cur)
+        finally:
+            cur.close()
+
+        inicio = time.perf_counter()
+        recalculados = refrescar(conn)
+
+    print(f"Días marcados: {marcados}; pendientes: {total}; "
+          f"recalculados: {recalculados} en {time.perf_counter() - inicio:.2f} s")
+
+
+if __name__ == '__main__':
+    main()
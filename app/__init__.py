@@ -1,6 +1,5 @@
 from flask import Flask, redirect, url_for
 from flask_login import current_user
-from flask_mysqldb import MySQL
 from app.config import Config
 from flask_login import LoginManager
 from flask_mail import Mail
@@ -8,15 +7,15 @@ from flask_wtf.csrf import CSRFProtect
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from app.security import SecurityHeaders, SecurityConfig
-import os
+from app.db_pool import PooledMySQL
+from app import limites  # noqa: F401  registra el esquema sqlite:// de RATELIMIT_STORAGE_URI
 
-mysql = MySQL()
+mysql = PooledMySQL()
 mail = Mail()
 csrf = CSRFProtect()
 limiter = Limiter(
     key_func=get_remote_address,
-    default_limits=["200 per day", "50 per hour"],
-    storage_uri="memory://"
+    default_limits=["200 per day", "50 per hour"]
 )
 
 def create_app():
@@ -25,31 +24,80 @@ def create_app():
     login_manager = LoginManager()
     app.config.from_object(Config)
     
+    # Compresión de respuestas: se registra primero para que su after_request
+    # se ejecute al final, con la respuesta ya completa
+    from app.compresion import compresion
+    compresion.init_app(app)
+
+    # Consultas, tiempo en MySQL y render por petición: Server-Timing y /metrics.
+    # Su after_request corre justo antes que el de la compresión
+    from app.metricas import metricas
+    metricas.init_app(app)
+
+    # Consultas repetidas (N+1) y lentas, en modo debug o con CONSULTAS_DETECTOR
+    from app.detector_consultas import detector_consultas
+    detector_consultas.init_app(app)
+
+    # Estáticos con huella (manifiesto de construir_estaticos.py) y caché inmutable
+    from app.estaticos import estaticos
+    estaticos.init_app(app)
+    
     # Inicializar Flask-Mail
     mail.init_app(app)
     
     # Inicializar protección CSRF
     csrf.init_app(app)
     
-    # Inicializar rate limiting
+    # Inicializar rate limiting (contadores compartidos según RATELIMIT_STORAGE_URI)
     limiter.init_app(app)
     
     # Aplicar configuración de seguridad
     SecurityConfig.init_app(app)
     SecurityHeaders.init_app(app)
     
-    # Crear directorio de logs si no existe
-    if not os.path.exists('logs'):
-        os.makedirs('logs')
+    # Log de eventos de seguridad (crea logs/ si no existe)
+    from app.security_logger import SecurityLogger
+    SecurityLogger.init_app(app)
 
     # Configuración de MySQL
     app.config['MYSQL_HOST'] = Config.MYSQL_HOST
     app.config['MYSQL_USER'] = Config.MYSQL_USER
     app.config['MYSQL_PASSWORD'] = Config.MYSQL_PASSWORD
     app.config['MYSQL_DB'] = Config.MYSQL_DB
+
+    # Configuración del pool de conexiones
+    app.config['MYSQL_POOL_MIN_SIZE'] = Config.MYSQL_POOL_MIN_SIZE
+    app.config['MYSQL_POOL_MAX_SIZE'] = Config.MYSQL_POOL_MAX_SIZE
+    app.config['MYSQL_POOL_MAX_LIFETIME'] = Config.MYSQL_POOL_MAX_LIFETIME
+    app.config['MYSQL_POOL_TIMEOUT'] = Config.MYSQL_POOL_TIMEOUT
         
     mysql.init_app(app)
 
+    # Índice de ocupación de horarios (por worker)
+    from app.disponibilidad import indice_ocupacion
+    indice_ocupacion.init_app(app)
+
+    # Caché de las listas de pacientes y doctores, y de usuarios autenticados
+    from app.cache import cache_listas, cache_usuarios
+    cache_listas.init_app(app)
+    cache_usuarios.init_app(app)
+
+    # Sellos de versión para respuestas condicionales (ETag / 304)
+    from app.versiones import versiones
+    versiones.init_app(app)
+
+    # Hash y verificación de contraseñas fuera del hilo de la petición
+    from app.contrasenas import pool_hash
+    pool_hash.init_app(app)
+
+    # Cola de exportaciones de histórico en segundo plano
+    from app.exportaciones import cola_exportaciones
+    cola_exportaciones.init_app(app)
+
+    # Bandeja de salida de correos (envío en segundo plano)
+    from app.correos import bandeja_salida
+    bandeja_salida.init_app(app)
+
     # Configurar Flask-Login
     login_manager.init_app(app)
     login_manager.login_view = 'auth.login'
@@ -59,7 +107,7 @@ def create_app():
     @login_manager.user_loader
     def load_user(user_id):
         from app.models import Usuario
-        return Usuario.get_by_id(user_id)    
+        return Usuario.get_by_id_cacheado(user_id)
     
     # Registrar blueprints
     from app.routes.citas import citas_bp
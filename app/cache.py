@@ -0,0 +1,260 @@
+"""
+Caché de las listas de pacientes y doctores para los selectores.
+
+Dos niveles: los valores ya leídos en la petición se guardan en `g` (una
+re-renderización por error de validación no vuelve a consultar) y entre
+peticiones se usa el backend configurado en CACHE_BACKEND:
+
+- 'memoria': LRU en memoria de cada worker. Una invalidación solo limpia el
+  worker que hizo el cambio; los demás la ven al vencer CACHE_TTL.
+- 'sqlite': archivo SQLite local (modo WAL) compartido por todos los workers
+  de Gunicorn de la máquina, así que las invalidaciones son inmediatas.
+
+Los modelos invalidan las claves al crear, editar o eliminar registros.
+
+Los sellos de versión (ETag de app/versiones.py) viven siempre en
+`cache_listas.sellos`, un archivo SQLite compartido por todos los workers
+(SELLOS_RUTA), sea cual sea CACHE_BACKEND: un sello por worker serviría 304
+con datos viejos cuando el cambio se hizo en otro worker.
+
+`cache_usuarios` guarda por worker los usuarios que carga Flask-Login. Cada
+entrada lleva el sello de versión del usuario, que vive en el almacén de
+sellos compartido: cambiar permisos, estado o contraseña genera un sello
+nuevo y la entrada deja de servirse en todos los workers a la vez, con
+cualquier CACHE_BACKEND.
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from flask import g, has_request_context
+
+# Claves de las listas cacheadas
+PACIENTES_POR_NOMBRE = 'pacientes:nombre'
+PACIENTES_POR_APELLIDO = 'pacientes:apellido'
+DOCTORES_POR_NOMBRE = 'doctores:nombre'
+DOCTORES_POR_APELLIDO = 'doctores:apellido'
+
+CLAVES_PACIENTES = (PACIENTES_POR_NOMBRE, PACIENTES_POR_APELLIDO)
+CLAVES_DOCTORES = (DOCTORES_POR_NOMBRE, DOCTORES_POR_APELLIDO)
+
+# Distingue "no está en caché" de un valor cacheado vacío
+FALTA = object()
+
+
+class CacheLRU:
+    """LRU en memoria con vencimiento, seguro entre hilos"""
+
+    def __init__(self, max_entradas=256):
+        self.max_entradas = max_entradas
+        self._datos = OrderedDict()  # clave -> (expira, valor)
+        self._lock = threading.Lock()
+
+    def get(self, clave):
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                return FALTA
+            if entrada[0] < time.monotonic():
+                del self._datos[clave]
+                return FALTA
+            self._datos.move_to_end(clave)
+            return entrada[1]
+
+    def set(self, clave, valor, ttl):
+        with self._lock:
+            self._datos[clave] = (time.monotonic() + ttl, valor)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.max_entradas:
+                self._datos.popitem(last=False)
+
+    def delete(self, *claves):
+        with self._lock:
+            for clave in claves:
+                self._datos.pop(clave, None)
+
+    def clear(self):
+        with self._lock:
+            self._datos.clear()
+
+
+class CacheSQLite:
+    """Caché en un archivo SQLite compartido entre procesos de la misma máquina"""
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self._local = threading.local()
+        directorio = os.path.dirname(os.path.abspath(ruta))
+        os.makedirs(directorio, exist_ok=True)
+
+    def _conexion(self):
+        # Una conexión por hilo y por proceso (no se comparten tras el fork)
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.ruta, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS cache (
+                    clave TEXT PRIMARY KEY,
+                    valor BLOB NOT NULL,
+                    expira REAL NOT NULL
+                )
+            ''')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, clave):
+        fila = self._conexion().execute(
+            'SELECT valor, expira FROM cache WHERE clave = ?', (clave,)
+        ).fetchone()
+        if fila is None or fila[1] < time.time():
+            return FALTA
+        return pickle.loads(fila[0])
+
+    def set(self, clave, valor, ttl):
+        self._conexion().execute(
+            'INSERT OR REPLACE INTO cache (clave, valor, expira) VALUES (?, ?, ?)',
+            (clave, pickle.dumps(valor, pickle.HIGHEST_PROTOCOL), time.time() + ttl)
+        )
+
+    def delete(self, *claves):
+        self._conexion().executemany('DELETE FROM cache WHERE clave = ?', [(c,) for c in claves])
+
+    def clear(self):
+        self._conexion().execute('DELETE FROM cache')
+
+
+class CacheListas:
+    """Punto de acceso a la caché: memo por petición + backend configurable"""
+
+    def __init__(self):
+        self.ttl = 300
+        self.backend = CacheLRU()
+        self.sellos = None  # CacheSQLite compartido; se abre en init_app
+
+    def init_app(self, app):
+        app.config.setdefault('CACHE_BACKEND', 'memoria')
+        app.config.setdefault('CACHE_TTL', 300)
+        app.config.setdefault('CACHE_MAX_ENTRADAS', 256)
+        app.config.setdefault('CACHE_RUTA', os.path.join('cache', 'listas.sqlite3'))
+        app.config.setdefault('SELLOS_RUTA', os.path.join('cache', 'sellos.sqlite3'))
+
+        self.ttl = float(app.config['CACHE_TTL'])
+        tipo = app.config['CACHE_BACKEND']
+        if tipo == 'memoria':
+            self.backend = CacheLRU(int(app.config['CACHE_MAX_ENTRADAS']))
+        elif tipo == 'sqlite':
+            self.backend = CacheSQLite(app.config['CACHE_RUTA'])
+        else:
+            raise ValueError(f"CACHE_BACKEND desconocido: {tipo} (usar 'memoria' o 'sqlite')")
+        self.sellos = CacheSQLite(app.config['SELLOS_RUTA'])
+
+    def _memo(self):
+        if not has_request_context():
+            return None
+        if '_cache_listas' not in g:
+            g._cache_listas = {}
+        return g._cache_listas
+
+    def obtener(self, clave, cargar):
+        """
+        Devuelve el valor cacheado de `clave` o lo calcula con `cargar()`.
+
+        Si `cargar` lanza una excepción no se cachea nada.
+        """
+        memo = self._memo()
+        if memo is not None and clave in memo:
+            return memo[clave]
+
+        valor = self.backend.get(clave)
+        if valor is FALTA:
+            valor = cargar()
+            self.backend.set(clave, valor, self.ttl)
+
+        if memo is not None:
+            memo[clave] = valor
+        return valor
+
+    def invalidar(self, *claves):
+        """Elimina las claves del backend y de la petición actual"""
+        self.backend.delete(*claves)
+        memo = self._memo()
+        if memo is not None:
+            for clave in claves:
+                memo.pop(clave, None)
+
+
+cache_listas = CacheListas()
+
+
+class CacheUsuarios:
+    """Usuarios autenticados por worker, validados contra su sello de versión"""
+
+    def __init__(self):
+        self.ttl = 30
+        self.usuarios = CacheLRU(1024)
+        self._lock = threading.Lock()
+        self._stats = {'aciertos': 0, 'fallos': 0, 'invalidaciones': 0}
+
+    def init_app(self, app):
+        app.config.setdefault('USUARIOS_CACHE_TTL', 30)
+        app.config.setdefault('USUARIOS_CACHE_MAX_ENTRADAS', 1024)
+        self.ttl = float(app.config['USUARIOS_CACHE_TTL'])
+        self.usuarios = CacheLRU(int(app.config['USUARIOS_CACHE_MAX_ENTRADAS']))
+
+    @staticmethod
+    def _clave_version(user_id):
+        return f'usuario:{user_id}:version'
+
+    def _version(self, user_id):
+        version = cache_listas.sellos.get(self._clave_version(user_id))
+        return None if version is FALTA else version
+
+    def _contar(self, contador):
+        with self._lock:
+            self._stats[contador] += 1
+
+    def obtener(self, user_id, cargar):
+        """
+        Usuario cacheado si su sello de versión no cambió; si no, lo carga con `cargar()`.
+
+        No se cachean los usuarios inexistentes (None).
+        """
+        version = self._version(user_id)
+        entrada = self.usuarios.get(user_id)
+        if entrada is not FALTA and entrada[0] == version:
+            self._contar('aciertos')
+            return entrada[1]
+
+        self._contar('fallos')
+        usuario = cargar()
+        if usuario is None:
+            self.usuarios.delete(user_id)
+        else:
+            self.usuarios.set(user_id, (version, usuario), self.ttl)
+        return usuario
+
+    def invalidar(self, user_id):
+        """Genera un sello de versión nuevo para el usuario"""
+        # El sello debe sobrevivir a las entradas cacheadas en cualquier worker
+        cache_listas.sellos.set(self._clave_version(user_id), uuid.uuid4().hex, max(self.ttl * 2, 3600))
+        self.usuarios.delete(user_id)
+        self._contar('invalidaciones')
+
+    def estadisticas(self):
+        """Contadores de aciertos y fallos del worker actual"""
+        with self._lock:
+            stats = dict(self._stats)
+        consultas = stats['aciertos'] + stats['fallos']
+        stats['tasa_aciertos'] = round(stats['aciertos'] / consultas, 3) if consultas else None
+        stats['pid'] = os.getpid()
+        return stats
+
+
+cache_usuarios = CacheUsuarios()
@@ -0,0 +1,195 @@
+"""
+Compresión de respuestas (gzip y, si está instalado el paquete Brotli, br).
+
+Se aplica en un after_request sobre las respuestas cuyo tipo está en
+COMPRESION_TIPOS (HTML, JSON, CSS, JS, CSV...). Las respuestas normales se
+comprimen completas si superan COMPRESION_MINIMO bytes; las de streaming
+(generadores y send_file) se comprimen bloque a bloque mientras se envían,
+sin cargarlas en memoria. Formatos ya comprimidos como xlsx o png quedan
+fuera de la lista y se envían tal cual.
+
+Waitress y Gunicorn no comprimen por sí mismos, así que sin esta capa todo
+sale sin comprimir salvo que haya un proxy delante que lo haga (en ese caso
+conviene COMPRESION_HABILITADA=false para no comprimir dos veces).
+"""
+import os
+import threading
+import time
+import zlib
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # opcional: sin Brotli solo se ofrece gzip
+    brotli = None
+
+TIPOS_POR_DEFECTO = (
+    'text/html', 'text/plain', 'text/css', 'text/csv', 'text/javascript',
+    'application/javascript', 'application/json', 'image/svg+xml',
+)
+
+
+class _Gzip:
+    def __init__(self, nivel):
+        # wbits=31: formato gzip (cabecera y CRC) en lugar de zlib
+        self._obj = zlib.compressobj(nivel, zlib.DEFLATED, 31)
+
+    def comprimir(self, datos):
+        return self._obj.compress(datos)
+
+    def terminar(self):
+        return self._obj.flush()
+
+
+class _Brotli:
+    def __init__(self, nivel):
+        self._obj = brotli.Compressor(quality=nivel)
+
+    def comprimir(self, datos):
+        return self._obj.process(datos)
+
+    def terminar(self):
+        return self._obj.finish()
+
+
+class Compresion:
+    """Negociación de Accept-Encoding y compresión de respuestas"""
+
+    def __init__(self):
+        self.habilitada = True
+        self.minimo = 500
+        self.nivel_gzip = 6
+        self.nivel_brotli = 4
+        self.tipos = frozenset(TIPOS_POR_DEFECTO)
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def init_app(self, app):
+        app.config.setdefault('COMPRESION_HABILITADA', True)
+        app.config.setdefault('COMPRESION_MINIMO', 500)
+        app.config.setdefault('COMPRESION_NIVEL_GZIP', 6)
+        app.config.setdefault('COMPRESION_NIVEL_BROTLI', 4)
+        app.config.setdefault('COMPRESION_TIPOS', TIPOS_POR_DEFECTO)
+        self.habilitada = bool(app.config['COMPRESION_HABILITADA'])
+        self.minimo = int(app.config['COMPRESION_MINIMO'])
+        self.nivel_gzip = int(app.config['COMPRESION_NIVEL_GZIP'])
+        self.nivel_brotli = int(app.config['COMPRESION_NIVEL_BROTLI'])
+        self.tipos = frozenset(app.config['COMPRESION_TIPOS'])
+
+        if self.habilitada:
+            app.after_request(self.procesar)
+
+    def codificacion(self):
+        """'br', 'gzip' o None según el Accept-Encoding de la petición"""
+        aceptadas = request.accept_encodings
+        if brotli is not None and aceptadas['br'] > 0:
+            return 'br'
+        if aceptadas['gzip'] > 0:
+            return 'gzip'
+        return None
+
+    def _codificador(self, codificacion):
+        if codificacion == 'br':
+            return _Brotli(self.nivel_brotli)
+        return _Gzip(self.nivel_gzip)
+
+    def procesar(self, response):
+        """after_request: comprime la respuesta si corresponde"""
+        if response.mimetype not in self.tipos:
+            return response
+        response.vary.add('Accept-Encoding')
+
+        codificacion = self.codificacion()
+        if codificacion is None or request.method == 'HEAD':
+            return response
+        if response.status_code == 304:
+            # Mismo ETag (débil) que tendría la respuesta comprimida
+            self._debilitar_etag(response)
+            return response
+        if (response.status_code < 200 or response.status_code in (204, 206)
+                or 'Content-Encoding' in response.headers):
+            return response
+
+        if response.is_streamed or response.direct_passthrough:
+            largo = response.content_length
+            if largo is not None and largo < self.minimo:
+                return response
+            self._comprimir_flujo(response, codificacion)
+        else:
+            datos = response.get_data()
+            if len(datos) < self.minimo:
+                return response
+            inicio = time.perf_counter()
+            codificador = self._codificador(codificacion)
+            comprimidos = codificador.comprimir(datos) + codificador.terminar()
+            self._contar(codificacion, len(datos), len(comprimidos), time.perf_counter() - inicio)
+            response.set_data(comprimidos)
+
+        response.headers['Content-Encoding'] = codificacion
+        # Los rangos de bytes se refieren al cuerpo sin comprimir
+        response.headers.pop('Accept-Ranges', None)
+        self._debilitar_etag(response)
+        return response
+
+    def _comprimir_flujo(self, response, codificacion):
+        """Reemplaza el iterable de la respuesta por uno que comprime cada bloque"""
+        original = response.response
+        codificador = self._codificador(codificacion)
+
+        def bloques():
+            leidos = escritos = 0
+            duracion = 0.0
+            for bloque in original:
+                if isinstance(bloque, str):
+                    bloque = bloque.encode('utf-8')
+                inicio = time.perf_counter()
+                salida = codificador.comprimir(bloque)
+                duracion += time.perf_counter() - inicio
+                leidos += len(bloque)
+                escritos += len(salida)
+                if salida:
+                    yield salida
+            salida = codificador.terminar()
+            escritos += len(salida)
+            self._contar(codificacion, leidos, escritos, duracion)
+            yield salida
+
+        if hasattr(original, 'close'):
+            response.call_on_close(original.close)
+        response.response = bloques()
+        response.direct_passthrough = False
+        response.headers.pop('Content-Length', None)
+
+    @staticmethod
+    def _debilitar_etag(response):
+        etag, debil = response.get_etag()
+        if etag and not debil:
+            response.set_etag(etag, weak=True)
+
+    def _contar(self, codificacion, originales, comprimidos, duracion):
+        with self._lock:
+            stats = self._stats.setdefault(
+                codificacion, {'respuestas': 0, 'bytes_originales': 0, 'bytes_enviados': 0, 'segundos': 0.0})
+            stats['respuestas'] += 1
+            stats['bytes_originales'] += originales
+            stats['bytes_enviados'] += comprimidos
+            stats['segundos'] += duracion
+
+    def estadisticas(self):
+        """Bytes ahorrados y tiempo de compresión por codificación en el worker actual"""
+        with self._lock:
+            codificaciones = {nombre: dict(stats) for nombre, stats in self._stats.items()}
+        for stats in codificaciones.values():
+            stats['ahorro'] = (round(1 - stats['bytes_enviados'] / stats['bytes_originales'], 3)
+                               if stats['bytes_originales'] else None)
+            stats['ms_por_respuesta'] = round(stats.pop('segundos') * 1000 / stats['respuestas'], 3)
+        return {
+            'pid': os.getpid(),
+            'habilitada': self.habilitada,
+            'brotli': brotli is not None,
+            'codificaciones': codificaciones,
+        }
+
+
+compresion = Compresion()
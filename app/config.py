@@ -10,11 +10,105 @@ class Config:
     MYSQL_PASSWORD = os.getenv('MYSQL_PASSWORD') or ''
     MYSQL_DB = os.getenv('MYSQL_DB') or 'consultorio_medico'
 
+    # Pool de conexiones MySQL (por proceso/worker)
+    MYSQL_POOL_MIN_SIZE = int(os.getenv('MYSQL_POOL_MIN_SIZE') or 1)
+    MYSQL_POOL_MAX_SIZE = int(os.getenv('MYSQL_POOL_MAX_SIZE') or 10)
+    MYSQL_POOL_MAX_LIFETIME = int(os.getenv('MYSQL_POOL_MAX_LIFETIME') or 1800)  # segundos
+    MYSQL_POOL_TIMEOUT = float(os.getenv('MYSQL_POOL_TIMEOUT') or 10)  # segundos de espera
+
+    # Agenda: horario de atención y vigencia del índice de ocupación
+    CITAS_HORA_INICIO = os.getenv('CITAS_HORA_INICIO') or '08:00'
+    CITAS_HORA_FIN = os.getenv('CITAS_HORA_FIN') or '18:00'
+    CITAS_DURACION_MINUTOS = int(os.getenv('CITAS_DURACION_MINUTOS') or 30)
+    DISPONIBILIDAD_TTL = float(os.getenv('DISPONIBILIDAD_TTL') or 5)  # segundos
+
+    # Estadísticas por doctor (/historico/estadisticas)
+    ESTADISTICAS_DIAS_LABORABLES = tuple(
+        int(d) for d in (os.getenv('ESTADISTICAS_DIAS_LABORABLES') or '0,1,2,3,4').split(',')
+    )  # 0 = lunes
+    # Días pendientes que recalcula cada consulta (0 = solo actualizar_estadisticas.py)
+    ESTADISTICAS_REFRESCO_EN_LINEA = int(os.getenv('ESTADISTICAS_REFRESCO_EN_LINEA') or 31)
+    ESTADISTICAS_RANGO_MAXIMO_DIAS = int(os.getenv('ESTADISTICAS_RANGO_MAXIMO_DIAS') or 731)
+
+    # Filas por página de los listados de pacientes y doctores (10, 25, 50 o 100)
+    LISTADO_POR_PAGINA = int(os.getenv('LISTADO_POR_PAGINA') or 25)
+
+    # Caché de listas de pacientes y doctores: 'memoria' (LRU por worker)
+    # o 'sqlite' (archivo local compartido por todos los workers)
+    CACHE_BACKEND = os.getenv('CACHE_BACKEND') or 'memoria'
+    CACHE_TTL = int(os.getenv('CACHE_TTL') or 300)  # segundos
+    CACHE_MAX_ENTRADAS = int(os.getenv('CACHE_MAX_ENTRADAS') or 256)
+    CACHE_RUTA = os.getenv('CACHE_RUTA') or os.path.join('cache', 'listas.sqlite3')
+
+    # Caché de usuarios autenticados (user_loader de Flask-Login)
+    USUARIOS_CACHE_TTL = int(os.getenv('USUARIOS_CACHE_TTL') or 30)  # segundos
+
+    # Sellos de versión de las respuestas condicionales (ETag / 304), en un
+    # archivo SQLite compartido por todos los workers con cualquier CACHE_BACKEND
+    SELLOS_RUTA = os.getenv('SELLOS_RUTA') or os.path.join('cache', 'sellos.sqlite3')
+    VERSIONES_TTL = int(os.getenv('VERSIONES_TTL') or 300)  # segundos
+
+    # Compresión de respuestas (gzip y br si está instalado Brotli)
+    COMPRESION_HABILITADA = (os.getenv('COMPRESION_HABILITADA') or 'true').lower() == 'true'
+    COMPRESION_MINIMO = int(os.getenv('COMPRESION_MINIMO') or 500)  # bytes
+    COMPRESION_NIVEL_GZIP = int(os.getenv('COMPRESION_NIVEL_GZIP') or 6)  # 1 a 9
+    COMPRESION_NIVEL_BROTLI = int(os.getenv('COMPRESION_NIVEL_BROTLI') or 4)  # 0 a 11
+    COMPRESION_TIPOS = tuple((os.getenv('COMPRESION_TIPOS') or
+                              'text/html,text/plain,text/css,text/csv,text/javascript,'
+                              'application/javascript,application/json,image/svg+xml').split(','))
+
+    # Métricas por petición: encabezado Server-Timing y /metrics (Prometheus)
+    METRICAS_HABILITADAS = (os.getenv('METRICAS_HABILITADAS') or 'true').lower() == 'true'
+    METRICAS_DIR = os.getenv('METRICAS_DIR') or 'cache/metricas'  # un archivo por worker
+    METRICAS_INTERVALO = float(os.getenv('METRICAS_INTERVALO') or 5)  # segundos entre volcados
+    METRICAS_TOKEN = os.getenv('METRICAS_TOKEN') or ''  # Bearer para Prometheus; vacío = solo admins
+    METRICAS_SERVER_TIMING = (os.getenv('METRICAS_SERVER_TIMING') or 'true').lower() == 'true'
+
+    # Detector de consultas repetidas y lentas (siempre activo en modo debug)
+    CONSULTAS_DETECTOR = (os.getenv('CONSULTAS_DETECTOR') or 'false').lower() == 'true'
+    CONSULTAS_REPETIDAS = int(os.getenv('CONSULTAS_REPETIDAS') or 2)  # misma forma N veces por petición
+    CONSULTAS_LENTAS_MS = float(os.getenv('CONSULTAS_LENTAS_MS') or 100)
+    CONSULTAS_REPORTES_DIR = os.getenv('CONSULTAS_REPORTES_DIR') or 'logs/consultas'
+
+    # Límites de peticiones (Flask-Limiter), compartidos por los workers de la máquina
+    # (RATELIMIT_ENABLED=false solo para pruebas de carga, ver benchmark_carga.py)
+    RATELIMIT_ENABLED = (os.getenv('RATELIMIT_ENABLED') or 'true').lower() == 'true'
+    RATELIMIT_STORAGE_URI = os.getenv('RATELIMIT_STORAGE_URI') or 'sqlite:///cache/limites.sqlite3'
+    RATELIMIT_STRATEGY = os.getenv('RATELIMIT_STRATEGY') or 'moving-window'
+    RATELIMIT_STORAGE_OPTIONS = {
+        'barrido': int(os.getenv('RATELIMIT_BARRIDO') or 60)  # segundos entre borrados de vencidos
+    }
+
+    # Hash de contraseñas (pool de procesos por worker web)
+    PASSWORD_HASH_METODO = os.getenv('PASSWORD_HASH_METODO') or 'scrypt:32768:8:1'  # formato de werkzeug
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS') or 1)  # procesos por worker web
+    PASSWORD_HASH_PENDIENTES = int(os.getenv('PASSWORD_HASH_PENDIENTES') or 0)  # 0 = 4 por proceso
+    PASSWORD_HASH_TIMEOUT = float(os.getenv('PASSWORD_HASH_TIMEOUT') or 10)  # segundos
+
+    # Exportaciones de histórico en segundo plano
+    EXPORT_DIR = os.getenv('EXPORT_DIR') or 'exports'
+    EXPORT_WORKERS = int(os.getenv('EXPORT_WORKERS') or 2)  # procesos por worker web
+    EXPORT_TTL = int(os.getenv('EXPORT_TTL') or 3600)  # segundos que se conservan los archivos
+    EXPORT_TIMEOUT = int(os.getenv('EXPORT_TIMEOUT') or 900)  # segundos antes de dar por fallido un trabajo
 
       # Configuración del servidor de correo
-    MAIL_SERVER = 'smtp.gmail.com'
-    MAIL_PORT = 587
-    MAIL_USE_TLS = True
+    MAIL_SERVER = os.getenv('MAIL_SERVER') or 'smtp.gmail.com'
+    MAIL_PORT = int(os.getenv('MAIL_PORT') or 587)
+    MAIL_USE_TLS = (os.getenv('MAIL_USE_TLS') or 'true').lower() == 'true'
     MAIL_USERNAME = os.environ.get('MAIL_USERNAME')
     MAIL_PASSWORD = os.environ.get('MAIL_PASSWORD')
-    MAIL_DEFAULT_SENDER = os.environ.get('MAIL_DEFAULT_SENDER')
\ No newline at end of file
+    MAIL_DEFAULT_SENDER = os.environ.get('MAIL_DEFAULT_SENDER')
+
+    # Bandeja de salida: el hilo enviador corre en cada worker salvo que se
+    # desactive para usar el script enviar_correos.py como proceso aparte
+    MAIL_OUTBOX_HILO = (os.getenv('MAIL_OUTBOX_HILO') or 'true').lower() == 'true'
+    MAIL_OUTBOX_LOTE = int(os.getenv('MAIL_OUTBOX_LOTE') or 50)  # correos por conexión SMTP
+    MAIL_OUTBOX_INTERVALO = float(os.getenv('MAIL_OUTBOX_INTERVALO') or 5)  # segundos entre rondas
+    MAIL_OUTBOX_MAX_INTENTOS = int(os.getenv('MAIL_OUTBOX_MAX_INTENTOS') or 5)
+    MAIL_OUTBOX_BACKOFF = int(os.getenv('MAIL_OUTBOX_BACKOFF') or 60)  # segundos, se duplica por intento
+    # Segundos que un lote queda reservado: debe alcanzar para enviar MAIL_OUTBOX_LOTE correos
+    MAIL_OUTBOX_RESERVA = int(os.getenv('MAIL_OUTBOX_RESERVA') or 300)
+
+    # Recordatorios masivos (enviar_recordatorios.py)
+    RECORDATORIOS_CONEXIONES = int(os.getenv('RECORDATORIOS_CONEXIONES') or 4)  # conexiones SMTP en paralelo
+    RECORDATORIOS_POR_SEGUNDO = float(os.getenv('RECORDATORIOS_POR_SEGUNDO') or 10)  # tope global, 0 = sin tope
@@ -0,0 +1,110 @@
+"""
+Hash y verificación de contraseñas en un pool de procesos acotado.
+
+scrypt/pbkdf2 son intensivos en CPU a propósito: ejecutarlos en el hilo de la
+petición bloquea los hilos de Waitress/Gunicorn durante una ráfaga de
+inicios de sesión. Aquí se ejecutan en PASSWORD_HASH_WORKERS procesos por
+worker web, con un máximo de trabajos en espera; si el pool está saturado se
+lanza PoolHashOcupadoError en vez de encolar sin límite.
+
+El costo se configura con PASSWORD_HASH_METODO (formato de werkzeug, por
+ejemplo 'scrypt:32768:8:1' o 'pbkdf2:sha256:600000'). Los hashes guardados
+con otro método se regeneran al iniciar sesión (ver necesita_rehash).
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FuturesTimeoutError
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class PoolHashOcupadoError(Exception):
+    """El pool de hash está saturado o no respondió a tiempo"""
+
+
+class PoolHash:
+    """Pool de procesos para generar y verificar hashes de contraseñas"""
+
+    def __init__(self):
+        self.metodo = 'scrypt:32768:8:1'
+        self.max_procesos = 1
+        self.max_pendientes = 4
+        self.timeout = 10
+        self._executor = None
+        self._pid = None
+        self._cupos = None
+        self._lock = threading.Lock()
+        self._metodo_normalizado = None
+        self._hash_ficticio = None
+
+    def init_app(self, app):
+        app.config.setdefault('PASSWORD_HASH_METODO', 'scrypt:32768:8:1')
+        app.config.setdefault('PASSWORD_HASH_WORKERS', 1)
+        app.config.setdefault('PASSWORD_HASH_PENDIENTES', 0)  # 0 = 4 por proceso
+        app.config.setdefault('PASSWORD_HASH_TIMEOUT', 10)
+
+        self.metodo = app.config['PASSWORD_HASH_METODO']
+        self.max_procesos = max(1, int(app.config['PASSWORD_HASH_WORKERS']))
+        self.max_pendientes = int(app.config['PASSWORD_HASH_PENDIENTES']) or self.max_procesos * 4
+        self.timeout = float(app.config['PASSWORD_HASH_TIMEOUT'])
+        self._metodo_normalizado = None
+        self._hash_ficticio = None
+
+    def _get_executor(self):
+        # Un pool por proceso: no se hereda a través del fork de Gunicorn
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_procesos,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+                self._cupos = threading.BoundedSemaphore(self.max_pendientes)
+                self._pid = os.getpid()
+            return self._executor, self._cupos
+
+    def _ejecutar(self, funcion, *args):
+        executor, cupos = self._get_executor()
+        if not cupos.acquire(timeout=self.timeout):
+            raise PoolHashOcupadoError('Demasiadas verificaciones de contraseña en espera')
+        try:
+            futuro = executor.submit(funcion, *args)
+        except BaseException:
+            cupos.release()
+            raise
+        # El cupo se libera cuando el trabajo termina o se cancela, no cuando
+        # esta petición deja de esperarlo: tras un timeout sigue ocupando el pool
+        futuro.add_done_callback(lambda _: cupos.release())
+        try:
+            return futuro.result(timeout=self.timeout)
+        except FuturesTimeoutError:
+            futuro.cancel()  # si todavía no empezó, no llega a ejecutarse
+            raise PoolHashOcupadoError('La verificación de contraseña no respondió a tiempo')
+
+    def generar(self, password):
+        """Hash de la contraseña con el método configurado"""
+        return self._ejecutar(generate_password_hash, password, self.metodo)
+
+    def verificar(self, password_hash, password):
+        """
+        True si la contraseña coincide con el hash.
+
+        Con password_hash None (usuario inexistente) se verifica contra un
+        hash ficticio para que la respuesta tarde lo mismo.
+        """
+        if password_hash is None:
+            if self._hash_ficticio is None:
+                self._hash_ficticio = self.generar(os.urandom(16).hex())
+            self._ejecutar(check_password_hash, self._hash_ficticio, password)
+            return False
+        return self._ejecutar(check_password_hash, password_hash, password)
+
+    def necesita_rehash(self, password_hash):
+        """True si el hash se generó con un método o costo distinto al configurado"""
+        if self._metodo_normalizado is None:
+            # werkzeug completa los parámetros por defecto ('scrypt' -> 'scrypt:32768:8:1')
+            self._metodo_normalizado = generate_password_hash('', self.metodo).split('$', 1)[0]
+        return password_hash.split('$', 1)[0] != self._metodo_normalizado
+
+
+pool_hash = PoolHash()
@@ -0,0 +1,238 @@
+"""
+Bandeja de salida de correos.
+
+Las rutas no hablan con el servidor SMTP: `encolar` guarda el mensaje en la
+tabla `correos_salientes` y un hilo en segundo plano los envía por lotes
+sobre una sola conexión SMTP. Los fallos se reintentan con espera
+exponencial y, agotados los intentos, el correo queda en estado 'fallido'.
+Cada lote se reserva con un UPDATE atómico, así que varios workers (o el
+script enviar_correos.py) pueden procesar la tabla sin duplicar envíos. La
+reserva dura MAIL_OUTBOX_RESERVA segundos; el resultado de cada correo solo
+se registra si la fila sigue reservada por el mismo lote, así que un lote
+que tardó más que la reserva no pisa el estado que dejó otro enviador.
+"""
+import logging
+import os
+import threading
+import uuid
+
+from flask import current_app
+from flask_mail import Message
+
+logger = logging.getLogger(__name__)
+
+ESTADO_PENDIENTE = 'pendiente'
+ESTADO_ENVIADO = 'enviado'
+ESTADO_FALLIDO = 'fallido'
+
+
+class BandejaSalida:
+    """Cola persistente de correos y su enviador en segundo plano"""
+
+    def __init__(self):
+        self._hilo = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._despertar = threading.Event()
+
+    def init_app(self, app):
+        app.config.setdefault('MAIL_OUTBOX_HILO', True)
+        app.config.setdefault('MAIL_OUTBOX_LOTE', 50)
+        app.config.setdefault('MAIL_OUTBOX_INTERVALO', 5)
+        app.config.setdefault('MAIL_OUTBOX_MAX_INTENTOS', 5)
+        app.config.setdefault('MAIL_OUTBOX_BACKOFF', 60)
+        app.config.setdefault('MAIL_OUTBOX_RESERVA', 300)
+
+        if app.config['MAIL_OUTBOX_HILO']:
+            # Arranca el hilo en el primer request de cada worker, así también
+            # se envían los correos que quedaron pendientes antes de reiniciar
+            @app.before_request
+            def _iniciar_enviador():
+                self.iniciar(current_app._get_current_object())
+
+    def encolar(self, destinatario, asunto, html, remitente=None):
+        """
+        Guarda un correo para enviarlo en segundo plano.
+
+        Returns:
+            id_correo del mensaje encolado
+        """
+        from app import mysql
+
+        cur = mysql.connection.cursor()
+        try:
+            cur.execute('''
+                INSERT INTO correos_salientes (destinatario, asunto, html, remitente)
+                VALUES (%s, %s, %s, %s)
+            ''', (destinatario, asunto, html, remitente))
+            mysql.connection.commit()
+            id_correo = cur.lastrowid
+        finally:
+            cur.close()
+
+        if current_app.config['MAIL_OUTBOX_HILO']:
+            self.iniciar(current_app._get_current_object())
+            self._despertar.set()
+        return id_correo
+
+    def iniciar(self, app):
+        """Inicia el hilo enviador de este proceso si aún no está corriendo"""
+        if self._pid == os.getpid() and self._hilo is not None and self._hilo.is_alive():
+            return
+        with self._lock:
+            # Los hilos no sobreviven al fork de Gunicorn: uno por proceso
+            if self._pid == os.getpid() and self._hilo is not None and self._hilo.is_alive():
+                return
+            self._despertar = threading.Event()
+            self._hilo = threading.Thread(
+                target=self.ejecutar, args=(app,), name='bandeja-salida', daemon=True
+            )
+            self._pid = os.getpid()
+            self._hilo.start()
+
+    def ejecutar(self, app, una_vez=False):
+        """
+        Bucle del enviador: procesa lotes mientras haya correos listos y
+        espera MAIL_OUTBOX_INTERVALO segundos (o un nuevo encolado) entre rondas.
+
+        Args:
+            app: Aplicación Flask (el bucle corre fuera de cualquier petición)
+            una_vez: Terminar cuando no queden correos listos para enviar
+        """
+        tamano = int(app.config['MAIL_OUTBOX_LOTE'])
+        intervalo = float(app.config['MAIL_OUTBOX_INTERVALO'])
+        while True:
+            try:
+                with app.app_context():
+                    procesados = self.procesar_lote()
+            except Exception:
+                logger.exception('Error en el enviador de correos')
+                procesados = 0
+
+            if procesados >= tamano:
+                continue
+            if una_vez:
+                return
+            self._despertar.wait(intervalo)
+            self._despertar.clear()
+
+    def procesar_lote(self):
+        """
+        Reserva un lote de correos listos, los envía sobre una única conexión
+        SMTP y registra el resultado de cada uno.
+
+        Returns:
+            Cantidad de correos procesados (enviados o fallidos)
+        """
+        from app import mysql, mail
+
+        config = current_app.config
+        conn = mysql.connection
+        cur = conn.cursor()
+        try:
+            # Reservar: la reserva vence sola si el proceso muere a mitad de lote
+            lote = uuid.uuid4().hex
+            cur.execute('''
+                UPDATE correos_salientes
+                SET lote = %s, reservado_hasta = NOW() + INTERVAL %s SECOND
+                WHERE estado = 'pendiente' AND proximo_intento <= NOW()
+                    AND (reservado_hasta IS NULL OR reservado_hasta < NOW())
+                ORDER BY proximo_intento
+                LIMIT %s
+            ''', (lote, int(config['MAIL_OUTBOX_RESERVA']), int(config['MAIL_OUTBOX_LOTE'])))
+            conn.commit()
+            if cur.rowcount == 0:
+                return 0
+
+            cur.execute('''
+                SELECT id_correo, destinatario, asunto, html, remitente, intentos
+                FROM correos_salientes
+                WHERE lote = %s
+            ''', (lote,))
+            correos = cur.fetchall()
+
+            errores = {}
+            enviados = set()
+            try:
+                with mail.connect() as smtp:
+                    for id_correo, destinatario, asunto, html, remitente, _ in correos:
+                        try:
+                            smtp.send(Message(
+                                subject=asunto,
+                                recipients=[destinatario],
+                                html=html,
+                                sender=remitente or config['MAIL_DEFAULT_SENDER']
+                            ))
+                            enviados.add(id_correo)
+                        except Exception as e:
+                            errores[id_correo] = str(e)
+            except Exception as e:
+                # Falló la conexión (o su cierre): se reintentan los que no salieron
+                for correo in correos:
+                    if correo[0] not in enviados:
+                        errores.setdefault(correo[0], str(e))
+
+            perdidos = 0
+            for id_correo, destinatario, _, _, _, intentos in correos:
+                if id_correo in errores:
+                    self._registrar_fallo(cur, id_correo, lote, intentos + 1, errores[id_correo], config)
+                else:
+                    cur.execute('''
+                        UPDATE correos_salientes
+                        SET estado = 'enviado', intentos = intentos + 1, enviado_en = NOW(),
+                            lote = NULL, reservado_hasta = NULL, ultimo_error = NULL
+                        WHERE id_correo = %s AND lote = %s
+                    ''', (id_correo, lote))
+                if cur.rowcount == 0:
+                    # La reserva venció y otro enviador tomó el correo
+                    perdidos += 1
+            conn.commit()
+
+            if perdidos:
+                logger.warning(f"Lote {lote}: {perdidos} correos cambiaron de lote antes de registrar el "
+                               f"resultado (el lote tardó más que MAIL_OUTBOX_RESERVA)")
+
+            if errores:
+                logger.warning(f"Lote {lote}: {len(enviados)} correos enviados, {len(errores)} con error")
+            else:
+                logger.info(f"Lote {lote}: {len(enviados)} correos enviados")
+            return len(correos)
+        finally:
+            cur.close()
+
+    @staticmethod
+    def _registrar_fallo(cur, id_correo, lote, intentos, error, config):
+        """Programa el reintento con espera exponencial o marca el correo como fallido"""
+        if intentos >= int(config['MAIL_OUTBOX_MAX_INTENTOS']):
+            cur.execute('''
+                UPDATE correos_salientes
+                SET estado = 'fallido', intentos = %s, ultimo_error = %s,
+                    lote = NULL, reservado_hasta = NULL
+                WHERE id_correo = %s AND lote = %s
+            ''', (intentos, error, id_correo, lote))
+            logger.error(f"Correo {id_correo} descartado tras {intentos} intentos: {error}")
+            return
+
+        espera = int(config['MAIL_OUTBOX_BACKOFF']) * 2 ** (intentos - 1)
+        cur.execute('''
+            UPDATE correos_salientes
+            SET intentos = %s, ultimo_error = %s, proximo_intento = NOW() + INTERVAL %s SECOND,
+                lote = NULL, reservado_hasta = NULL
+            WHERE id_correo = %s AND lote = %s
+        ''', (intentos, error, espera, id_correo, lote))
+
+    def estadisticas(self):
+        """Cantidad de correos por estado"""
+        from app import mysql
+
+        cur = mysql.connection.cursor()
+        try:
+            cur.execute('SELECT estado, COUNT(*) FROM correos_salientes GROUP BY estado')
+            conteos = {ESTADO_PENDIENTE: 0, ESTADO_ENVIADO: 0, ESTADO_FALLIDO: 0}
+            conteos.update(dict(cur.fetchall()))
+            return conteos
+        finally:
+            cur.close()
+
+
+bandeja_salida = BandejaSalida()
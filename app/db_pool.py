@@ -0,0 +1,237 @@
+"""
+Pool de conexiones MySQL para la aplicación.
+
+Reemplaza la conexión por contexto de Flask-MySQLdb por un pool acotado:
+`mysql.connection` toma una conexión del pool la primera vez que se usa en
+la petición y la devuelve al pool en el teardown del contexto. Durante una
+petición medida la entrega envuelta en una ConexionMedida (app/metricas.py).
+"""
+import os
+import threading
+import time
+from collections import deque
+
+from flask import g, current_app
+from flask_mysqldb import MySQL
+
+from app.metricas import metricas
+
+
+class PoolTimeoutError(Exception):
+    """No se obtuvo una conexión libre dentro del tiempo de espera"""
+
+
+class ConnectionPool:
+    """Pool acotado de conexiones, seguro entre hilos"""
+
+    def __init__(self, factory, min_size=1, max_size=10, max_lifetime=1800,
+                 timeout=10, ping_on_checkout=True):
+        self.factory = factory
+        self.min_size = max(0, min_size)
+        self.max_size = max(1, max_size, self.min_size)
+        self.max_lifetime = max_lifetime
+        self.timeout = timeout
+        self.ping_on_checkout = ping_on_checkout
+
+        self._idle = deque()  # (conexion, creada_en)
+        self._created_at = {}  # id(conexion) -> creada_en
+        self._size = 0
+        self._lock = threading.Condition()
+
+        self._stats = {
+            'checkouts': 0,
+            'creadas': 0,
+            'descartadas': 0,
+            'esperas': 0,
+            'timeouts': 0,
+            'ping_fallidos': 0,
+        }
+
+    def _expired(self, created_at):
+        return self.max_lifetime and (time.monotonic() - created_at) > self.max_lifetime
+
+    def _new_connection(self):
+        conn = self.factory()
+        created_at = time.monotonic()
+        with self._lock:
+            self._created_at[id(conn)] = created_at
+            self._stats['creadas'] += 1
+        return conn
+
+    def _discard(self, conn):
+        """Cierra una conexión y libera su lugar en el pool"""
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self._lock:
+            self._created_at.pop(id(conn), None)
+            self._size -= 1
+            self._stats['descartadas'] += 1
+            self._lock.notify()
+
+    def fill(self):
+        """Abre conexiones hasta alcanzar el tamaño mínimo"""
+        while True:
+            with self._lock:
+                if self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                conn = self._new_connection()
+            except Exception:
+                with self._lock:
+                    self._size -= 1
+                raise
+            with self._lock:
+                self._idle.append((conn, self._created_at[id(conn)]))
+                self._lock.notify()
+
+    def acquire(self):
+        """Obtiene una conexión sana del pool, esperando si está lleno"""
+        deadline = time.monotonic() + self.timeout
+        while True:
+            conn = None
+            with self._lock:
+                while not self._idle and self._size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats['timeouts'] += 1
+                        raise PoolTimeoutError(
+                            f'No hay conexiones libres tras {self.timeout} s '
+                            f'(máximo {self.max_size})'
+                        )
+                    self._stats['esperas'] += 1
+                    self._lock.wait(remaining)
+
+                if self._idle:
+                    conn, created_at = self._idle.pop()
+                else:
+                    self._size += 1
+
+            if conn is None:
+                try:
+                    conn = self._new_connection()
+                except Exception:
+                    with self._lock:
+                        self._size -= 1
+                        self._lock.notify()
+                    raise
+            elif self._expired(created_at):
+                self._discard(conn)
+                continue
+            elif self.ping_on_checkout:
+                try:
+                    conn.ping()
+                except Exception:
+                    with self._lock:
+                        self._stats['ping_fallidos'] += 1
+                    self._discard(conn)
+                    continue
+
+            with self._lock:
+                self._stats['checkouts'] += 1
+            return conn
+
+    def release(self, conn, discard=False):
+        """Devuelve una conexión al pool"""
+        if not discard:
+            try:
+                # Descartar cualquier transacción abierta para que la
+                # siguiente petición no herede su estado ni su snapshot
+                conn.rollback()
+            except Exception:
+                discard = True
+
+        created_at = self._created_at.get(id(conn))
+        if discard or created_at is None or self._expired(created_at):
+            self._discard(conn)
+            return
+
+        with self._lock:
+            self._idle.append((conn, created_at))
+            self._lock.notify()
+
+    def close(self):
+        """Cierra todas las conexiones libres"""
+        with self._lock:
+            idle = list(self._idle)
+            self._idle.clear()
+        for conn, _ in idle:
+            self._discard(conn)
+
+    def stats(self):
+        """Estadísticas del pool para dimensionarlo"""
+        with self._lock:
+            return {
+                'pid': os.getpid(),
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'abiertas': self._size,
+                'libres': len(self._idle),
+                'en_uso': self._size - len(self._idle),
+                **self._stats,
+            }
+
+
+class PooledMySQL(MySQL):
+    """Flask-MySQLdb con conexiones tomadas de un ConnectionPool por proceso"""
+
+    def __init__(self, app=None):
+        self._pools = {}
+        self._pools_lock = threading.Lock()
+        super().__init__(app)
+
+    def init_app(self, app):
+        app.config.setdefault('MYSQL_POOL_MIN_SIZE', 1)
+        app.config.setdefault('MYSQL_POOL_MAX_SIZE', 10)
+        app.config.setdefault('MYSQL_POOL_MAX_LIFETIME', 1800)
+        app.config.setdefault('MYSQL_POOL_TIMEOUT', 10)
+        app.config.setdefault('MYSQL_POOL_PING', True)
+        super().init_app(app)
+
+    def _get_pool(self):
+        # El pool se crea de forma perezosa en cada proceso: las conexiones
+        # no deben heredarse a través del fork de los workers de Gunicorn
+        key = (id(current_app._get_current_object()), os.getpid())
+        pool = self._pools.get(key)
+        if pool is None:
+            with self._pools_lock:
+                pool = self._pools.get(key)
+                if pool is None:
+                    config = current_app.config
+                    pool = ConnectionPool(
+                        # Reutiliza la construcción de parámetros MYSQL_* de Flask-MySQLdb;
+                        # el pool solo crea conexiones dentro de un contexto de aplicación
+                        lambda: MySQL.connect.fget(self),
+                        min_size=int(config['MYSQL_POOL_MIN_SIZE']),
+                        max_size=int(config['MYSQL_POOL_MAX_SIZE']),
+                        max_lifetime=int(config['MYSQL_POOL_MAX_LIFETIME']),
+                        timeout=float(config['MYSQL_POOL_TIMEOUT']),
+                        ping_on_checkout=bool(config['MYSQL_POOL_PING']),
+                    )
+                    pool.fill()
+                    self._pools[key] = pool
+        return pool
+
+    @property
+    def pool(self):
+        return self._get_pool()
+
+    @property
+    def connection(self):
+        """Conexión de la petición actual, tomada del pool en el primer uso"""
+        if 'mysql_db' not in g:
+            g.mysql_db = self._get_pool().acquire()
+            # Si la petición se está midiendo (app/metricas.py), sus cursores cuentan consultas y tiempos
+            g.mysql_db_medida = metricas.conexion(g.mysql_db)
+        return g.mysql_db_medida
+
+    def teardown(self, exception):
+        conn = g.pop('mysql_db', None)
+        g.pop('mysql_db_medida', None)
+        if conn is not None:
+            self._get_pool().release(conn)
+
+    def pool_stats(self):
+        return self._get_pool().stats()
@@ -0,0 +1,191 @@
+"""
+Detector de consultas repetidas (N+1) y lentas, para desarrollo y staging.
+
+Se activa en modo debug o con CONSULTAS_DETECTOR=true. Usa los cursores
+medidos de app/metricas.py: cada consulta de la petición se normaliza
+(parámetros, literales y listas IN / VALUES pasan a `?`) y se identifica
+por la huella de esa forma normalizada. Al terminar la petición se marcan:
+
+- las formas ejecutadas CONSULTAS_REPETIDAS veces o más (por ejemplo
+  Usuario.get_by_id de nuevo tras actualizar, o un obtener_por_id dentro de
+  un bucle);
+- las consultas que tardaron CONSULTAS_LENTAS_MS o más.
+
+Si hay algo marcado se escribe un reporte JSON por petición en
+CONSULTAS_REPORTES_DIR, con el SQL normalizado, cuántas veces se ejecutó,
+los tiempos y la pila de llamadas dentro de app/ de cada lugar desde el que
+se ejecutó, y un resumen en el log. reporte_consultas.py agrupa los
+reportes por huella para encontrar los casos más frecuentes.
+"""
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+from datetime import datetime
+
+from flask import current_app, g, request
+
+from app.metricas import MedicionPeticion
+
+_COMENTARIOS = re.compile(r'--[^\n]*|#[^\n]*|/\*.*?\*/', re.S)
+_CADENAS = re.compile(r"'(?:[^'\\]|\\.|'')*'")
+_PARAMETROS = re.compile(r'%\(\w+\)s|%s')
+_NUMEROS = re.compile(r'(?<![\w.])-?\d+(?:\.\d+)?\b')
+_LISTAS = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_FILAS = re.compile(r'\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+')
+_ESPACIOS = re.compile(r'\s+')
+
+# Frames propios que no son lugares de llamada
+_DIR_APP = os.path.dirname(os.path.abspath(__file__))
+_OMITIDOS = {os.path.join(_DIR_APP, 'metricas.py'), os.path.abspath(__file__)}
+
+
+def normalizar(sql):
+    """Forma de la consulta sin valores: misma forma = misma huella"""
+    if isinstance(sql, bytes):
+        sql = sql.decode('utf-8', 'replace')
+    sql = _CADENAS.sub('?', sql)
+    sql = _COMENTARIOS.sub(' ', sql)
+    sql = _PARAMETROS.sub('?', sql)
+    sql = _NUMEROS.sub('?', sql)
+    sql = _LISTAS.sub('(...)', sql)
+    sql = _FILAS.sub('(...)', sql)
+    return _ESPACIOS.sub(' ', sql).strip()
+
+
+def huella(sql_normalizado):
+    return hashlib.sha1(sql_normalizado.encode('utf-8')).hexdigest()[:12]
+
+
+def lugar_de_llamada(profundidad):
+    """Frames dentro de app/ (del más interno al más externo), sin los de la medición"""
+    pila = []
+    frame = sys._getframe(1)
+    while frame is not None and len(pila) < profundidad:
+        archivo = frame.f_code.co_filename
+        if archivo.startswith(_DIR_APP) and archivo not in _OMITIDOS:
+            relativo = os.path.relpath(archivo, os.path.dirname(_DIR_APP))
+            pila.append(f'{relativo}:{frame.f_lineno} en {frame.f_code.co_name}')
+        frame = frame.f_back
+    return tuple(pila)
+
+
+class ConsultasPeticion:
+    """Consultas de una petición agrupadas por huella"""
+
+    def __init__(self, profundidad):
+        self.profundidad = profundidad
+        self.formas = {}
+        self.lentas = []
+        self.total = 0
+
+    def registrar(self, sql, duracion):
+        self.total += 1
+        normalizado = normalizar(sql)
+        clave = huella(normalizado)
+        forma = self.formas.get(clave)
+        if forma is None:
+            forma = self.formas[clave] = {'sql': normalizado, 'veces': 0, 'total': 0.0,
+                                          'maximo': 0.0, 'llamadas': {}}
+        pila = lugar_de_llamada(self.profundidad)
+        forma['veces'] += 1
+        forma['total'] += duracion
+        forma['maximo'] = max(forma['maximo'], duracion)
+        forma['llamadas'][pila] = forma['llamadas'].get(pila, 0) + 1
+        return clave, pila
+
+
+class DetectorConsultas:
+    """Marca consultas repetidas y lentas de cada petición y escribe los reportes"""
+
+    def __init__(self):
+        self.forzado = False
+        self.repetidas = 2
+        self.lentas = 0.1
+        self.directorio = os.path.join('logs', 'consultas')
+        self.profundidad = 8
+        self._secuencia = 0
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        app.config.setdefault('CONSULTAS_DETECTOR', False)
+        app.config.setdefault('CONSULTAS_REPETIDAS', 2)
+        app.config.setdefault('CONSULTAS_LENTAS_MS', 100)
+        app.config.setdefault('CONSULTAS_REPORTES_DIR', os.path.join('logs', 'consultas'))
+        app.config.setdefault('CONSULTAS_PROFUNDIDAD_PILA', 8)
+
+        self.forzado = bool(app.config['CONSULTAS_DETECTOR'])
+        self.repetidas = max(2, int(app.config['CONSULTAS_REPETIDAS']))
+        self.lentas = float(app.config['CONSULTAS_LENTAS_MS']) / 1000
+        self.directorio = os.path.abspath(app.config['CONSULTAS_REPORTES_DIR'])
+        self.profundidad = int(app.config['CONSULTAS_PROFUNDIDAD_PILA'])
+
+        # Se registra después de metricas: su before_request corre después y su
+        # after_request antes, con g.metricas todavía disponible
+        app.before_request(self._iniciar)
+        app.after_request(self._finalizar)
+
+    def activo(self):
+        return self.forzado or current_app.debug
+
+    def _iniciar(self):
+        if request.endpoint == 'static' or not self.activo():
+            return
+        if 'metricas' not in g:  # con METRICAS_HABILITADAS=false la medición la crea el detector
+            g.metricas = MedicionPeticion()
+        consultas = g.consultas_detector = ConsultasPeticion(self.profundidad)
+
+        def registrar(sql, duracion):
+            clave, pila = consultas.registrar(sql, duracion)
+            if duracion >= self.lentas:
+                consultas.lentas.append({'huella': clave, 'sql': consultas.formas[clave]['sql'],
+                                         'ms': round(duracion * 1000, 2), 'pila': list(pila)})
+
+        g.metricas.registrar_consulta = registrar
+
+    def _finalizar(self, response):
+        consultas = g.pop('consultas_detector', None)
+        if consultas is None:
+            return response
+        repetidas = sorted(
+            ({'huella': clave, 'sql': forma['sql'], 'veces': forma['veces'],
+              'total_ms': round(forma['total'] * 1000, 2), 'max_ms': round(forma['maximo'] * 1000, 2),
+              'llamadas': [{'veces': veces, 'pila': list(pila)}
+                           for pila, veces in sorted(forma['llamadas'].items(), key=lambda x: -x[1])]}
+             for clave, forma in consultas.formas.items() if forma['veces'] >= self.repetidas),
+            key=lambda r: -r['veces'])
+        if repetidas or consultas.lentas:
+            self.reportar(response, consultas, repetidas)
+        return response
+
+    def reportar(self, response, consultas, repetidas):
+        endpoint = request.endpoint or 'sin_endpoint'
+        reporte = {
+            'fecha': datetime.now().isoformat(timespec='seconds'),
+            'metodo': request.method,
+            'ruta': request.full_path.rstrip('?'),
+            'endpoint': endpoint,
+            'estado': response.status_code,
+            'consultas': consultas.total,
+            'formas_distintas': len(consultas.formas),
+            'repetidas': repetidas,
+            'lentas': consultas.lentas,
+        }
+        with self._lock:
+            self._secuencia += 1
+            nombre = f'{time.strftime("%Y%m%d_%H%M%S")}_{os.getpid()}_{self._secuencia}_{endpoint}.json'
+        os.makedirs(self.directorio, exist_ok=True)
+        with open(os.path.join(self.directorio, nombre), 'w', encoding='utf-8') as f:
+            json.dump(reporte, f, ensure_ascii=False, indent=2)
+
+        resumen = [f"{r['veces']}x {r['sql'][:80]} ({(r['llamadas'][0]['pila'] or ['fuera de app/'])[0]})"
+                   for r in repetidas[:3]]
+        resumen += [f"{lenta['ms']} ms {lenta['sql'][:80]}" for lenta in consultas.lentas[:3]]
+        current_app.logger.warning('Consultas a revisar en %s %s (%d consultas, reporte %s): %s',
+                                   request.method, endpoint, consultas.total, nombre, '; '.join(resumen))
+
+
+detector_consultas = DetectorConsultas()
@@ -0,0 +1,145 @@
+"""
+Índice en memoria de ocupación de horarios por día.
+
+Cada fecha se carga con una sola consulta y se guarda como mapas de bits
+(un bit por minuto del día): uno por doctor y uno con la unión de todos,
+ya que `unique_fecha_hora` impide dos citas a la misma hora aunque sean de
+doctores distintos. Cita.crear/actualizar/eliminar invalidan el índice del
+worker actual y el sello de versión de la fecha (app/versiones.py), que
+comparten todos los workers. Cada fecha guarda el token del sello con que se
+cargó y se recarga en cuanto el sello cambia, así que un worker nunca
+responde con la ocupación vieja una fecha cuyo ETag ya cambió. El TTL queda
+como respaldo (por ejemplo si el sello venció y se generó uno nuevo).
+"""
+import threading
+import time
+from datetime import date, datetime, timedelta, time as dt_time
+
+MINUTOS_DIA = 24 * 60
+
+
+def minuto_del_dia(hora):
+    """Convierte una hora (time, timedelta de MySQLdb o 'HH:MM') a minuto del día"""
+    if isinstance(hora, timedelta):
+        return int(hora.total_seconds()) // 60 % MINUTOS_DIA
+    if isinstance(hora, dt_time):
+        return hora.hour * 60 + hora.minute
+    horas, minutos = str(hora).split(':')[:2]
+    return int(horas) * 60 + int(minutos)
+
+
+def _clave(fecha):
+    if isinstance(fecha, datetime):
+        return fecha.date()
+    if isinstance(fecha, date):
+        return fecha
+    return datetime.strptime(str(fecha), '%Y-%m-%d').date()
+
+
+def formatear_minuto(minuto):
+    return f"{minuto // 60:02d}:{minuto % 60:02d}"
+
+
+class OcupacionDia:
+    """Mapas de bits de minutos ocupados para una fecha"""
+
+    __slots__ = ('todos', 'por_doctor', 'cargado_en', 'sello')
+
+    def __init__(self, filas, sello=None):
+        self.todos = 0
+        self.por_doctor = {}
+        for id_doctor, hora in filas:
+            bit = 1 << minuto_del_dia(hora)
+            self.todos |= bit
+            self.por_doctor[id_doctor] = self.por_doctor.get(id_doctor, 0) | bit
+        self.cargado_en = time.monotonic()
+        self.sello = sello
+
+    def ocupado(self, minuto, id_doctor=None):
+        bit = 1 << minuto
+        if self.todos & bit:
+            return True
+        if id_doctor is not None:
+            return bool(self.por_doctor.get(id_doctor, 0) & bit)
+        return False
+
+
+class IndiceOcupacion:
+    """Caché por worker de la ocupación de cada fecha"""
+
+    def __init__(self, ttl=5, max_fechas=366):
+        self.ttl = ttl
+        self.max_fechas = max_fechas
+        self._dias = {}
+        self._generacion = 0
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        app.config.setdefault('DISPONIBILIDAD_TTL', 5)
+        self.ttl = float(app.config['DISPONIBILIDAD_TTL'])
+
+    @staticmethod
+    def _sello(fecha):
+        from app.versiones import versiones, recurso_fecha
+
+        return versiones.obtener(recurso_fecha(fecha))[0]
+
+    def _cargar(self, fecha, sello):
+        from app import mysql
+
+        cur = mysql.connection.cursor()
+        try:
+            cur.execute('SELECT id_doctor, hora FROM citas WHERE fecha = %s', (fecha,))
+            return OcupacionDia(cur.fetchall(), sello)
+        finally:
+            cur.close()
+
+    def dia(self, fecha):
+        """Ocupación de la fecha, cargándola si no está, si cambió su sello o si venció su TTL"""
+        fecha = _clave(fecha)
+        with self._lock:
+            ocupacion = self._dias.get(fecha)
+            generacion = self._generacion
+        # El sello se lee antes de cargar: si la cita cambia durante la carga, el
+        # sello guardado queda viejo y la próxima consulta vuelve a cargar
+        sello = self._sello(fecha)
+        if (ocupacion is not None and ocupacion.sello == sello
+                and time.monotonic() - ocupacion.cargado_en <= self.ttl):
+            return ocupacion
+
+        ocupacion = self._cargar(fecha, sello)
+        with self._lock:
+            if generacion != self._generacion:
+                # Se invalidó mientras se cargaba: no guardar un resultado posiblemente viejo
+                return ocupacion
+            if len(self._dias) >= self.max_fechas and fecha not in self._dias:
+                # Descartar la fecha cargada hace más tiempo
+                mas_antigua = min(self._dias, key=lambda f: self._dias[f].cargado_en)
+                del self._dias[mas_antigua]
+            self._dias[fecha] = ocupacion
+        return ocupacion
+
+    def disponible(self, fecha, hora, id_doctor=None):
+        """True si no hay ninguna cita a esa hora (ni del doctor indicado)"""
+        return not self.dia(fecha).ocupado(minuto_del_dia(hora), id_doctor)
+
+    def horarios_libres(self, fecha, id_doctor, inicio, fin, duracion):
+        """Horarios libres entre inicio y fin (minutos del día) cada `duracion` minutos"""
+        ocupacion = self.dia(fecha)
+        return [
+            formatear_minuto(minuto)
+            for minuto in range(inicio, fin, duracion)
+            if not ocupacion.ocupado(minuto, id_doctor)
+        ]
+
+    def invalidar(self, fecha=None):
+        """Invalida una fecha o, sin argumentos, todo el índice"""
+        with self._lock:
+            self._generacion += 1
+            if fecha is None:
+                self._dias.clear()
+            else:
+                self._dias.pop(_clave(fecha), None)
+
+
+indice_ocupacion = IndiceOcupacion()
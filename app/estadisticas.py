@@ -0,0 +1,253 @@
+"""
+Estadísticas de citas por doctor: agendadas, completadas y canceladas,
+ocupación de la agenda y horas con más demanda.
+
+Las consultas no agrupan sobre `citas`: leen la tabla `estadisticas_citas`,
+que guarda el total por (doctor, día, hora, estado). Los totales diarios,
+semanales y mensuales son sumas de un rango de esa tabla (a lo sumo
+días x horas x estados filas por doctor), así que el tiempo de respuesta no
+depende del tamaño del histórico.
+
+La tabla se actualiza por día:
+
+- Cita.crear/actualizar/eliminar marcan las fechas afectadas en
+  `estadisticas_pendientes` (incluida la fecha anterior de una cita movida
+  o eliminada).
+- `marcar_cambios_recientes` marca las fechas de las citas creadas o
+  modificadas (created_at / actualizado_en) en los últimos minutos, para
+  los cambios hechos directamente en la base de datos.
+- `refrescar` recalcula cada fecha marcada con una consulta sobre las citas
+  de ese único día (índice unique_fecha_hora).
+
+Las funciones reciben una conexión o un cursor; refrescar hace commit por día.
+"""
+from datetime import date, timedelta
+
+ESTADOS = ('programada', 'completada', 'cancelada')
+
+# Expresión del primer día de cada período
+PERIODOS = {
+    'dia': 'e.fecha',
+    'semana': 'DATE_SUB(e.fecha, INTERVAL WEEKDAY(e.fecha) DAY)',
+    'mes': 'DATE_SUB(e.fecha, INTERVAL DAYOFMONTH(e.fecha) - 1 DAY)',
+}
+
+HORAS_PICO = 5
+
+
+def marcar_pendientes(cur, *fechas):
+    """Marca fechas para recalcular (sin commit: va en la transacción de la cita)"""
+    fechas = sorted({f for f in fechas if f is not None}, key=str)
+    if fechas:
+        cur.executemany('INSERT IGNORE INTO estadisticas_pendientes (fecha) VALUES (%s)',
+                        [(f,) for f in fechas])
+
+
+def marcar_cambios_recientes(cur, minutos):
+    """
+    Marca las fechas de las citas creadas o modificadas en los últimos `minutos`.
+
+    Returns:
+        Cantidad de fechas marcadas
+    """
+    cur.execute('''
+        INSERT IGNORE INTO estadisticas_pendientes (fecha)
+        SELECT DISTINCT fecha FROM citas
+        WHERE actualizado_en >= NOW() - INTERVAL %s MINUTE
+    ''', (int(minutos),))
+    return cur.rowcount
+
+
+def marcar_rango(cur, desde, hasta):
+    """Marca todas las fechas de [desde, hasta) para reconstruirlas"""
+    fechas = []
+    dia = desde
+    while dia < hasta:
+        fechas.append(dia)
+        dia += timedelta(days=1)
+    marcar_pendientes(cur, *fechas)
+    return len(fechas)
+
+
+def refrescar(conn, limite=None):
+    """
+    Recalcula las fechas pendientes, una transacción por fecha.
+
+    Quitar la marca y recalcular van en la misma transacción: si otro
+    proceso toma la misma fecha, espera y la encuentra ya desmarcada; si una
+    cita cambia mientras tanto, vuelve a marcar la fecha al terminar.
+
+    Las citas del día se leen con un SELECT normal (lectura consistente, sin
+    bloqueos) y no con INSERT ... SELECT, que toma bloqueos compartidos sobre
+    `citas`: el refresco solo bloquea filas de estadisticas_pendientes y
+    estadisticas_citas, así que no puede formar un deadlock con una cita que
+    bloquea primero su fila de `citas` y después marca la fecha. La lectura
+    empieza después de quitar la marca, de modo que ve toda cita que la marcó
+    antes; las que llegan después la vuelven a marcar.
+
+    Args:
+        conn: Conexión MySQL
+        limite: Máximo de fechas a recalcular (None = todas)
+
+    Returns:
+        Cantidad de fechas recalculadas
+    """
+    cur = conn.cursor()
+    try:
+        query = 'SELECT fecha FROM estadisticas_pendientes ORDER BY fecha'
+        params = ()
+        if limite:
+            query += ' LIMIT %s'
+            params = (int(limite),)
+        cur.execute(query, params)
+        fechas = [fila[0] for fila in cur.fetchall()]
+        conn.commit()  # la instantánea de cada fecha se toma después de quitar su marca
+
+        recalculadas = 0
+        for fecha in fechas:
+            try:
+                cur.execute('DELETE FROM estadisticas_pendientes WHERE fecha = %s', (fecha,))
+                if cur.rowcount == 0:
+                    conn.commit()
+                    continue
+                cur.execute('DELETE FROM estadisticas_citas WHERE fecha = %s', (fecha,))
+                cur.execute('''
+                    SELECT id_doctor, HOUR(hora), estado, COUNT(*)
+                    FROM citas
+                    WHERE fecha = %s AND id_doctor IS NOT NULL AND estado IS NOT NULL
+                    GROUP BY id_doctor, HOUR(hora), estado
+                ''', (fecha,))
+                totales = [(id_doctor, fecha, hora, estado, total)
+                           for id_doctor, hora, estado, total in cur.fetchall()]
+                if totales:
+                    cur.executemany('''
+                        INSERT INTO estadisticas_citas (id_doctor, fecha, hora, estado, total)
+                        VALUES (%s, %s, %s, %s, %s)
+                    ''', totales)
+                conn.commit()
+                recalculadas += 1
+            except Exception:
+                conn.rollback()
+                raise
+        return recalculadas
+    finally:
+        cur.close()
+
+
+def pendientes(cur):
+    """Cantidad de fechas marcadas para recalcular"""
+    cur.execute('SELECT COUNT(*) FROM estadisticas_pendientes')
+    return cur.fetchone()[0]
+
+
+def dias_laborables(desde, hasta, laborables):
+    """Cantidad de días de [desde, hasta) cuyo weekday() está en `laborables`"""
+    semanas, resto = divmod((hasta - desde).days, 7)
+    total = semanas * len(laborables)
+    for i in range(resto):
+        if (desde + timedelta(days=semanas * 7 + i)).weekday() in laborables:
+            total += 1
+    return total
+
+
+def fin_de_periodo(inicio, periodo):
+    """Primer día del período siguiente"""
+    if periodo == 'dia':
+        return inicio + timedelta(days=1)
+    if periodo == 'semana':
+        return inicio + timedelta(days=7)
+    return date(inicio.year + 1, 1, 1) if inicio.month == 12 else date(inicio.year, inicio.month + 1, 1)
+
+
+def _metricas(conteos, turnos):
+    agendadas = sum(conteos.values())
+    atendibles = conteos['programada'] + conteos['completada']
+    return {
+        'agendadas': agendadas,
+        'programadas': conteos['programada'],
+        'completadas': conteos['completada'],
+        'canceladas': conteos['cancelada'],
+        'turnos': turnos,
+        'ocupacion': round(atendibles / turnos, 3) if turnos else None,
+        'tasa_cancelacion': round(conteos['cancelada'] / agendadas, 3) if agendadas else None,
+    }
+
+
+def consultar(cur, periodo, desde, hasta, id_doctor=None, turnos_por_dia=20, laborables=(0, 1, 2, 3, 4)):
+    """
+    Estadísticas por doctor y período.
+
+    Args:
+        cur: Cursor MySQL
+        periodo: 'dia', 'semana' o 'mes'
+        desde: Primer día (date)
+        hasta: Día siguiente al último (date)
+        id_doctor: Limitar a un doctor (None = todos)
+        turnos_por_dia: Turnos de agenda por doctor y día laborable
+        laborables: Días de la semana con atención (weekday(): 0 = lunes)
+
+    Returns:
+        Lista de diccionarios por doctor con sus totales, los períodos y las horas pico
+    """
+    inicio_periodo = PERIODOS[periodo]
+    filtro = 'e.fecha >= %s AND e.fecha < %s'
+    params = [desde, hasta]
+    if id_doctor is not None:
+        filtro += ' AND e.id_doctor = %s'
+        params.append(id_doctor)
+
+    cur.execute(f'''
+        SELECT e.id_doctor, {inicio_periodo} AS inicio, e.estado, SUM(e.total)
+        FROM estadisticas_citas e
+        WHERE {filtro}
+        GROUP BY e.id_doctor, inicio, e.estado
+        ORDER BY e.id_doctor, inicio
+    ''', params)
+    filas = cur.fetchall()
+
+    cur.execute(f'''
+        SELECT e.id_doctor, e.hora, SUM(e.total) AS citas
+        FROM estadisticas_citas e
+        WHERE {filtro} AND e.estado <> 'cancelada'
+        GROUP BY e.id_doctor, e.hora
+    ''', params)
+    horas = cur.fetchall()
+
+    doctores = {}
+    for id_doc, inicio, estado, total in filas:
+        periodos = doctores.setdefault(id_doc, {})
+        periodos.setdefault(inicio, dict.fromkeys(ESTADOS, 0))[estado] = int(total)
+    if id_doctor is not None:
+        doctores.setdefault(id_doctor, {})
+
+    nombres = {}
+    if doctores:
+        marcas = ', '.join(['%s'] * len(doctores))
+        cur.execute(f"SELECT id_doctor, CONCAT(nombre, ' ', apellido) FROM doctores WHERE id_doctor IN ({marcas})",
+                    list(doctores))
+        nombres = dict(cur.fetchall())
+
+    horas_por_doctor = {}
+    for id_doc, hora, citas in horas:
+        horas_por_doctor.setdefault(id_doc, []).append((int(citas), hora))
+
+    resultado = []
+    for id_doc, periodos in doctores.items():
+        detalle = []
+        totales = dict.fromkeys(ESTADOS, 0)
+        for inicio, conteos in periodos.items():
+            fin = fin_de_periodo(inicio, periodo)
+            turnos = turnos_por_dia * dias_laborables(max(inicio, desde), min(fin, hasta), laborables)
+            detalle.append({'inicio': inicio.isoformat(), **_metricas(conteos, turnos)})
+            for estado in ESTADOS:
+                totales[estado] += conteos[estado]
+        pico = sorted(horas_por_doctor.get(id_doc, []), reverse=True)[:HORAS_PICO]
+        resultado.append({
+            'id_doctor': id_doc,
+            'doctor': nombres.get(id_doc, str(id_doc)),
+            'totales': _metricas(totales, turnos_por_dia * dias_laborables(desde, hasta, laborables)),
+            'periodos': detalle,
+            'horas_pico': [{'hora': f'{hora:02d}:00', 'citas': citas} for citas, hora in pico],
+        })
+    resultado.sort(key=lambda d: d['doctor'])
+    return resultado
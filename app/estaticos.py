@@ -0,0 +1,91 @@
+"""
+Archivos estáticos con huella (fingerprint) y caché de larga duración.
+
+Las plantillas piden los archivos con `estatico('js/base.js')` o
+`estatico('vendor/bootstrap/css/bootstrap.min.css')`. Los propios están en
+app/static/src y las librerías de terceros (LIBRERIAS) están versionadas en
+app/static/vendor. `python construir_estaticos.py` minifica todo, agrega el
+hash del contenido al nombre y lo deja en app/static/dist junto con
+manifest.json, que traduce cada nombre lógico a su archivo con huella.
+
+Los archivos de dist/ nunca cambian de contenido (un cambio produce otro
+nombre), así que se sirven con Cache-Control inmutable por un año. Sin
+manifiesto, por ejemplo en desarrollo antes de construir, se sirven los
+archivos de src/ tal cual y las librerías desde vendor/; el CDN solo queda
+como respaldo si falta alguna.
+"""
+import json
+import os
+
+from flask import request, url_for
+
+# Librerías de terceros: nombre lógico -> URL de la versión fijada
+_BOOTSTRAP = 'https://cdn.jsdelivr.net/npm/bootstrap@5.1.3/dist/'
+_FONTAWESOME = 'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/5.15.4/'
+
+LIBRERIAS = {
+    'vendor/bootstrap/css/bootstrap.min.css': _BOOTSTRAP + 'css/bootstrap.min.css',
+    'vendor/bootstrap/js/bootstrap.min.js': _BOOTSTRAP + 'js/bootstrap.min.js',
+    'vendor/popper/popper.min.js': 'https://cdn.jsdelivr.net/npm/@popperjs/core@2.10.2/dist/umd/popper.min.js',
+    'vendor/fontawesome/css/all.min.css': _FONTAWESOME + 'css/all.min.css',
+}
+# Fuentes que referencia all.min.css (url(../webfonts/...))
+for _fuente in ('fa-brands-400', 'fa-regular-400', 'fa-solid-900'):
+    for _extension in ('eot', 'svg', 'ttf', 'woff', 'woff2'):
+        LIBRERIAS[f'vendor/fontawesome/webfonts/{_fuente}.{_extension}'] = \
+            f'{_FONTAWESOME}webfonts/{_fuente}.{_extension}'
+
+DIR_FUENTES = 'src'
+DIR_LIBRERIAS = 'vendor'
+DIR_SALIDA = 'dist'
+MANIFIESTO = 'manifest.json'
+
+
+class Estaticos:
+    """Resuelve los nombres lógicos de los estáticos según el manifiesto"""
+
+    def __init__(self):
+        self.manifiesto = {}
+        self.max_age_dist = 31536000
+
+    def init_app(self, app):
+        app.config.setdefault('ESTATICOS_MANIFIESTO',
+                              os.path.join(app.static_folder, DIR_SALIDA, MANIFIESTO))
+        app.config.setdefault('ESTATICOS_MAX_AGE', 31536000)
+        self.max_age_dist = int(app.config['ESTATICOS_MAX_AGE'])
+        self.manifiesto = self.cargar(app.config['ESTATICOS_MANIFIESTO'])
+        # Librerías descargadas pero sin construir: se sirven locales, sin huella
+        for nombre in LIBRERIAS:
+            if nombre not in self.manifiesto and os.path.exists(os.path.join(app.static_folder, nombre)):
+                self.manifiesto[nombre] = nombre
+
+        app.add_template_global(self.url, 'estatico')
+        app.after_request(self._cache_control)
+
+    @staticmethod
+    def cargar(ruta):
+        """Manifiesto {nombre lógico: ruta en static/}; vacío si no se construyó"""
+        try:
+            with open(ruta, encoding='utf-8') as archivo:
+                return json.load(archivo)
+        except FileNotFoundError:
+            return {}
+
+    def url(self, nombre):
+        """URL del estático: con huella si está construido, si no src/ o el CDN"""
+        ruta = self.manifiesto.get(nombre)
+        if ruta is not None:
+            return url_for('static', filename=ruta)
+        if nombre in LIBRERIAS:
+            return LIBRERIAS[nombre]
+        return url_for('static', filename=f'{DIR_FUENTES}/{nombre}')
+
+    def _cache_control(self, response):
+        if (request.endpoint == 'static' and response.status_code in (200, 304)
+                and request.view_args.get('filename', '').startswith(DIR_SALIDA + '/')):
+            # El nombre cambia con el contenido: el navegador no necesita revalidar
+            response.headers['Cache-Control'] = f'public, max-age={self.max_age_dist}, immutable'
+        return response
+
+
+estaticos = Estaticos()
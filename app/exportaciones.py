@@ -0,0 +1,228 @@
+"""
+Exportaciones de histórico en segundo plano.
+
+Las rutas de historico encolan un trabajo y responden de inmediato; un pool
+de procesos local (la maquetación del PDF es intensiva en CPU) abre su propia
+conexión MySQL, genera el archivo y lo deja en EXPORT_DIR. El estado de cada
+trabajo se guarda como JSON junto al archivo, de modo que cualquier worker de
+Gunicorn puede responder el sondeo y la descarga. Los trabajos vencidos
+(EXPORT_TTL) se eliminan al encolar nuevos.
+
+El pool pertenece al worker web que encoló el trabajo, cuyo pid queda en el
+estado: si Gunicorn lo recicla o lo mata, el trabajo no va a terminar. Al
+consultar el estado, un trabajo pendiente o en proceso cuyo worker ya no
+existe, o que lleva más de EXPORT_TIMEOUT segundos, pasa a error para que el
+cliente deje de sondear.
+"""
+import json
+import logging
+import multiprocessing
+import os
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+ESTADO_PENDIENTE = 'pendiente'
+ESTADO_EN_PROCESO = 'en_proceso'
+ESTADO_COMPLETADO = 'completado'
+ESTADO_ERROR = 'error'
+
+# Los ids son uuid4 en hexadecimal; se validan antes de construir rutas
+PATRON_JOB_ID = re.compile(r'^[0-9a-f]{32}$')
+
+
+def _ruta_estado(directorio, job_id):
+    return os.path.join(directorio, f"{job_id}.json")
+
+
+def _guardar_estado(directorio, job_id, **cambios):
+    """Actualiza el JSON de estado de forma atómica (escritura + rename)"""
+    ruta = _ruta_estado(directorio, job_id)
+    estado = leer_estado(directorio, job_id) or {}
+    estado.update(cambios)
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    with open(temporal, 'w', encoding='utf-8') as f:
+        json.dump(estado, f)
+    os.replace(temporal, ruta)
+    return estado
+
+
+def _proceso_vivo(pid):
+    """True si el proceso existe (en Windows solo se puede afirmar del propio)"""
+    if pid is None or pid == os.getpid():
+        return True
+    if os.name == 'nt':  # os.kill terminaría el proceso: queda solo el timeout
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def leer_estado(directorio, job_id):
+    """Estado de un trabajo, o None si no existe"""
+    try:
+        with open(_ruta_estado(directorio, job_id), encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def ejecutar_exportacion(directorio, job_id, parametros_db, tipo, formato, params):
+    """
+    Punto de entrada en el proceso hijo: consulta y escribe el reporte.
+
+    No usa Flask: abre una conexión MySQLdb propia con `parametros_db`.
+    """
+    import MySQLdb
+    from MySQLdb.cursors import SSCursor
+    from app import reportes
+
+    _guardar_estado(directorio, job_id, estado=ESTADO_EN_PROCESO, iniciado=time.time())
+    conn = None
+    ruta = None
+    try:
+        conn = MySQLdb.connect(**parametros_db)
+        cur = conn.cursor()
+        info = reportes.obtener_info(cur, tipo, params)
+        cur.close()
+        if not info:
+            raise LookupError('Registro no encontrado')
+
+        titulo, nombre_archivo = reportes.describir_exportacion(tipo, info, formato)
+        ruta = os.path.join(directorio, f"{job_id}.{reportes.EXTENSIONES[formato]}")
+        # La ruta queda registrada antes de escribir: si el proceso muere a
+        # medias, limpiar_vencidos borra igual el archivo incompleto
+        _guardar_estado(directorio, job_id, archivo=ruta)
+
+        cur = conn.cursor(SSCursor)
+        try:
+            reportes.consultar_historico(cur, tipo, params)
+            if formato == 'excel':
+                total = reportes.escribir_excel(cur, titulo, ruta)
+            else:
+                total = reportes.escribir_pdf(cur, tipo, titulo, ruta)
+        finally:
+            cur.close()
+
+        _guardar_estado(directorio, job_id, estado=ESTADO_COMPLETADO, terminado=time.time(),
+                        archivo=ruta, nombre_archivo=nombre_archivo, registros=total)
+    except Exception as e:
+        if ruta is not None:
+            try:
+                os.remove(ruta)
+            except FileNotFoundError:
+                pass
+        _guardar_estado(directorio, job_id, estado=ESTADO_ERROR, terminado=time.time(), error=str(e))
+    finally:
+        if conn is not None:
+            conn.close()
+
+
+class ColaExportaciones:
+    """Pool de procesos (uno por worker web) y registro de trabajos en disco"""
+
+    def __init__(self):
+        self.directorio = 'exports'
+        self.max_procesos = 2
+        self.ttl = 3600
+        self.timeout = 900
+        self.parametros_db = {}
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        app.config.setdefault('EXPORT_DIR', 'exports')
+        app.config.setdefault('EXPORT_WORKERS', 2)
+        app.config.setdefault('EXPORT_TTL', 3600)
+        app.config.setdefault('EXPORT_TIMEOUT', 900)
+
+        self.directorio = os.path.abspath(app.config['EXPORT_DIR'])
+        self.max_procesos = int(app.config['EXPORT_WORKERS'])
+        self.ttl = int(app.config['EXPORT_TTL'])
+        self.timeout = int(app.config['EXPORT_TIMEOUT'])
+        self.parametros_db = {
+            'host': app.config['MYSQL_HOST'],
+            'user': app.config['MYSQL_USER'],
+            'passwd': app.config['MYSQL_PASSWORD'],
+            'db': app.config['MYSQL_DB'],
+            'port': app.config.get('MYSQL_PORT', 3306),
+            'charset': app.config.get('MYSQL_CHARSET', 'utf8'),
+        }
+        os.makedirs(self.directorio, exist_ok=True)
+
+    def _get_executor(self):
+        # Un pool por proceso: no se hereda a través del fork de Gunicorn.
+        # 'spawn' evita clonar los hilos y conexiones abiertas del worker web.
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_procesos,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+                self._pid = os.getpid()
+            return self._executor
+
+    def encolar(self, usuario_id, tipo, formato, params):
+        """Registra el trabajo, lo envía al pool y devuelve su id"""
+        self.limpiar_vencidos()
+
+        job_id = uuid.uuid4().hex
+        _guardar_estado(self.directorio, job_id, id=job_id, estado=ESTADO_PENDIENTE,
+                        usuario_id=usuario_id, tipo=tipo, formato=formato,
+                        creado=time.time(), pid=os.getpid())
+        self._get_executor().submit(
+            ejecutar_exportacion, self.directorio, job_id, self.parametros_db,
+            tipo, formato, [str(p) for p in params]
+        )
+        logger.info(f"Exportación {job_id} encolada ({tipo}, {formato}) por usuario {usuario_id}")
+        return job_id
+
+    def estado(self, job_id):
+        if not PATRON_JOB_ID.match(job_id or ''):
+            return None
+        estado = leer_estado(self.directorio, job_id)
+        if estado is None or estado['estado'] not in (ESTADO_PENDIENTE, ESTADO_EN_PROCESO):
+            return estado
+
+        error = None
+        if not _proceso_vivo(estado.get('pid')):
+            error = 'El proceso que generaba la exportación terminó; vuelva a solicitarla'
+        elif time.time() - estado.get('creado', 0) > self.timeout:
+            error = 'La exportación superó el tiempo máximo; vuelva a solicitarla'
+        if error is None:
+            return estado
+        logger.warning(f"Exportación {job_id} abandonada: {error}")
+        return _guardar_estado(self.directorio, job_id, estado=ESTADO_ERROR, terminado=time.time(), error=error)
+
+    def limpiar_vencidos(self):
+        """Elimina los trabajos (estado y archivo) creados hace más de EXPORT_TTL segundos"""
+        limite = time.time() - self.ttl
+        try:
+            nombres = os.listdir(self.directorio)
+        except FileNotFoundError:
+            return
+        for nombre in nombres:
+            if not nombre.endswith('.json'):
+                continue
+            job_id = nombre[:-len('.json')]
+            estado = leer_estado(self.directorio, job_id)
+            if estado is None or estado.get('creado', 0) >= limite:
+                continue
+            for ruta in (estado.get('archivo'), _ruta_estado(self.directorio, job_id)):
+                if ruta:
+                    try:
+                        os.remove(ruta)
+                    except FileNotFoundError:
+                        pass
+
+
+cola_exportaciones = ColaExportaciones()
@@ -0,0 +1,208 @@
+"""
+Almacenamiento de los contadores de Flask-Limiter en SQLite compartido.
+
+Con `memory://` cada worker de Gunicorn lleva sus propios contadores: el
+límite real se multiplica por la cantidad de workers y la memoria crece con
+cada IP nueva. Este backend guarda los contadores en un archivo SQLite local
+(modo WAL) que comparten todos los workers de la máquina:
+
+- Ventana deslizante (RATELIMIT_STRATEGY='moving-window'): cada acceso es
+  una fila con su marca de tiempo; contar y registrar es un único
+  INSERT ... SELECT, que toma el bloqueo de escritura antes de contar, así
+  que dos workers no pueden pasar el límite a la vez.
+- Ventana fija: un contador por clave incrementado con un UPSERT atómico.
+
+Las escrituras de todos los procesos se ordenan con flock sobre
+`<ruta>.lock` antes de llegar a SQLite: quien espera despierta apenas se
+libera el archivo, en vez de reintentar con las esperas crecientes (1, 2,
+5 ms...) del busy timeout de SQLite, que con varios workers dominaban el
+costo por verificación. En Windows (sin fcntl, un solo proceso con
+Waitress) basta el lock entre hilos.
+
+Las filas vencidas se borran cada `barrido` segundos (opción de
+RATELIMIT_STORAGE_OPTIONS) desde el propio proceso que registra accesos.
+
+Importar el módulo registra el esquema: RATELIMIT_STORAGE_URI =
+'sqlite:///cache/limites.sqlite3' (ruta relativa) o 'sqlite:////ruta/absoluta'.
+"""
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+from limits.storage import MovingWindowSupport, Storage
+
+
+class AlmacenLimitesSQLite(Storage, MovingWindowSupport):
+    """Backend de `limits` sobre un archivo SQLite compartido entre procesos"""
+
+    STORAGE_SCHEME = ['sqlite']
+
+    def __init__(self, uri, wrap_exceptions=False, barrido=60, **options):
+        ruta = urlparse(uri).path[1:]
+        if not ruta:
+            raise ValueError(f'RATELIMIT_STORAGE_URI sin ruta de archivo: {uri}')
+        self.ruta = ruta
+        self.barrido = float(barrido)
+        self._proximo_barrido = 0
+        self._local = threading.local()
+        self._hilos = threading.Lock()
+        self._cerrojo_fd = None
+        self._cerrojo_pid = None
+        os.makedirs(os.path.dirname(os.path.abspath(ruta)), exist_ok=True)
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    def _conexion(self):
+        # Una conexión por hilo y por proceso (no se comparten tras el fork)
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.ruta, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.executescript('''
+                CREATE TABLE IF NOT EXISTS contadores (
+                    clave TEXT PRIMARY KEY,
+                    valor INTEGER NOT NULL,
+                    expira REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS ventanas (
+                    clave TEXT NOT NULL,
+                    momento REAL NOT NULL,
+                    expira REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_ventanas_clave_momento ON ventanas (clave, momento);
+                CREATE INDEX IF NOT EXISTS idx_ventanas_expira ON ventanas (expira);
+                CREATE INDEX IF NOT EXISTS idx_contadores_expira ON contadores (expira);
+            ''')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @contextmanager
+    def _escritura(self):
+        """Una escritura a la vez entre hilos y, con fcntl, entre procesos"""
+        with self._hilos:
+            if fcntl is None:
+                yield
+                return
+            # Descriptor propio de cada proceso: flock no excluye a quien comparte
+            # el descriptor heredado del fork
+            if self._cerrojo_pid != os.getpid():
+                self._cerrojo_fd = os.open(self.ruta + '.lock', os.O_RDWR | os.O_CREAT, 0o644)
+                self._cerrojo_pid = os.getpid()
+            fcntl.flock(self._cerrojo_fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._cerrojo_fd, fcntl.LOCK_UN)
+
+    def _barrer_si_toca(self, conn, ahora):
+        if ahora >= self._proximo_barrido:
+            self._proximo_barrido = ahora + self.barrido
+            self.barrer(conn)
+
+    def barrer(self, conn=None):
+        """
+        Borra los contadores y accesos vencidos.
+
+        Returns:
+            Cantidad de filas borradas
+        """
+        conn = conn or self._conexion()
+        ahora = time.time()
+        with self._escritura():
+            borradas = conn.execute('DELETE FROM ventanas WHERE expira <= ?', (ahora,)).rowcount
+            borradas += conn.execute('DELETE FROM contadores WHERE expira <= ?', (ahora,)).rowcount
+        return borradas
+
+    # Ventana fija
+
+    def incr(self, key, expiry, elastic_expiry=False, amount=1):
+        conn = self._conexion()
+        ahora = time.time()
+        self._barrer_si_toca(conn, ahora)
+        # Un contador vencido vuelve a empezar; con elastic_expiry cada acceso renueva el vencimiento
+        with self._escritura():
+            fila = conn.execute('''
+                INSERT INTO contadores (clave, valor, expira) VALUES (?, ?, ?)
+                ON CONFLICT (clave) DO UPDATE SET
+                    valor = CASE WHEN expira <= ? THEN excluded.valor ELSE valor + excluded.valor END,
+                    expira = CASE WHEN expira <= ? OR ? THEN excluded.expira ELSE expira END
+                RETURNING valor
+            ''', (key, amount, ahora + expiry, ahora, ahora, bool(elastic_expiry))).fetchone()
+        return fila[0]
+
+    def get(self, key):
+        fila = self._conexion().execute(
+            'SELECT valor FROM contadores WHERE clave = ? AND expira > ?', (key, time.time())
+        ).fetchone()
+        return fila[0] if fila else 0
+
+    def get_expiry(self, key):
+        ahora = time.time()
+        fila = self._conexion().execute(
+            'SELECT expira FROM contadores WHERE clave = ? AND expira > ?', (key, ahora)
+        ).fetchone()
+        return fila[0] if fila else ahora
+
+    def check(self):
+        try:
+            self._conexion().execute('SELECT 1').fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self):
+        conn = self._conexion()
+        with self._escritura():
+            borradas = conn.execute('DELETE FROM contadores').rowcount
+            borradas += conn.execute('DELETE FROM ventanas').rowcount
+        return borradas
+
+    def clear(self, key):
+        conn = self._conexion()
+        with self._escritura():
+            conn.execute('DELETE FROM contadores WHERE clave = ?', (key,))
+            conn.execute('DELETE FROM ventanas WHERE clave = ?', (key,))
+
+    # Ventana deslizante
+
+    def acquire_entry(self, key, limit, expiry, amount=1):
+        if amount > limit:
+            return False
+        conn = self._conexion()
+        ahora = time.time()
+        self._barrer_si_toca(conn, ahora)
+        # Una sola sentencia: SQLite toma el bloqueo de escritura al empezar el
+        # INSERT, antes del SELECT que cuenta, así que contar e insertar es
+        # atómico entre todos los procesos. Las `amount` filas salen de un CTE
+        # dentro del FROM (si la sentencia empieza con WITH, el sqlite3 de Python
+        # no siempre informa rowcount).
+        with self._escritura():
+            return conn.execute('''
+                INSERT INTO ventanas (clave, momento, expira)
+                SELECT ?, ?, ? FROM (
+                    WITH RECURSIVE filas (n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM filas WHERE n < ?)
+                    SELECT n FROM filas
+                )
+                WHERE (SELECT COUNT(*) FROM ventanas WHERE clave = ? AND momento > ?) + ? <= ?
+            ''', (key, ahora, ahora + expiry, amount, key, ahora - expiry, amount, limit)).rowcount > 0
+
+    def get_moving_window(self, key, limit, expiry):
+        ahora = time.time()
+        inicio, usados = self._conexion().execute(
+            'SELECT MIN(momento), COUNT(*) FROM ventanas WHERE clave = ? AND momento > ?',
+            (key, ahora - expiry)
+        ).fetchone()
+        return (inicio if usados else ahora), usados
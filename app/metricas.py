@@ -0,0 +1,334 @@
+"""
+Métricas por petición: consultas a MySQL, tiempo en la base de datos, filas
+leídas y tiempo de render de las plantillas.
+
+Mientras se mide una petición, `mysql.connection` entrega una
+ConexionMedida: sus cursores (CursorMedido) cronometran execute,
+executemany y callproc y cuentan las filas que devuelven fetch* o la
+iteración (app/detector_consultas.py recibe además cada consulta con su
+duración). El render se mide con las señales before_render_template y
+template_rendered de Flask. Las consultas de una respuesta en streaming que
+ocurren después de enviar los encabezados no se cuentan.
+
+Al terminar cada petición se agrega el encabezado Server-Timing (db, render
+y total, visible en la pestaña de red del navegador) y los valores se suman
+a los histogramas del endpoint en este worker. Cada worker vuelca sus
+histogramas cada METRICAS_INTERVALO segundos a un archivo JSON propio en
+METRICAS_DIR (escritura atómica con os.replace, sin bloqueos entre
+procesos); /metrics suma los archivos de todos los workers y responde en el
+formato de texto de Prometheus. Solo pueden leerlo los administradores o
+quien envíe `Authorization: Bearer <METRICAS_TOKEN>`.
+"""
+import glob
+import hmac
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+
+from flask import Response, abort, before_render_template, g, redirect, request, template_rendered, url_for
+
+PREFIJO = 'consultorio_'
+
+SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# nombre -> (descripción, límites superiores de los buckets)
+HISTOGRAMAS = {
+    'peticion_segundos': ('Duración de la petición hasta armar la respuesta', SEGUNDOS),
+    'db_segundos': ('Tiempo en MySQL por petición', SEGUNDOS),
+    'render_segundos': ('Tiempo de render de plantillas por petición', SEGUNDOS),
+    'consultas': ('Consultas a MySQL por petición', (0, 1, 2, 5, 10, 20, 50, 100)),
+    'filas': ('Filas leídas de MySQL por petición', (0, 10, 100, 1000, 10000, 100000)),
+}
+
+
+class MedicionPeticion:
+    """Acumuladores de la petición actual (en g.metricas)"""
+
+    __slots__ = ('inicio', 'consultas', 'db', 'filas', 'render', 'renders', 'registrar_consulta')
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.consultas = 0
+        self.db = 0.0
+        self.filas = 0
+        self.render = 0.0
+        self.renders = []
+        # (sql, duración) de cada consulta; lo usa app/detector_consultas.py
+        self.registrar_consulta = None
+
+
+class CursorMedido:
+    """Cursor de MySQLdb que suma sus consultas, tiempos y filas a la medición"""
+
+    def __init__(self, cursor, medicion):
+        self._cursor = cursor
+        self._medicion = medicion
+
+    def _medir(self, metodo, args, kwargs, consulta=True):
+        inicio = time.perf_counter()
+        try:
+            return metodo(*args, **kwargs)
+        finally:
+            duracion = time.perf_counter() - inicio
+            self._medicion.db += duracion
+            if consulta:
+                self._medicion.consultas += 1
+                if self._medicion.registrar_consulta is not None:
+                    self._medicion.registrar_consulta(args[0] if args else kwargs.get('query', ''), duracion)
+
+    def execute(self, *args, **kwargs):
+        return self._medir(self._cursor.execute, args, kwargs)
+
+    def executemany(self, *args, **kwargs):
+        return self._medir(self._cursor.executemany, args, kwargs)
+
+    def callproc(self, *args, **kwargs):
+        return self._medir(self._cursor.callproc, args, kwargs)
+
+    # Con SSCursor las filas llegan del servidor al leerlas: también es tiempo de MySQL
+    def fetchone(self):
+        fila = self._medir(self._cursor.fetchone, (), {}, consulta=False)
+        if fila is not None:
+            self._medicion.filas += 1
+        return fila
+
+    def fetchmany(self, *args, **kwargs):
+        filas = self._medir(self._cursor.fetchmany, args, kwargs, consulta=False)
+        self._medicion.filas += len(filas)
+        return filas
+
+    def fetchall(self):
+        filas = self._medir(self._cursor.fetchall, (), {}, consulta=False)
+        self._medicion.filas += len(filas)
+        return filas
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return self._cursor.__exit__(*exc_info)
+
+    def __getattr__(self, nombre):
+        return getattr(self._cursor, nombre)
+
+
+class ConexionMedida:
+    """Conexión del pool cuyos cursores son CursorMedido"""
+
+    def __init__(self, conn, medicion):
+        self._conn = conn
+        self._medicion = medicion
+
+    def cursor(self, *args, **kwargs):
+        return CursorMedido(self._conn.cursor(*args, **kwargs), self._medicion)
+
+    def commit(self):
+        inicio = time.perf_counter()
+        try:
+            return self._conn.commit()
+        finally:
+            self._medicion.db += time.perf_counter() - inicio
+
+    def __getattr__(self, nombre):
+        return getattr(self._conn, nombre)
+
+
+def _etiqueta(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Metricas:
+    """Histogramas por endpoint de este worker, volcados a disco para /metrics"""
+
+    def __init__(self):
+        self.habilitadas = False
+        self.directorio = os.path.join('cache', 'metricas')
+        self.intervalo = 5
+        self.retencion = 86400
+        self.token = ''
+        self.server_timing = True
+        self._lock = threading.Lock()
+        self._pid = None
+        self._archivo = None
+        self._proximo_volcado = 0
+        self._histogramas = {}
+        self._peticiones = {}
+
+    def init_app(self, app):
+        app.config.setdefault('METRICAS_HABILITADAS', True)
+        app.config.setdefault('METRICAS_DIR', os.path.join('cache', 'metricas'))
+        app.config.setdefault('METRICAS_INTERVALO', 5)
+        app.config.setdefault('METRICAS_RETENCION', 86400)
+        app.config.setdefault('METRICAS_TOKEN', '')
+        app.config.setdefault('METRICAS_SERVER_TIMING', True)
+
+        self.habilitadas = bool(app.config['METRICAS_HABILITADAS'])
+        if not self.habilitadas:
+            return
+        self.directorio = os.path.abspath(app.config['METRICAS_DIR'])
+        self.intervalo = float(app.config['METRICAS_INTERVALO'])
+        self.retencion = float(app.config['METRICAS_RETENCION'])
+        self.token = app.config['METRICAS_TOKEN'] or ''
+        self.server_timing = bool(app.config['METRICAS_SERVER_TIMING'])
+        os.makedirs(self.directorio, exist_ok=True)
+
+        app.before_request(self._iniciar)
+        app.after_request(self._finalizar)
+        before_render_template.connect(self._antes_de_render, app)
+        template_rendered.connect(self._despues_de_render, app)
+
+        # Prometheus consulta cada pocos segundos: sin los límites por defecto
+        from app import limiter
+        app.add_url_rule('/metrics', 'metricas', limiter.exempt(self.vista))
+
+    # Medición de la petición
+
+    def _iniciar(self):
+        if request.endpoint != 'static':
+            g.metricas = MedicionPeticion()
+
+    @staticmethod
+    def _antes_de_render(sender, template, context, **extra):
+        medicion = g.get('metricas')
+        if medicion is not None:
+            medicion.renders.append(time.perf_counter())
+
+    @staticmethod
+    def _despues_de_render(sender, template, context, **extra):
+        medicion = g.get('metricas')
+        if medicion is not None and medicion.renders:
+            medicion.render += time.perf_counter() - medicion.renders.pop()
+
+    def _finalizar(self, response):
+        medicion = g.pop('metricas', None)
+        if medicion is None:
+            return response
+        total = time.perf_counter() - medicion.inicio
+        if self.server_timing:
+            response.headers['Server-Timing'] = (
+                f'db;dur={medicion.db * 1000:.1f};desc="{medicion.consultas} consultas, {medicion.filas} filas", '
+                f'render;dur={medicion.render * 1000:.1f}, total;dur={total * 1000:.1f}'
+            )
+        self.registrar(request.endpoint or 'sin_endpoint', request.method, response.status_code, {
+            'peticion_segundos': total,
+            'db_segundos': medicion.db,
+            'render_segundos': medicion.render,
+            'consultas': medicion.consultas,
+            'filas': medicion.filas,
+        })
+        return response
+
+    def conexion(self, conn):
+        """`conn` envuelta para medir sus consultas si la petición actual se está midiendo"""
+        medicion = g.get('metricas')
+        return conn if medicion is None else ConexionMedida(conn, medicion)
+
+    # Histogramas del worker
+
+    def _reiniciar_si_fork(self):
+        # Los valores de antes del fork pertenecen al proceso padre
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._archivo = os.path.join(self.directorio, f'{self._pid}-{int(time.time())}.json')
+            self._histogramas = {}
+            self._peticiones = {}
+
+    def registrar(self, endpoint, metodo, status, valores):
+        with self._lock:
+            self._reiniciar_si_fork()
+            clave = f'{endpoint}\t{metodo}\t{status}'
+            self._peticiones[clave] = self._peticiones.get(clave, 0) + 1
+            for nombre, valor in valores.items():
+                limites = HISTOGRAMAS[nombre][1]
+                clave = f'{nombre}\t{endpoint}'
+                # [cuenta por bucket..., suma, cantidad]; lo que supera el último límite solo va a +Inf
+                datos = self._histogramas.get(clave)
+                if datos is None:
+                    datos = self._histogramas[clave] = [0] * len(limites) + [0, 0]
+                posicion = bisect_left(limites, valor)
+                if posicion < len(limites):
+                    datos[posicion] += 1
+                datos[-2] += valor
+                datos[-1] += 1
+            if time.monotonic() >= self._proximo_volcado:
+                self._volcar()
+
+    def _volcar(self):
+        self._proximo_volcado = time.monotonic() + self.intervalo
+        temporal = f'{self._archivo}.tmp'
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump({'histogramas': self._histogramas, 'peticiones': self._peticiones}, f)
+        os.replace(temporal, self._archivo)
+
+    def combinar(self):
+        """Suma los archivos de todos los workers; borra los que no se actualizan hace METRICAS_RETENCION"""
+        with self._lock:
+            self._reiniciar_si_fork()
+            self._volcar()
+        histogramas, peticiones = {}, {}
+        limite = time.time() - self.retencion
+        for ruta in glob.glob(os.path.join(self.directorio, '*.json')):
+            try:
+                if os.path.getmtime(ruta) < limite:
+                    os.remove(ruta)
+                    continue
+                with open(ruta, encoding='utf-8') as f:
+                    datos = json.load(f)
+            except (OSError, ValueError):
+                continue
+            for clave, valores in datos['histogramas'].items():
+                acumulado = histogramas.setdefault(clave, [0] * len(valores))
+                for i, valor in enumerate(valores):
+                    acumulado[i] += valor
+            for clave, cantidad in datos['peticiones'].items():
+                peticiones[clave] = peticiones.get(clave, 0) + cantidad
+        return histogramas, peticiones
+
+    def texto_prometheus(self):
+        histogramas, peticiones = self.combinar()
+        lineas = [
+            f'# HELP {PREFIJO}peticiones_total Peticiones por endpoint, método y código de estado',
+            f'# TYPE {PREFIJO}peticiones_total counter',
+        ]
+        for clave in sorted(peticiones):
+            endpoint, metodo, status = clave.split('\t')
+            lineas.append(f'{PREFIJO}peticiones_total{{endpoint="{_etiqueta(endpoint)}",'
+                          f'metodo="{metodo}",estado="{status}"}} {peticiones[clave]}')
+
+        for nombre, (descripcion, limites) in HISTOGRAMAS.items():
+            metrica = PREFIJO + nombre
+            lineas.append(f'# HELP {metrica} {descripcion}')
+            lineas.append(f'# TYPE {metrica} histogram')
+            for clave in sorted(c for c in histogramas if c.split('\t', 1)[0] == nombre):
+                datos = histogramas[clave]
+                endpoint = _etiqueta(clave.split('\t', 1)[1])
+                acumulado = 0
+                for limite, cuenta in zip(limites, datos):
+                    acumulado += cuenta
+                    lineas.append(f'{metrica}_bucket{{endpoint="{endpoint}",le="{limite}"}} {acumulado}')
+                lineas.append(f'{metrica}_bucket{{endpoint="{endpoint}",le="+Inf"}} {datos[-1]}')
+                lineas.append(f'{metrica}_sum{{endpoint="{endpoint}"}} {datos[-2]:.6f}')
+                lineas.append(f'{metrica}_count{{endpoint="{endpoint}"}} {datos[-1]}')
+        return '\n'.join(lineas) + '\n'
+
+    def vista(self):
+        """Histogramas de todos los workers en formato de texto de Prometheus"""
+        from flask_login import current_user
+
+        autorizacion = request.headers.get('Authorization', '')
+        por_token = bool(self.token) and hmac.compare_digest(autorizacion.encode(),
+                                                              f'Bearer {self.token}'.encode())
+        if not por_token:
+            if not current_user.is_authenticated:
+                return redirect(url_for('auth.login'))
+            if not current_user.is_admin:
+                abort(403)
+        return Response(self.texto_prometheus(), mimetype='text/plain; version=0.0.4')
+
+
+metricas = Metricas()
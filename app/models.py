@@ -1,18 +1,78 @@
 from app import mysql
-from datetime import datetime
+from app.disponibilidad import indice_ocupacion
+from app import resumen_citas, estadisticas
+from app.versiones import (versiones, RECURSO_CITAS, RECURSO_PACIENTES, RECURSO_DOCTORES, recurso_fecha,
+                           recurso_doctor, recurso_paciente)
+from app.paginacion import condicion_prefijo_id, es_numero, listar_tabla
+from app.contrasenas import pool_hash
+from app.cache import (cache_listas, cache_usuarios, CLAVES_PACIENTES, CLAVES_DOCTORES, PACIENTES_POR_NOMBRE,
+                       PACIENTES_POR_APELLIDO, DOCTORES_POR_NOMBRE, DOCTORES_POR_APELLIDO)
+from datetime import datetime, date, timedelta
+from MySQLdb import IntegrityError
 from flask_login import UserMixin
-from werkzeug.security import check_password_hash, generate_password_hash
 import random
+import re
 import string
 
+# Código de error MySQL para clave única duplicada
+ER_DUP_ENTRY = 1062
+
+# Tamaño mínimo de palabra del índice FULLTEXT de InnoDB (innodb_ft_min_token_size)
+FULLTEXT_MIN_TOKEN = 3
+
+
+def rango_mes(año, mes):
+    """Devuelve (primer día del mes, primer día del mes siguiente)"""
+    inicio = date(año, mes, 1)
+    fin = date(año + 1, 1, 1) if mes == 12 else date(año, mes + 1, 1)
+    return inicio, fin
+
+
+class CitaNoDisponibleError(ValueError):
+    """El horario ya está ocupado (violación de unique_fecha_hora o unique_doctor_fecha_hora)"""
+
+    def __init__(self, fecha, hora):
+        self.fecha = fecha
+        self.hora = hora
+        super().__init__(f'Ya existe una cita programada para el {fecha} a las {hora}')
+
 class Paciente:
     @staticmethod
-    def obtener_todos():
+    def obtener_todos(orden='nombre'):
+        """(id_paciente, nombre, apellido) de todos los pacientes, ordenados por 'nombre' o 'apellido' (cacheado)"""
+        if orden == 'apellido':
+            clave, order_by = PACIENTES_POR_APELLIDO, 'apellido, nombre'
+        else:
+            clave, order_by = PACIENTES_POR_NOMBRE, 'nombre, apellido'
+
+        def cargar():
+            cur = mysql.connection.cursor()
+            try:
+                cur.execute(f'SELECT id_paciente, nombre, apellido FROM pacientes ORDER BY {order_by}')
+                return cur.fetchall()
+            finally:
+                cur.close()
+
+        return cache_listas.obtener(clave, cargar)
+
+    @staticmethod
+    def invalidar_cache():
+        """Descarta las listas cacheadas tras crear, editar o eliminar pacientes"""
+        cache_listas.invalidar(*CLAVES_PACIENTES)
+        versiones.invalidar(RECURSO_PACIENTES)
+
+    @staticmethod
+    def listar(**parametros):
+        """Página del listado de pacientes (ver paginacion.listar_tabla)"""
         cur = mysql.connection.cursor()
-        cur.execute('SELECT id_paciente, nombre, apellido FROM pacientes ORDER BY nombre, apellido')
-        pacientes = cur.fetchall()
-        cur.close()
-        return pacientes
+        try:
+            return listar_tabla(
+                cur, 'pacientes', 'id_paciente',
+                ['id_paciente', 'nombre', 'apellido', 'telefono', 'email', 'fecha_nacimiento'],
+                **parametros
+            )
+        finally:
+            cur.close()
     
     def __init__(self, id_paciente, nombre, apellido, telefono, email, fecha_nacimiento):
         self.id_paciente = id_paciente
@@ -71,6 +131,7 @@ class Paciente:
         ''', (id_paciente, nombre, apellido, telefono, email, fecha_nacimiento))
         mysql.connection.commit()
         cur.close()
+        Paciente.invalidar_cache()
 
     @staticmethod
     def actualizar(id_paciente, nombre, apellido, telefono, email, fecha_nacimiento):
@@ -90,20 +151,116 @@ class Paciente:
             mysql.connection.commit()
         finally:
             if cur:
-                cur.close()      
+                cur.close()
+            Paciente.invalidar_cache()
 
-class Doctor:
     @staticmethod
-    def obtener_todos():
-        """Obtiene todos los doctores ordenados por nombre y apellido"""
+    def buscar(termino, limite=10):
+        """
+        Búsqueda para autocompletar por cédula, nombre o apellido.
+
+        Todas las ramas usan índices y se cortan en `limite`:
+        - Solo dígitos: prefijo de cédula como rangos sobre la clave primaria.
+        - Texto: prefijo de la primera palabra en nombre o apellido (índices
+          B-tree) más, si todas las palabras tienen al menos
+          FULLTEXT_MIN_TOKEN letras, el índice FULLTEXT, que también
+          encuentra palabras que no están al inicio (segundo apellido).
+
+        Returns:
+            Lista de (id_paciente, nombre, apellido) ordenada por apellido y nombre
+        """
+        termino = ' '.join((termino or '').split())
+        if not termino:
+            return []
+
         cur = mysql.connection.cursor()
         try:
-            cur.execute('SELECT id_doctor, nombre, apellido FROM doctores ORDER BY nombre, apellido')
-            doctores = cur.fetchall()
-            return doctores
+            if es_numero(termino):
+                # Cédulas que empiezan por el prefijo: un rango por cada longitud posible
+                condicion, params = condicion_prefijo_id('id_paciente', termino)
+                if condicion is None:
+                    return []
+                cur.execute(f'''
+                    SELECT id_paciente, nombre, apellido
+                    FROM pacientes
+                    WHERE {condicion}
+                    ORDER BY id_paciente
+                    LIMIT %s
+                ''', params + [limite])
+                return cur.fetchall()
+
+            palabras = re.findall(r'\w+', termino)
+            if not palabras:
+                return []
+            # '_' es comodín en LIKE
+            prefijos = [p.replace('_', '\\_') + '%' for p in palabras]
+
+            # Las palabras siguientes a la primera filtran por prefijo en cualquiera de las dos columnas
+            filtro_resto = ''.join(' AND (nombre LIKE %s OR apellido LIKE %s)' for _ in prefijos[1:])
+            params_resto = [p for prefijo in prefijos[1:] for p in (prefijo, prefijo)]
+
+            ramas = [
+                f'(SELECT id_paciente, nombre, apellido FROM pacientes '
+                f'WHERE apellido LIKE %s{filtro_resto} ORDER BY apellido, nombre LIMIT %s)',
+                f'(SELECT id_paciente, nombre, apellido FROM pacientes '
+                f'WHERE nombre LIKE %s{filtro_resto} ORDER BY nombre, apellido LIMIT %s)',
+            ]
+            params = [prefijos[0], *params_resto, limite, prefijos[0], *params_resto, limite]
+
+            if all(len(p) >= FULLTEXT_MIN_TOKEN for p in palabras):
+                ramas.append(
+                    '(SELECT id_paciente, nombre, apellido FROM pacientes '
+                    'WHERE MATCH(nombre, apellido) AGAINST (%s IN BOOLEAN MODE) LIMIT %s)'
+                )
+                params += [' '.join(f'+{p}*' for p in palabras), limite]
+
+            cur.execute(
+                ' UNION '.join(ramas) + ' ORDER BY apellido, nombre LIMIT %s',
+                params + [limite]
+            )
+            return cur.fetchall()
+        finally:
+            cur.close()
+
+class Doctor:
+    @staticmethod
+    def obtener_todos(orden='nombre'):
+        """Obtiene todos los doctores ordenados por 'nombre' o 'apellido' (cacheado)"""
+        if orden == 'apellido':
+            clave, order_by = DOCTORES_POR_APELLIDO, 'apellido, nombre'
+        else:
+            clave, order_by = DOCTORES_POR_NOMBRE, 'nombre, apellido'
+
+        def cargar():
+            cur = mysql.connection.cursor()
+            try:
+                cur.execute(f'SELECT id_doctor, nombre, apellido FROM doctores ORDER BY {order_by}')
+                return cur.fetchall()
+            finally:
+                cur.close()
+
+        try:
+            return cache_listas.obtener(clave, cargar)
         except Exception as e:
             print(f"Error al obtener todos los doctores: {str(e)}")
             return []
+
+    @staticmethod
+    def invalidar_cache():
+        """Descarta las listas cacheadas tras crear, editar o eliminar doctores"""
+        cache_listas.invalidar(*CLAVES_DOCTORES)
+        versiones.invalidar(RECURSO_DOCTORES)
+
+    @staticmethod
+    def listar(**parametros):
+        """Página del listado de doctores (ver paginacion.listar_tabla)"""
+        cur = mysql.connection.cursor()
+        try:
+            return listar_tabla(
+                cur, 'doctores', 'id_doctor',
+                ['id_doctor', 'nombre', 'apellido', 'telefono'],
+                **parametros
+            )
         finally:
             cur.close()
     
@@ -161,6 +318,7 @@ class Doctor:
                 VALUES (%s, %s, %s, %s)
             ''', (id_doctor, nombre, apellido, telefono))
             mysql.connection.commit()
+            Doctor.invalidar_cache()
             return cur.lastrowid  # Devuelve el ID del nuevo doctor
         except Exception as e:
             mysql.connection.rollback()
@@ -183,6 +341,7 @@ class Doctor:
                 WHERE id_doctor = %s
             ''', (nombre, apellido, telefono, id_doctor))
             mysql.connection.commit()
+            Doctor.invalidar_cache()
             return cur.rowcount > 0  # Devuelve True si se actualizó algún registro
         except Exception as e:
             mysql.connection.rollback()
@@ -263,11 +422,12 @@ class Cita:
             query += ' AND c.fecha = %s'
             params.append(fecha)
         
-        # Filtrar por año y mes
+        # Filtrar por año y mes como rango semiabierto [inicio, inicio del mes siguiente)
+        # para que MySQL pueda usar el índice sobre fecha
         if año_mes is not None:
-            año, mes = año_mes
-            query += ' AND YEAR(c.fecha) = %s AND MONTH(c.fecha) = %s'
-            params.extend([año, mes])
+            inicio, fin = rango_mes(*año_mes)
+            query += ' AND c.fecha >= %s AND c.fecha < %s'
+            params.extend([inicio, fin])
         
         # Ordenar los resultados
         query += ' ORDER BY c.fecha ASC, c.hora ASC'
@@ -279,6 +439,68 @@ class Cita:
         cur.close()
         return citas
 
+    @staticmethod
+    def obtener_programadas():
+        """Citas programadas, más recientes primero (vista de agendamiento)"""
+        cur = mysql.connection.cursor()
+        try:
+            cur.execute('''
+                SELECT 
+                    c.id_cita,
+                    c.fecha,
+                    c.hora,
+                    c.estado,
+                    c.motivo,
+                    p.nombre,
+                    p.apellido,
+                    d.nombre,
+                    d.apellido         
+                FROM citas c 
+                JOIN pacientes p ON c.id_paciente = p.id_paciente 
+                JOIN doctores d ON c.id_doctor = d.id_doctor        
+                WHERE c.estado = 'programada'
+                ORDER BY c.fecha DESC, c.hora DESC
+            ''')
+            return cur.fetchall()
+        finally:
+            cur.close()
+
+    @staticmethod
+    def contar_por_estado(fecha=None, año_mes=None):
+        """
+        Cantidad de citas por estado del día o del mes, leída de resumen_citas.
+
+        Returns:
+            Diccionario {estado: total}
+        """
+        if año_mes is not None:
+            desde, hasta = rango_mes(*año_mes)
+        else:
+            desde, hasta = fecha, fecha + timedelta(days=1)
+        cur = mysql.connection.cursor()
+        try:
+            return resumen_citas.contar_por_estado(cur, desde, hasta)
+        finally:
+            cur.close()
+
+    @staticmethod
+    def _clave_resumen(cur, id_cita):
+        """(fecha, id_doctor, estado, id_paciente) actual de la cita, bloqueando su fila hasta el commit"""
+        cur.execute('SELECT fecha, id_doctor, estado, id_paciente FROM citas WHERE id_cita = %s FOR UPDATE',
+                    (id_cita,))
+        fila = cur.fetchone()
+        return tuple(fila) if fila else None
+
+    @staticmethod
+    def _invalidar_versiones(fechas, id_doctor, id_paciente):
+        """Nuevos sellos de versión para las respuestas que muestran la cita"""
+        afectados = [RECURSO_CITAS] + [recurso_fecha(f) for f in set(fechas)]
+        if id_doctor is not None:
+            afectados.append(recurso_doctor(id_doctor))
+        if id_paciente is not None:
+            afectados.append(recurso_paciente(id_paciente))
+        versiones.invalidar(*afectados)
+
     @staticmethod
     def verificar_disponibilidad(fecha, hora, excluir_id=None):
         """Verifica si existe una cita en la fecha y hora especificadas"""
@@ -302,45 +524,85 @@ class Cita:
 
     @staticmethod
     def crear(id_paciente, id_doctor, fecha, hora, motivo):
-        # Primero verificar disponibilidad
-        if Cita.verificar_disponibilidad(fecha, hora):
-            raise ValueError(f'Ya existe una cita programada para el {fecha} a las {hora}')
-        
+        """
+        Crea la cita en un solo INSERT. La disponibilidad la garantizan las
+        claves únicas de la tabla, así que dos reservas simultáneas del mismo
+        horario no pueden colarse entre una verificación y la inserción.
+        """
         cur = mysql.connection.cursor()
         try:
+            # La marca de estadísticas va antes que la fila de la cita: mismo orden
+            # de bloqueos que estadisticas.refrescar (primero la marca de la fecha)
+            estadisticas.marcar_pendientes(cur, fecha)
             cur.execute('''
                 INSERT INTO citas (id_paciente, id_doctor, fecha, hora, motivo, estado)
                 VALUES (%s, %s, %s, %s, %s, %s)
             ''', (id_paciente, id_doctor, fecha, hora, motivo, 'programada'))
+            id_cita = cur.lastrowid
+            resumen_citas.sumar(cur, fecha, id_doctor, 'programada', 1)
             mysql.connection.commit()
+            Cita._invalidar_versiones([fecha], id_doctor, id_paciente)
+            return id_cita
+        except IntegrityError as e:
+            mysql.connection.rollback()
+            if e.args and e.args[0] == ER_DUP_ENTRY:
+                raise CitaNoDisponibleError(fecha, hora) from e
+            raise
         finally:
             cur.close()
+            indice_ocupacion.invalidar(fecha)
 
     @staticmethod
     def actualizar(id_cita, fecha, hora, motivo, estado):
-        # Verificar disponibilidad excluyendo la cita actual
-        if Cita.verificar_disponibilidad(fecha, hora, excluir_id=id_cita):
-            raise ValueError(f'Ya existe una cita programada para el {fecha} a las {hora}')
-        
         cur = mysql.connection.cursor()
+        anterior = None
         try:
+            anterior = Cita._clave_resumen(cur, id_cita)
             cur.execute('''
                 UPDATE citas 
                 SET fecha=%s, hora=%s, motivo=%s, estado=%s
                 WHERE id_cita=%s
             ''', (fecha, hora, motivo, estado, id_cita))
+            if anterior is not None:
+                resumen_citas.mover(cur, anterior[:3], (fecha, anterior[1], estado))
+                estadisticas.marcar_pendientes(cur, anterior[0], fecha)
             mysql.connection.commit()
+            if anterior is not None:
+                Cita._invalidar_versiones([anterior[0], fecha], anterior[1], anterior[3])
+        except IntegrityError as e:
+            mysql.connection.rollback()
+            if e.args and e.args[0] == ER_DUP_ENTRY:
+                raise CitaNoDisponibleError(fecha, hora) from e
+            raise
+        except Exception:
+            mysql.connection.rollback()
+            raise
         finally:
             cur.close()
+            indice_ocupacion.invalidar(fecha)
+            if anterior is not None:
+                indice_ocupacion.invalidar(anterior[0])
 
     @staticmethod
     def eliminar(id_cita):
         cur = mysql.connection.cursor()
+        anterior = None
         try:
+            anterior = Cita._clave_resumen(cur, id_cita)
             cur.execute('DELETE FROM citas WHERE id_cita=%s', (id_cita,))
+            if anterior is not None:
+                resumen_citas.mover(cur, anterior[:3], None)
+                estadisticas.marcar_pendientes(cur, anterior[0])
             mysql.connection.commit()
+            if anterior is not None:
+                Cita._invalidar_versiones([anterior[0]], anterior[1], anterior[3])
+        except Exception:
+            mysql.connection.rollback()
+            raise
         finally:
             cur.close()
+            if anterior is not None:
+                indice_ocupacion.invalidar(anterior[0])
 
     @staticmethod
     def obtener_por_id(id_cita):
@@ -405,6 +667,20 @@ class Usuario(UserMixin):
     def is_active(self):
         return self.activo
 
+    @staticmethod
+    def get_by_id_cacheado(user_id):
+        """get_by_id con la caché de usuarios del worker (usado por Flask-Login)"""
+        try:
+            user_id = int(user_id)
+        except (TypeError, ValueError):
+            return None
+        return cache_usuarios.obtener(user_id, lambda: Usuario.get_by_id(user_id))
+
+    @staticmethod
+    def invalidar_cache(user_id):
+        """Invalida el usuario cacheado tras cambiar sus permisos, estado o contraseña"""
+        cache_usuarios.invalidar(int(user_id))
+
     @staticmethod
     def get_by_id(user_id):
         cur = mysql.connection.cursor()
@@ -442,14 +718,54 @@ class Usuario(UserMixin):
             cur.close()
 
     @staticmethod
-    def verify_password(username, password):
+    def autenticar(username, password):
+        """
+        Verifica las credenciales con una sola consulta.
+
+        El hash se comprueba en el pool de procesos (puede lanzar
+        PoolHashOcupadoError). Si el hash guardado usa un método o costo
+        distinto a PASSWORD_HASH_METODO se regenera con la contraseña recibida.
+
+        Returns:
+            (usuario, requiere_cambio_password), o (None, False) si las
+            credenciales no son válidas
+        """
         cur = mysql.connection.cursor()
         try:
-            cur.execute('SELECT password_hash FROM usuarios WHERE username = %s', (username,))
-            result = cur.fetchone()
-            if result:
-                return check_password_hash(result[0], password)
-            return False
+            cur.execute('''
+                SELECT id_usuario, username, password_hash, nombre, es_admin, activo, requiere_cambio_password
+                FROM usuarios
+                WHERE username = %s
+            ''', (username,))
+            user_data = cur.fetchone()
+        finally:
+            cur.close()
+
+        # Sin usuario se verifica igual, para no revelar por el tiempo de respuesta qué nombres existen
+        if not pool_hash.verificar(user_data[2] if user_data else None, password):
+            return None, False
+
+        id_usuario, username, password_hash, nombre, es_admin, activo, requiere_cambio = user_data
+        if pool_hash.necesita_rehash(password_hash):
+            Usuario._rehash(id_usuario, password_hash, password)
+
+        usuario = Usuario(id=id_usuario, username=username, nombre=nombre, es_admin=es_admin, activo=activo)
+        return usuario, bool(requiere_cambio)
+
+    @staticmethod
+    def _rehash(user_id, password_hash, password):
+        """Reemplaza un hash con parámetros viejos; si otro proceso ya lo cambió no hace nada"""
+        cur = mysql.connection.cursor()
+        try:
+            cur.execute('''
+                UPDATE usuarios
+                SET password_hash = %s
+                WHERE id_usuario = %s AND password_hash = %s
+            ''', (pool_hash.generar(password), user_id, password_hash))
+            mysql.connection.commit()
+        except Exception:
+            # El inicio de sesión no debe fallar por esto: se reintenta en el próximo
+            mysql.connection.rollback()
         finally:
             cur.close()
 
@@ -466,7 +782,7 @@ class Usuario(UserMixin):
         try:
             # Genera nueva contraseña
             new_password = Usuario.generate_random_password()
-            password_hash = generate_password_hash(new_password)
+            password_hash = pool_hash.generar(new_password)
             
             # Actualiza la contraseña y marca para cambio obligatorio
             cur.execute('''
@@ -476,6 +792,7 @@ class Usuario(UserMixin):
             ''', (password_hash, user_id))
             
             mysql.connection.commit()
+            Usuario.invalidar_cache(user_id)
             return new_password
         except Exception as e:
             mysql.connection.rollback()
@@ -504,6 +821,7 @@ class Usuario(UserMixin):
             ''', (nuevo_estado, user_id))
             
             mysql.connection.commit()
+            Usuario.invalidar_cache(user_id)
             return nuevo_estado
         except Exception as e:
             mysql.connection.rollback()
@@ -532,6 +850,7 @@ class Usuario(UserMixin):
             ''', (nuevo_estado, user_id))
             
             mysql.connection.commit()
+            Usuario.invalidar_cache(user_id)
             return nuevo_estado
         except Exception as e:
             mysql.connection.rollback()
@@ -553,23 +872,12 @@ class Usuario(UserMixin):
         finally:
             cur.close()
 
-    @staticmethod
-    def requiere_cambio_password(username):
-        """Verifica si el usuario necesita cambiar su contraseña"""
-        cur = mysql.connection.cursor()
-        try:
-            cur.execute('SELECT requiere_cambio_password FROM usuarios WHERE username = %s', (username,))
-            result = cur.fetchone()
-            return result[0] if result else False
-        finally:
-            cur.close()
-
     @staticmethod
     def cambiar_password(user_id, new_password):
         """Cambia la contraseña de un usuario y resetea el flag de cambio requerido"""
         cur = mysql.connection.cursor()
         try:
-            password_hash = generate_password_hash(new_password)
+            password_hash = pool_hash.generar(new_password)
             cur.execute('''
                 UPDATE usuarios 
                 SET password_hash = %s, requiere_cambio_password = FALSE 
@@ -577,6 +885,7 @@ class Usuario(UserMixin):
             ''', (password_hash, user_id))
             
             mysql.connection.commit()
+            Usuario.invalidar_cache(user_id)
             return True
         except Exception as e:
             mysql.connection.rollback()
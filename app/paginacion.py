@@ -0,0 +1,188 @@
+"""
+Paginación por clave (keyset) de los listados de pacientes y doctores.
+
+Cada página es un recorrido acotado de un índice: se continúa desde la
+clave de la última fila vista en vez de usar OFFSET, así que el costo no
+crece con el tamaño del registro. El filtro es un prefijo de la columna por
+la que se ordena, de modo que filtro y orden usan el mismo índice.
+"""
+import base64
+import json
+
+# Columnas de ordenamiento de los listados (la clave primaria desempata al final)
+ORDENES_LISTADO = {
+    'apellido': ('apellido', 'nombre'),
+    'nombre': ('nombre', 'apellido'),
+    'cedula': (),
+}
+DIRECCIONES = ('asc', 'desc')
+POR_PAGINA_OPCIONES = (10, 25, 50, 100)
+FILTRO_LARGO_MAXIMO = 100
+
+# Mayor valor de una columna INT (cédulas de pacientes y doctores)
+ID_MAXIMO = 2147483647
+
+
+class Pagina:
+    """Filas de una página y los cursores para moverse desde ella"""
+
+    def __init__(self, filas, siguiente=None, anterior=None, **parametros):
+        self.filas = filas
+        self.siguiente = siguiente
+        self.anterior = anterior
+        self.orden = parametros.get('orden', 'apellido')
+        self.direccion = parametros.get('direccion', 'asc')
+        self.filtro = parametros.get('filtro', '')
+        self.por_pagina = parametros.get('por_pagina', POR_PAGINA_OPCIONES[1])
+
+
+def codificar_cursor(valores):
+    """Cursor opaco con los valores de la clave de una fila"""
+    valor = json.dumps(list(valores), separators=(',', ':'))
+    return base64.urlsafe_b64encode(valor.encode()).decode().rstrip('=')
+
+
+def decodificar_cursor(cursor, cantidad):
+    """Devuelve la lista de valores de la clave o lanza ValueError si el cursor no es válido"""
+    try:
+        relleno = '=' * (-len(cursor) % 4)
+        valores = json.loads(base64.urlsafe_b64decode(cursor + relleno).decode())
+    except Exception:
+        raise ValueError('Cursor inválido')
+    if not isinstance(valores, list) or len(valores) != cantidad:
+        raise ValueError('Cursor inválido')
+    return valores
+
+
+def es_numero(texto):
+    """Solo dígitos ASCII: str.isdigit() acepta '²' o '٣', que int() rechaza o no son cédulas"""
+    return texto.isascii() and texto.isdigit()
+
+
+def condicion_prefijo_id(columna, prefijo):
+    """
+    Condición para ids que empiezan por los dígitos de `prefijo`, expresada
+    como un rango por cada longitud posible para que use la clave primaria.
+
+    Returns:
+        (sql, params), o (None, None) si ningún id puede empezar así
+    """
+    valor = int(prefijo)
+    if valor == 0 or valor > ID_MAXIMO:
+        return None, None
+    rangos = []
+    for extra in range(len(str(ID_MAXIMO)) - len(str(valor)) + 1):
+        desde = valor * 10 ** extra
+        if desde > ID_MAXIMO:
+            break
+        rangos.append((desde, min((valor + 1) * 10 ** extra - 1, ID_MAXIMO)))
+    sql = ' OR '.join([f'{columna} BETWEEN %s AND %s'] * len(rangos))
+    return f'({sql})', [v for rango in rangos for v in rango]
+
+
+def condicion_posterior(columnas, valores, descendente):
+    """
+    Condición "la fila va después de `valores`" en el orden de `columnas`:
+    (a > x) OR (a = x AND b > y) OR ...
+    """
+    operador = '<' if descendente else '>'
+    partes = []
+    params = []
+    for i, columna in enumerate(columnas):
+        iguales = [f'{c} = %s' for c in columnas[:i]]
+        partes.append('(' + ' AND '.join(iguales + [f'{columna} {operador} %s']) + ')')
+        params.extend(valores[:i] + [valores[i]])
+    return '(' + ' OR '.join(partes) + ')', params
+
+
+def parametros_listado(args, por_pagina_defecto):
+    """
+    Lee orden, dir, q, por_pagina y los cursores despues/antes de la query string.
+
+    Los valores fuera de las opciones permitidas se reemplazan por los de
+    defecto (no se interpolan en SQL).
+    """
+    orden = args.get('orden', 'apellido')
+    if orden not in ORDENES_LISTADO:
+        orden = 'apellido'
+    direccion = args.get('dir', 'asc')
+    if direccion not in DIRECCIONES:
+        direccion = 'asc'
+    por_pagina = args.get('por_pagina', por_pagina_defecto, type=int)
+    if por_pagina not in POR_PAGINA_OPCIONES:
+        por_pagina = por_pagina_defecto
+    return {
+        'orden': orden,
+        'direccion': direccion,
+        'filtro': ' '.join(args.get('q', '').split())[:FILTRO_LARGO_MAXIMO],
+        'por_pagina': por_pagina,
+        'cursor': args.get('antes') or args.get('despues'),
+        'anterior': bool(args.get('antes')),
+    }
+
+
+def listar_tabla(cur, tabla, id_columna, columnas, orden='apellido', direccion='asc', filtro='',
+                 cursor=None, anterior=False, por_pagina=25):
+    """
+    Página de un listado ordenado por `orden` y filtrado por prefijo.
+
+    Args:
+        cur: Cursor MySQL
+        tabla: Tabla a listar ('pacientes' o 'doctores')
+        id_columna: Clave primaria de la tabla (cédula)
+        columnas: Columnas a devolver; deben incluir id_columna, nombre y apellido
+        orden: Clave de ORDENES_LISTADO
+        direccion: 'asc' o 'desc'
+        filtro: Prefijo de la columna de orden (dígitos de la cédula si orden='cedula')
+        cursor: Cursor de la página desde la que se navega
+        anterior: True para la página previa al cursor, False para la siguiente
+        por_pagina: Cantidad de filas por página
+
+    Returns:
+        Pagina (lanza ValueError si el cursor no es válido)
+    """
+    parametros = {'orden': orden, 'direccion': direccion, 'filtro': filtro, 'por_pagina': por_pagina}
+    clave = list(ORDENES_LISTADO[orden]) + [id_columna]
+    posiciones = [columnas.index(c) for c in clave]
+
+    query = f"SELECT {', '.join(columnas)} FROM {tabla} WHERE 1 = 1"
+    params = []
+
+    if filtro:
+        if orden == 'cedula':
+            sql, valores = condicion_prefijo_id(id_columna, filtro) if es_numero(filtro) else (None, None)
+            if sql is None:
+                return Pagina([], **parametros)
+            query += f' AND {sql}'
+            params.extend(valores)
+        else:
+            query += f' AND {orden} LIKE %s'
+            params.append(filtro.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%')
+
+    # Para la página anterior se recorre el índice al revés desde el cursor
+    descendente = (direccion == 'desc') != anterior
+    if cursor:
+        sql, valores = condicion_posterior(clave, decodificar_cursor(cursor, len(clave)), descendente)
+        query += f' AND {sql}'
+        params.extend(valores)
+
+    sentido = 'DESC' if descendente else 'ASC'
+    query += ' ORDER BY ' + ', '.join(f'{c} {sentido}' for c in clave) + ' LIMIT %s'
+    params.append(por_pagina + 1)
+
+    cur.execute(query, params)
+    filas = list(cur.fetchall())
+    hay_mas = len(filas) > por_pagina
+    filas = filas[:por_pagina]
+    if not filas:
+        return Pagina([], **parametros)
+
+    def cursor_de(fila):
+        return codificar_cursor([fila[i] for i in posiciones])
+
+    if anterior:
+        filas.reverse()
+        return Pagina(filas, siguiente=cursor_de(filas[-1]),
+                      anterior=cursor_de(filas[0]) if hay_mas else None, **parametros)
+    return Pagina(filas, siguiente=cursor_de(filas[-1]) if hay_mas else None,
+                  anterior=cursor_de(filas[0]) if cursor else None, **parametros)
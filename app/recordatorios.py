@@ -0,0 +1,201 @@
+"""
+Envío masivo de recordatorios de citas.
+
+Las citas 'programada' del día se leen con una sola consulta (usa
+idx_citas_estado_fecha), la plantilla HTML se compila una vez y los
+mensajes se reparten entre varias conexiones SMTP que envían en paralelo
+respetando un tope global de mensajes por segundo. Los que fallan se dejan
+en la bandeja de salida para que se reintenten con su política de espera.
+"""
+import logging
+import smtplib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+from flask_mail import Message
+
+logger = logging.getLogger(__name__)
+
+ASUNTO_RECORDATORIO = "Recordatorio de cita médica"
+
+
+class LimitadorTasa:
+    """Reparte turnos de envío separados por 1/por_segundo, seguro entre hilos"""
+
+    def __init__(self, por_segundo):
+        self.intervalo = 1.0 / por_segundo if por_segundo and por_segundo > 0 else 0
+        self._siguiente = time.monotonic()
+        self._lock = threading.Lock()
+
+    def esperar(self):
+        if not self.intervalo:
+            return
+        with self._lock:
+            ahora = time.monotonic()
+            turno = max(ahora, self._siguiente)
+            self._siguiente = turno + self.intervalo
+        if turno > ahora:
+            time.sleep(turno - ahora)
+
+
+def citas_para_recordar(cur, fecha, reenviar=False):
+    """
+    Citas programadas de la fecha con paciente con email.
+
+    Returns:
+        Lista de (id_cita, fecha, hora, email, paciente, doctor)
+    """
+    query = '''
+        SELECT
+            c.id_cita,
+            c.fecha,
+            c.hora,
+            p.email,
+            CONCAT(p.nombre, ' ', p.apellido) as paciente,
+            CONCAT(d.nombre, ' ', d.apellido) as doctor
+        FROM citas c
+        JOIN pacientes p ON c.id_paciente = p.id_paciente
+        JOIN doctores d ON c.id_doctor = d.id_doctor
+        WHERE c.estado = 'programada' AND c.fecha = %s
+            AND p.email IS NOT NULL AND p.email <> ''
+    '''
+    if not reenviar:
+        query += " AND c.recordatorio_enviado_en IS NULL"
+    query += " ORDER BY c.hora"
+    cur.execute(query, (fecha,))
+    return cur.fetchall()
+
+
+def _enviar_porcion(app, mensajes, limitador):
+    """Envía una porción de mensajes sobre una conexión SMTP propia del hilo"""
+    from app import mail
+
+    resultados = []
+    with app.app_context():
+        pendientes = list(mensajes)
+        reconexiones = 0
+        while pendientes:
+            try:
+                with mail.connect() as smtp:
+                    while pendientes:
+                        id_cita, email, html = pendientes[0]
+                        limitador.esperar()
+                        inicio = time.perf_counter()
+                        try:
+                            smtp.send(Message(
+                                subject=ASUNTO_RECORDATORIO,
+                                recipients=[email],
+                                html=html,
+                                sender=app.config['MAIL_DEFAULT_SENDER']
+                            ))
+                            error = None
+                        except smtplib.SMTPServerDisconnected:
+                            # Se cayó la conexión: reconectar y reintentar este mensaje
+                            raise
+                        except Exception as e:
+                            error = str(e)
+                        resultados.append({
+                            'id_cita': id_cita,
+                            'email': email,
+                            'enviado': error is None,
+                            'error': error,
+                            'ms': round((time.perf_counter() - inicio) * 1000, 1),
+                        })
+                        pendientes.pop(0)
+            except Exception as e:
+                reconexiones += 1
+                if reconexiones > 2:
+                    # No hay conexión: el resto de la porción queda como fallido
+                    resultados.extend({'id_cita': id_cita, 'email': email, 'enviado': False,
+                                       'error': str(e), 'ms': 0}
+                                      for id_cita, email, _ in pendientes)
+                    pendientes = []
+    return resultados
+
+
+def enviar_recordatorios(fecha, conexiones=None, por_segundo=None, reenviar=False):
+    """
+    Envía los recordatorios de las citas programadas de `fecha`.
+
+    Debe llamarse dentro de un contexto de aplicación.
+
+    Args:
+        fecha: Día de las citas (date)
+        conexiones: Conexiones SMTP en paralelo (RECORDATORIOS_CONEXIONES)
+        por_segundo: Tope global de mensajes por segundo (RECORDATORIOS_POR_SEGUNDO)
+        reenviar: Incluir citas que ya tienen el recordatorio enviado
+
+    Returns:
+        Diccionario con el resumen del envío y el resultado por mensaje
+    """
+    from app import mysql
+    from app.correos import bandeja_salida
+
+    app = current_app._get_current_object()
+    conexiones = int(conexiones or app.config['RECORDATORIOS_CONEXIONES'])
+    por_segundo = float(por_segundo if por_segundo is not None else app.config['RECORDATORIOS_POR_SEGUNDO'])
+
+    inicio = time.perf_counter()
+    cur = mysql.connection.cursor()
+    try:
+        citas = citas_para_recordar(cur, fecha, reenviar)
+    finally:
+        cur.close()
+
+    # Plantilla compilada una sola vez para todo el lote
+    plantilla = app.jinja_env.get_template('correos/recordatorio_cita.html')
+    mensajes = [
+        (id_cita, email, plantilla.render(nombre_paciente=paciente, nombre_doctor=doctor,
+                                          fecha=fecha_cita, hora=hora))
+        for id_cita, fecha_cita, hora, email, paciente, doctor in citas
+    ]
+    html_por_cita = {id_cita: html for id_cita, _, html in mensajes}
+
+    # Repartir en porciones intercaladas, una por conexión SMTP
+    conexiones = max(1, min(conexiones, len(mensajes)))
+    porciones = [mensajes[i::conexiones] for i in range(conexiones)]
+    limitador = LimitadorTasa(por_segundo)
+    resultados = []
+    inicio_envio = time.perf_counter()
+    if mensajes:
+        with ThreadPoolExecutor(max_workers=conexiones) as executor:
+            for parcial in executor.map(lambda porcion: _enviar_porcion(app, porcion, limitador), porciones):
+                resultados.extend(parcial)
+    segundos_envio = time.perf_counter() - inicio_envio
+
+    # Los fallidos pasan a la bandeja de salida, que los reintenta con espera exponencial
+    encolados = 0
+    for resultado in resultados:
+        if not resultado['enviado']:
+            bandeja_salida.encolar(resultado['email'], ASUNTO_RECORDATORIO,
+                                   html_por_cita[resultado['id_cita']])
+            encolados += 1
+
+    marcados = [r['id_cita'] for r in resultados]
+    if marcados:
+        cur = mysql.connection.cursor()
+        try:
+            marcas = ', '.join(['%s'] * len(marcados))
+            cur.execute(f'UPDATE citas SET recordatorio_enviado_en = NOW() WHERE id_cita IN ({marcas})',
+                        marcados)
+            mysql.connection.commit()
+        finally:
+            cur.close()
+
+    enviados = sum(1 for r in resultados if r['enviado'])
+    resumen = {
+        'fecha': fecha.isoformat(),
+        'total': len(mensajes),
+        'enviados': enviados,
+        'fallidos': len(resultados) - enviados,
+        'encolados_para_reintento': encolados,
+        'conexiones': conexiones,
+        'segundos': round(time.perf_counter() - inicio, 2),
+        'mensajes_por_segundo': round(enviados / segundos_envio, 2) if segundos_envio > 0 else 0,
+        'resultados': resultados,
+    }
+    logger.info(f"Recordatorios {resumen['fecha']}: {enviados}/{len(mensajes)} enviados en "
+                f"{resumen['segundos']} s ({resumen['mensajes_por_segundo']} msg/s)")
+    return resumen
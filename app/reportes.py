@@ -0,0 +1,278 @@
+"""
+Generación de reportes de histórico de citas (Excel y PDF).
+
+No depende de Flask: lo usan tanto las rutas de exportación de `historico`
+como los procesos de exportación en segundo plano (`app.exportaciones`).
+
+openpyxl y reportlab se importan dentro de escribir_excel y escribir_pdf: la
+mayoría de las peticiones no exporta nada y así los workers arrancan sin
+cargarlas.
+"""
+import importlib.util
+from datetime import datetime, timedelta
+
+# reportlab es opcional: si no está instalado solo se exporta a Excel.
+# find_spec comprueba que exista sin importarlo
+REPORTLAB_AVAILABLE = importlib.util.find_spec('reportlab') is not None
+
+
+def _pdf_header_footer(canvas, doc):
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib import colors
+
+    canvas.saveState()
+    width, height = A4
+    # Cabecera
+    canvas.setFont('Helvetica-Bold', 12)
+    canvas.setFillColor(colors.HexColor('#0066CC'))
+    canvas.drawCentredString(width / 2.0, height - 30, 'Isis Med - Histórico de citas')
+    # Línea debajo de la cabecera
+    canvas.setStrokeColor(colors.HexColor('#0066CC'))
+    canvas.setLineWidth(1)
+    canvas.line(40, height - 36, width - 40, height - 36)
+
+    # Pie de página: número de página a la derecha
+    page_num_text = f"Página {doc.page}"
+    canvas.setFont('Helvetica', 9)
+    canvas.setFillColor(colors.grey)
+    canvas.drawRightString(width - 40, 20, page_num_text)
+    canvas.restoreState()
+
+# Mapeo de estados para visualización
+MAPEO_ESTADOS = {
+    'completada': 'Completada',
+    'cancelada': 'Cancelada'
+}
+
+# Anchos de las columnas del Excel: Fecha, Hora, Paciente, Doctor, Motivo, Estado
+ANCHOS_EXCEL = (12, 8, 32, 32, 50, 12)
+
+# Tipos de exportación y sus filtros sobre la consulta de histórico
+FILTROS_EXPORTACION = {
+    'doctor': 'c.id_doctor = %s',
+    'paciente': 'c.id_paciente = %s',
+    'fecha': 'c.fecha BETWEEN %s AND %s',
+}
+
+# Columnas del PDF según el tipo: (encabezado, índice en la fila de la consulta)
+COLUMNAS_PDF = {
+    'doctor': [('Fecha', 1), ('Hora', 2), ('Paciente', 5), ('Motivo', 4), ('Estado', 3)],
+    'paciente': [('Fecha', 1), ('Hora', 2), ('Doctor', 6), ('Motivo', 4), ('Estado', 3)],
+    'fecha': [('Fecha', 1), ('Hora', 2), ('Paciente', 5), ('Doctor', 6), ('Motivo', 4), ('Estado', 3)],
+}
+
+MIMETYPES = {
+    'excel': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'pdf': 'application/pdf',
+}
+
+EXTENSIONES = {
+    'excel': 'xlsx',
+    'pdf': 'pdf',
+}
+
+
+def mapear_estado(estado_bd):
+    """Convierte estado de BD a nombre para mostrar"""
+    if not estado_bd:
+        return 'Desconocido'
+    estado_lower = estado_bd.lower().strip()
+    return MAPEO_ESTADOS.get(estado_lower, estado_bd)
+
+
+def obtener_info(cur, tipo, params):
+    """
+    Datos para el título del reporte: (nombre, apellido) del doctor o
+    paciente, o el rango de fechas. Devuelve None si no existe.
+    """
+    if tipo == 'doctor':
+        cur.execute('SELECT nombre, apellido FROM doctores WHERE id_doctor = %s', params)
+        return cur.fetchone()
+    if tipo == 'paciente':
+        cur.execute('SELECT nombre, apellido FROM pacientes WHERE id_paciente = %s', params)
+        return cur.fetchone()
+    return tuple(params)
+
+
+def consultar_historico(cur, tipo, params):
+    """
+    Ejecuta la consulta de histórico del tipo indicado. Las filas son
+    (id_cita, fecha, hora, estado, motivo, paciente, doctor).
+    """
+    cur.execute(f'''
+        SELECT
+            c.id_cita,
+            DATE_FORMAT(c.fecha, '%%d/%%m/%%Y') as fecha,
+            DATE_FORMAT(c.hora, '%%H:%%i') as hora,
+            c.estado,
+            c.motivo,
+            CONCAT(p.nombre, ' ', p.apellido) as paciente,
+            CONCAT(d.nombre, ' ', d.apellido) as doctor
+        FROM citas c
+        JOIN pacientes p ON c.id_paciente = p.id_paciente
+        JOIN doctores d ON c.id_doctor = d.id_doctor
+        WHERE {FILTROS_EXPORTACION[tipo]} AND c.estado IN ('completada', 'cancelada')
+        ORDER BY c.fecha DESC, c.hora DESC
+    ''', params)
+
+
+def describir_exportacion(tipo, info, formato):
+    """Devuelve (título, nombre de archivo) del reporte"""
+    marca = datetime.now().strftime('%d%m%Y_%H%M%S')
+    extension = EXTENSIONES[formato]
+    if tipo == 'doctor':
+        return (f"Histórico de citas - Dr. {info[0]} {info[1]}",
+                f"Historico_Doctor_{info[1]}_{info[0]}_{marca}.{extension}")
+    if tipo == 'paciente':
+        return (f"Histórico de citas - Paciente: {info[0]} {info[1]}",
+                f"Historico_Paciente_{info[1]}_{info[0]}_{marca}.{extension}")
+    return (f"Histórico de citas - Período: {info[0]} al {info[1]}",
+            f"Historico_Citas_{info[0]}_{info[1]}_{marca}.{extension}")
+
+
+def escribir_excel(datos, titulo, salida):
+    """
+    Escribe el histórico en un Excel en modo streaming: la hoja es de solo
+    escritura (openpyxl va volcando las filas a disco) y `datos` puede ser un
+    cursor del lado del servidor que se consume fila a fila.
+
+    Args:
+        datos: Iterable de tuplas con los datos de las citas (lista o cursor)
+        titulo: Título del reporte
+        salida: Ruta o archivo binario donde guardar el libro
+
+    Returns:
+        Cantidad de registros escritos
+    """
+    import openpyxl
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font, Alignment, PatternFill
+    from openpyxl.worksheet.cell_range import CellRange
+
+    # Crear un nuevo libro de Excel de solo escritura
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet("Histórico de citas")
+
+    # Estilos (se crean una sola vez y se reutilizan en todas las filas)
+    header_font = Font(bold=True, color="FFFFFF")
+    header_fill = PatternFill(
+        start_color="0066CC", end_color="0066CC", fill_type="solid")
+    centered = Alignment(horizontal="center", vertical="center")
+    fills_estado = {
+        'completada': PatternFill(start_color="90EE90", end_color="90EE90", fill_type="solid"),
+        'cancelada': PatternFill(start_color="FFC0CB", end_color="FFC0CB", fill_type="solid"),
+    }
+
+    # Anchos de columna: en una hoja de solo escritura deben fijarse antes
+    # de la primera fila, así que se usan anchos por columna acotados
+    headers = ["Fecha", "Hora", "Paciente", "Doctor", "Motivo", "Estado"]
+    for col_letter, width in zip("ABCDEF", ANCHOS_EXCEL):
+        ws.column_dimensions[col_letter].width = width
+
+    def celda(valor, font=None, fill=None, alignment=None):
+        cell = WriteOnlyCell(ws, value=valor)
+        if font:
+            cell.font = font
+        if fill:
+            cell.fill = fill
+        if alignment:
+            cell.alignment = alignment
+        return cell
+
+    # Título del reporte
+    ws.append([celda(titulo, font=Font(bold=True, size=14), alignment=Alignment(horizontal="center"))])
+    ws.merged_cells.add(CellRange('A1:F1'))
+
+    # Fecha de generación
+    ws.append([celda(f"Generado el: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}",
+                     alignment=Alignment(horizontal="right"))])
+    ws.merged_cells.add(CellRange('A2:F2'))
+    ws.append([])
+
+    # Encabezados
+    ws.append([celda(header, font=header_font, fill=header_fill, alignment=centered)
+               for header in headers])
+
+    # Datos
+    total = 0
+    for cita in datos:
+        total += 1
+
+        # Hora (formatear si es un objeto timedelta)
+        hora = cita[2]
+        if isinstance(hora, timedelta):
+            total_seconds = int(hora.total_seconds())
+            hours = total_seconds // 3600
+            minutes = (total_seconds % 3600) // 60
+            hora_str = f"{hours:02d}:{minutes:02d}"
+        else:
+            hora_str = str(hora)
+
+        # Estado (mapeado a nombre amigable y coloreado)
+        estado = celda(mapear_estado(cita[3]), fill=fills_estado.get((cita[3] or '').lower()))
+
+        ws.append([cita[1], hora_str, cita[5], cita[6], cita[4], estado])
+
+    if total == 0:
+        ws.append([celda("No hay registros históricos", alignment=Alignment(horizontal="center"))])
+        ws.merged_cells.add(CellRange('A5:F5'))
+
+    wb.save(salida)
+    return total
+
+
+def escribir_pdf(datos, tipo, titulo, salida):
+    """
+    Escribe el histórico en un PDF con las columnas del tipo de exportación.
+
+    Args:
+        datos: Iterable de tuplas con los datos de las citas
+        tipo: 'doctor', 'paciente' o 'fecha'
+        titulo: Título del reporte
+        salida: Ruta o archivo binario donde guardar el PDF
+
+    Returns:
+        Cantidad de registros escritos
+    """
+    if not REPORTLAB_AVAILABLE:
+        raise RuntimeError('La generación de PDF requiere la librería reportlab (instalar reportlab)')
+
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib import colors
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+
+    doc = SimpleDocTemplate(salida, pagesize=A4)
+    styles = getSampleStyleSheet()
+    elements = []
+
+    elements.append(Paragraph(titulo, styles['Title']))
+    elements.append(Spacer(1, 12))
+    elements.append(Paragraph(f"Generado: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}", styles['Normal']))
+    elements.append(Spacer(1, 12))
+
+    # Tabla
+    columnas = COLUMNAS_PDF[tipo]
+    data = [[encabezado for encabezado, _ in columnas]]
+    for row in datos:
+        fila = []
+        for encabezado, indice in columnas:
+            if encabezado == 'Estado':
+                fila.append(mapear_estado(row[indice]))
+            else:
+                fila.append(row[indice] or '')
+        data.append(fila)
+
+    table = Table(data, repeatRows=1)
+    table.setStyle(TableStyle([
+        ('BACKGROUND', (0,0), (-1,0), colors.HexColor('#0066CC')),
+        ('TEXTCOLOR', (0,0), (-1,0), colors.white),
+        ('ALIGN', (0,0), (-1,-1), 'LEFT'),
+        ('GRID', (0,0), (-1,-1), 0.5, colors.grey),
+        ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
+        ('ROWBACKGROUNDS', (0,1), (-1,-1), [colors.white, colors.HexColor('#F8F9FA')])
+    ]))
+
+    elements.append(table)
+    doc.build(elements, onFirstPage=_pdf_header_footer, onLaterPages=_pdf_header_footer)
+    return len(data) - 1
@@ -0,0 +1,122 @@
+"""
+Conteo de citas por (fecha, id_doctor, estado) en la tabla `resumen_citas`.
+
+Cita.crear/actualizar/eliminar ajustan los contadores en la misma
+transacción que modifica la cita, así que los totales del tablero salen de
+un recorrido de la clave primaria de `resumen_citas` en vez de leer todas
+las citas del día o del mes. `reconciliar` recalcula los contadores de un
+rango de fechas desde `citas` y corrige las diferencias (por cambios hechos
+directamente en la base de datos, por ejemplo); reconciliar_resumen.py lo
+ejecuta desde cron.
+
+Las funciones reciben un cursor y no hacen commit: lo hace quien las llama.
+"""
+from datetime import timedelta
+
+ESTADOS = ('programada', 'completada', 'cancelada')
+
+# id_doctor de las citas sin doctor (la clave primaria no admite NULL)
+SIN_DOCTOR = 0
+
+
+def sumar(cur, fecha, id_doctor, estado, cantidad):
+    """Suma `cantidad` (positiva o negativa) al contador de (fecha, id_doctor, estado)"""
+    if id_doctor is None:
+        id_doctor = SIN_DOCTOR
+    if cantidad > 0:
+        cur.execute('''
+            INSERT INTO resumen_citas (fecha, id_doctor, estado, total)
+            VALUES (%s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE total = total + VALUES(total)
+        ''', (fecha, id_doctor, estado, cantidad))
+    elif cantidad < 0:
+        cur.execute('''
+            UPDATE resumen_citas
+            SET total = GREATEST(total - %s, 0)
+            WHERE fecha = %s AND id_doctor = %s AND estado = %s
+        ''', (-cantidad, fecha, id_doctor, estado))
+
+
+def mover(cur, anterior, nueva):
+    """
+    Pasa una cita de una clave (fecha, id_doctor, estado) a otra.
+    Cualquiera de las dos puede ser None (cita creada o eliminada).
+    """
+    if anterior == nueva:
+        return
+    if anterior is not None:
+        sumar(cur, *anterior, -1)
+    if nueva is not None:
+        sumar(cur, *nueva, 1)
+
+
+def contar_por_estado(cur, desde, hasta):
+    """
+    Total de citas por estado con fecha en [desde, hasta).
+
+    Returns:
+        Diccionario {estado: total} con todos los estados
+    """
+    cur.execute('''
+        SELECT estado, SUM(total)
+        FROM resumen_citas
+        WHERE fecha >= %s AND fecha < %s
+        GROUP BY estado
+    ''', (desde, hasta))
+    conteos = dict.fromkeys(ESTADOS, 0)
+    for estado, total in cur.fetchall():
+        conteos[estado] = int(total or 0)
+    return conteos
+
+
+def reconciliar(cur, desde, hasta):
+    """
+    Recalcula los contadores de [desde, hasta) a partir de `citas` y corrige
+    los que difieren.
+
+    Bloquea primero las filas del resumen del rango: las citas que se
+    modifiquen mientras tanto esperan a que termine, así que el recuento no
+    se mezcla con ajustes incrementales a medio hacer.
+
+    Returns:
+        Lista de (fecha, id_doctor, estado, total_resumen, total_real) corregidos
+    """
+    cur.execute('''
+        SELECT fecha, id_doctor, estado, total
+        FROM resumen_citas
+        WHERE fecha >= %s AND fecha < %s
+        FOR UPDATE
+    ''', (desde, hasta))
+    resumen = {(f, d, e): t for f, d, e, t in cur.fetchall()}
+
+    cur.execute('''
+        SELECT fecha, COALESCE(id_doctor, %s), estado, COUNT(*)
+        FROM citas
+        WHERE fecha >= %s AND fecha < %s AND estado IS NOT NULL
+        GROUP BY fecha, COALESCE(id_doctor, %s), estado
+    ''', (SIN_DOCTOR, desde, hasta, SIN_DOCTOR))
+    reales = {(f, d, e): t for f, d, e, t in cur.fetchall()}
+
+    diferencias = []
+    for clave in sorted(set(resumen) | set(reales), key=lambda c: (c[0], c[1], ESTADOS.index(c[2]))):
+        antes, real = resumen.get(clave, 0), reales.get(clave, 0)
+        if antes != real:
+            diferencias.append((*clave, antes, real))
+            cur.execute('''
+                INSERT INTO resumen_citas (fecha, id_doctor, estado, total)
+                VALUES (%s, %s, %s, %s)
+                ON DUPLICATE KEY UPDATE total = VALUES(total)
+            ''', (*clave, real))
+
+    # Las filas en cero ya no aportan nada
+    cur.execute('DELETE FROM resumen_citas WHERE fecha >= %s AND fecha < %s AND total = 0', (desde, hasta))
+    return diferencias
+
+
+def tramos(desde, hasta, paso):
+    """Parte [desde, hasta) en tramos de `paso` días para reconciliar por partes"""
+    inicio = desde
+    while inicio < hasta:
+        fin = min(inicio + timedelta(days=paso), hasta)
+        yield inicio, fin
+        inicio = fin
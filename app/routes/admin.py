@@ -4,6 +4,10 @@ from functools import wraps
 from app.models import Usuario
 from app import mysql
 from app.security_logger import SecurityLogger
+from app.correos import bandeja_salida
+from app.cache import cache_usuarios
+from app.versiones import versiones
+from app.compresion import compresion
 
 admin_bp = Blueprint('admin', __name__)
 
@@ -108,3 +112,37 @@ def toggle_user_status(id_usuario):
     
     return redirect(url_for('admin.usuarios'))
 
+@admin_bp.route('/estado/pool')
+@login_required
+@admin_required
+def estado_pool():
+    """Estadísticas del pool de conexiones MySQL del worker actual"""
+    return jsonify(mysql.pool_stats())
+
+@admin_bp.route('/estado/correos')
+@login_required
+@admin_required
+def estado_correos():
+    """Correos de la bandeja de salida por estado ('fallido' = descartados tras agotar reintentos)"""
+    return jsonify(bandeja_salida.estadisticas())
+
+@admin_bp.route('/estado/usuarios')
+@login_required
+@admin_required
+def estado_cache_usuarios():
+    """Aciertos y fallos de la caché de usuarios autenticados del worker actual"""
+    return jsonify(cache_usuarios.estadisticas())
+
+@admin_bp.route('/estado/etags')
+@login_required
+@admin_required
+def estado_etags():
+    """Respuestas completas y 304 (If-None-Match) por endpoint del worker actual"""
+    return jsonify(versiones.estadisticas())
+
+@admin_bp.route('/estado/compresion')
+@login_required
+@admin_required
+def estado_compresion():
+    """Bytes ahorrados y costo de la compresión de respuestas del worker actual"""
+    return jsonify(compresion.estadisticas())
@@ -1,8 +1,8 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, session
 from flask_login import login_user, logout_user, login_required, current_user
 from urllib.parse import urlparse
-from werkzeug.security import generate_password_hash
 from app.models import Usuario
+from app.contrasenas import pool_hash, PoolHashOcupadoError
 from app import mysql, limiter
 from app.validators import PasswordValidator, UsernameValidator, InputSanitizer
 from app.security_logger import SecurityLogger
@@ -26,9 +26,9 @@ def login():
         
         
         try:
-            user = Usuario.get_by_username(username)
-            
-            if user and Usuario.verify_password(username, password):
+            user, requiere_cambio = Usuario.autenticar(username, password)
+
+            if user:
                 # Verificar si la cuenta está activa
                 if not user.activo:
                     SecurityLogger.log_login_attempt(username, False)
@@ -40,7 +40,7 @@ def login():
                 SecurityLogger.log_login_attempt(username, True)
                 
                 # Verificar si requiere cambio de contraseña
-                if Usuario.requiere_cambio_password(username):
+                if requiere_cambio:
                     flash('Por seguridad, debe cambiar tu contraseña', 'warning')
                     return redirect(url_for('auth.change_password'))
                 
@@ -65,6 +65,9 @@ def login():
             SecurityLogger.log_login_attempt(username, False)
             flash('Usuario o contraseña incorrectos', 'danger')
             
+        except PoolHashOcupadoError:
+            flash('El servidor está ocupado. Intenta iniciar sesión nuevamente en unos segundos', 'warning')
+            return render_template('auth/login.html'), 503
         except Exception as e:
             flash('Error al procesar el inicio de sesión', 'danger')
     
@@ -141,8 +144,8 @@ def register():
         
         try:
             # Crear nuevo usuario
+            password_hash = pool_hash.generar(password)
             cur = mysql.connection.cursor()
-            password_hash = generate_password_hash(password)
             
             cur.execute('''
                 INSERT INTO usuarios (username, password_hash, nombre, es_admin, activo)
@@ -202,7 +205,7 @@ def perfil():
                     flash('Las contraseñas no coinciden', 'danger')
                     return render_template('auth/perfil.html')
                 
-                password_hash = generate_password_hash(password)
+                password_hash = pool_hash.generar(password)
                 cur.execute('''
                     UPDATE usuarios 
                     SET username = %s, nombre = %s, password_hash = %s 
@@ -218,7 +221,8 @@ def perfil():
             
             mysql.connection.commit()
             cur.close()
-            
+            Usuario.invalidar_cache(current_user.id)
+
             flash('Perfil actualizado exitosamente', 'success')
             return redirect(url_for('auth.perfil'))
             
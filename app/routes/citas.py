@@ -1,10 +1,11 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash
-from app.models import Cita, Paciente, Doctor
+from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app
+from app.models import Cita, Paciente, Doctor, CitaNoDisponibleError
 from flask_login import login_required, current_user
 from datetime import datetime, timedelta
-from mysql.connector import Error
 from app.routes.notification import EmailNotifier
-from app import mysql
+from app.disponibilidad import indice_ocupacion, minuto_del_dia
+from app.versiones import (respuesta_condicional, RECURSO_CITAS, RECURSO_PACIENTES, RECURSO_DOCTORES,
+                           recurso_fecha)
 from flask import jsonify
 
 citas_bp = Blueprint('citas', __name__)
@@ -49,22 +50,15 @@ def index():
                 año_mes=(filter_year, filter_month_num)
             )
 
-        # Contar citas por estado
-        total_citas = len(filtered_citas)
-        programadas = 0
-        completadas = 0
-        canceladas = 0
-
-        for cita in filtered_citas:
-            # El estado está en la posición 6 según la salida de depuración
-            estado = cita[6]
-
-            if estado == 'programada':
-                programadas += 1
-            elif estado == 'completada':
-                completadas += 1
-            elif estado == 'cancelada':
-                canceladas += 1
+        # Contadores por estado desde la tabla de resumen (sin recorrer las citas)
+        if filter_type == 'day':
+            conteos = Cita.contar_por_estado(fecha=filter_date)
+        else:
+            conteos = Cita.contar_por_estado(año_mes=(filter_year, filter_month_num))
+        programadas = conteos['programada']
+        completadas = conteos['completada']
+        canceladas = conteos['cancelada']
+        total_citas = programadas + completadas + canceladas
 
         return render_template(
             'citas/index.html',
@@ -108,20 +102,7 @@ def nueva():
             hora = datetime.strptime(request.form['hora'], '%H:%M').time()
             motivo = request.form['motivo']
 
-            # Verificar disponibilidad
-            cita_existente = Cita.verificar_disponibilidad(fecha, hora)
-            if cita_existente:
-                flash(f'Ya existe una cita programada para el {fecha} a las {hora}. '
-                      'Por favor, seleccione otro horario.', 'danger')
-                pacientes = Paciente.obtener_todos()
-                doctores = Doctor.obtener_todos()
-                today = datetime.now().strftime('%Y-%m-%d')
-                return render_template('citas/nueva_cita.html',
-                                       pacientes=pacientes,
-                                       doctores=doctores,
-                                       today=today)
-
-            # Crear la cita
+            # Crear la cita (las claves únicas de la tabla verifican la disponibilidad)
             cita = Cita.crear(id_paciente, id_doctor, fecha, hora, motivo)
 
             # Obtener del paciente y el doctor para la notificación
@@ -133,7 +114,7 @@ def nueva():
                     # Inicializar el notificador de email
                     notifier = EmailNotifier()
 
-                    # Enviar notificación
+                    # Encolar la notificación (se envía en segundo plano)
                     success, message = notifier.enviar_notificacion_cita(
                         email_paciente=paciente.email,
                         nombre_paciente=paciente.nombre_completo,
@@ -144,7 +125,7 @@ def nueva():
 
                     if success:
                         flash(
-                            'Cita creada exitosamente y notificación enviada', 'success')
+                            'Cita creada exitosamente; la notificación se enviará por correo', 'success')
                     else:
                         flash(
                             f'Cita creada exitosamente, pero hubo un problema con la notificación: {message}', 'warning')
@@ -157,6 +138,8 @@ def nueva():
 
             return redirect(url_for('citas.agendamiento'))
 
+        except CitaNoDisponibleError as e:
+            flash(f'{e}. Por favor, seleccione otro horario.', 'danger')
         except ValueError as e:
             flash('Error en el formato de fecha u hora', 'danger')
         except Exception as e:
@@ -164,12 +147,16 @@ def nueva():
 
     try:
         # Obtener datos necesarios para el formulario
-        pacientes = Paciente.obtener_todos()
+        # Los pacientes se buscan con /pacientes/api/buscar (autocompletado);
+        # si el envío falló se conserva el paciente elegido
         doctores = Doctor.obtener_todos()
         today = datetime.now().strftime('%Y-%m-%d')
+        paciente = None
+        if request.method == 'POST' and request.form.get('id_paciente'):
+            paciente = Paciente.obtener_por_id(request.form['id_paciente'])
 
         return render_template('citas/nueva_cita.html',
-                               pacientes=pacientes,
+                               paciente=paciente,
                                doctores=doctores,
                                today=today)
     except Exception as e:
@@ -187,27 +174,16 @@ def editar(id_cita):
             motivo = request.form['motivo']
             estado = request.form['estado']
 
-            # Verificar si ya existe una cita en esa fecha y hora (excluyendo la cita actual)
-            cita_existente = Cita.verificar_disponibilidad(
-                fecha, hora, excluir_id=id_cita)
-            if cita_existente:
-                flash(f'Ya existe otra cita programada para el {fecha} a las {hora}. '
-                      'Por favor, seleccione otro horario.', 'danger')
-                cita = Cita.obtener_por_id(id_cita)
-                return render_template('citas/editar_cita.html', cita=cita)
-
+            # Las claves únicas de la tabla rechazan un horario ya ocupado
             Cita.actualizar(id_cita, fecha, hora, motivo, estado)
             flash('Cita actualizada exitosamente', 'success')
             return redirect(url_for('citas.agendamiento'))
 
+        except CitaNoDisponibleError as e:
+            flash(f'Ya existe otra cita programada para el {e.fecha} a las {e.hora}. '
+                  'Por favor, seleccione otro horario.', 'danger')
         except ValueError as e:
             flash('Error en el formato de fecha u hora', 'danger')
-        except Error as e:
-            if e.errno == 1062:
-                flash(f'Ya existe otra cita programada para el {fecha} a las {hora}. '
-                      'Por favor, seleccione otro horario.', 'danger')
-            else:
-                flash('Error al actualizar la cita: ' + str(e), 'danger')
         except Exception as e:
             flash('Error al actualizar la cita: ' + str(e), 'danger')
 
@@ -241,28 +217,54 @@ def eliminar(id_cita):
 
 @citas_bp.route('/agendamiento')
 @login_required
+@respuesta_condicional(lambda: [RECURSO_CITAS, RECURSO_PACIENTES, RECURSO_DOCTORES])
 def agendamiento():
-    cur = mysql.connection.cursor()
+    # Obtener solo las citas programadas
+    citas = Cita.obtener_programadas()
+    return render_template('citas/agendamiento.html', citas=citas)
+
+
+@citas_bp.route('/api/verificar_disponibilidad')
+@login_required
+def api_verificar_disponibilidad():
+    """Indica si un horario está libre, usando el índice de ocupación en memoria"""
+    try:
+        fecha = datetime.strptime(request.args.get('fecha', ''), '%Y-%m-%d').date()
+        hora = datetime.strptime(request.args.get('hora', ''), '%H:%M').time()
+        doctor_id = request.args.get('doctor_id', type=int)
+    except ValueError:
+        return jsonify({"error": "Formato de fecha u hora inválido"}), 400
+
+    disponible = indice_ocupacion.disponible(fecha, hora, doctor_id)
+    return jsonify({
+        "fecha": fecha.isoformat(),
+        "hora": hora.strftime('%H:%M'),
+        "doctor_id": doctor_id,
+        "disponible": disponible
+    })
+
+
+@citas_bp.route('/api/horarios_libres')
+@login_required
+@respuesta_condicional(lambda: [recurso_fecha(request.args.get('fecha', ''))])
+def api_horarios_libres():
+    """Horarios libres de un doctor en un día, según el horario de atención configurado"""
     try:
-        # Obtener solo las citas programadas
-        cur.execute('''
-            SELECT 
-                c.id_cita,
-                c.fecha,
-                c.hora,
-                c.estado,
-                c.motivo,
-                p.nombre,
-                p.apellido,
-                d.nombre,
-                d.apellido         
-            FROM citas c 
-            JOIN pacientes p ON c.id_paciente = p.id_paciente 
-            JOIN doctores d ON c.id_doctor = d.id_doctor        
-            WHERE c.estado = 'programada'
-            ORDER BY c.fecha DESC, c.hora DESC
-        ''')
-        citas = cur.fetchall()
-        return render_template('citas/agendamiento.html', citas=citas)
-    finally:
-        cur.close()
+        fecha = datetime.strptime(request.args.get('fecha', ''), '%Y-%m-%d').date()
+    except ValueError:
+        return jsonify({"error": "Formato de fecha inválido"}), 400
+
+    doctor_id = request.args.get('doctor_id', type=int)
+    if doctor_id is None:
+        return jsonify({"error": "Se requiere doctor_id"}), 400
+
+    inicio = minuto_del_dia(current_app.config['CITAS_HORA_INICIO'])
+    fin = minuto_del_dia(current_app.config['CITAS_HORA_FIN'])
+    duracion = current_app.config['CITAS_DURACION_MINUTOS']
+
+    return jsonify({
+        "fecha": fecha.isoformat(),
+        "doctor_id": doctor_id,
+        "duracion_minutos": duracion,
+        "horarios": indice_ocupacion.horarios_libres(fecha, doctor_id, inicio, fin, duracion)
+    })
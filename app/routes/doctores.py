@@ -1,5 +1,6 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash
+from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app
 from app.models import Doctor
+from app.paginacion import parametros_listado, POR_PAGINA_OPCIONES
 from flask_login import login_required
 from datetime import datetime
 from app import mysql
@@ -9,13 +10,14 @@ doctores_bp = Blueprint('doctores', __name__)
 @doctores_bp.route('/')
 @login_required
 def index():
-    cur = mysql.connection.cursor()
+    parametros = parametros_listado(request.args, current_app.config['LISTADO_POR_PAGINA'])
     try:
-        cur.execute('SELECT * FROM doctores ORDER BY apellido, nombre')
-        doctores = cur.fetchall()
-        return render_template('doctores/index.html', doctores=doctores)
-    finally:
-        cur.close()
+        pagina = Doctor.listar(**parametros)
+    except ValueError:
+        flash('El enlace de paginación no es válido', 'warning')
+        return redirect(url_for('doctores.index'))
+    return render_template('doctores/index.html', doctores=pagina.filas, pagina=pagina,
+                           por_pagina_opciones=POR_PAGINA_OPCIONES)
 
 @doctores_bp.route('/nuevo', methods=['GET', 'POST'])
 @login_required
@@ -55,6 +57,7 @@ def editar(id_doctor):
             ''', (nombre, apellido, telefono, id_doctor))
             
             mysql.connection.commit()
+            Doctor.invalidar_cache()
             flash('Doctor actualizado exitosamente', 'success')
             return redirect(url_for('doctores.index'))
         
@@ -91,6 +94,7 @@ def eliminar(id_doctor):
     try:
         cur.execute('DELETE FROM doctores WHERE id_doctor = %s', (id_doctor,))
         mysql.connection.commit()
+        Doctor.invalidar_cache()
         flash('Doctor eliminado exitosamente', 'success')
     except Exception as e:
         flash('Error al eliminar el doctor: ' + str(e), 'danger')
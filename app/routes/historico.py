@@ -1,65 +1,114 @@
 from flask import Blueprint, jsonify, request, render_template
 from flask_login import login_required, current_user
 from app import mysql, limiter
-import io
-import openpyxl
-from openpyxl.styles import Font, Alignment, PatternFill
-from flask import send_file, jsonify
-from datetime import datetime, timedelta, date, time
+import base64
+import os
+import tempfile
+from MySQLdb.cursors import SSCursor
+from flask import send_file, url_for, current_app, flash
+from datetime import date, datetime, timedelta
 import logging
-
-# Intentar importar reportlab para PDF; si no está instalado, seguiremos soportando solo Excel
-try:
-    from reportlab.lib.pagesizes import A4
-    from reportlab.lib import colors
-    from reportlab.lib.styles import getSampleStyleSheet
-    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-    REPORTLAB_AVAILABLE = True
-except Exception:
-    REPORTLAB_AVAILABLE = False
-
-# Definir helper para cabecera/pie si reportlab está disponible
-if REPORTLAB_AVAILABLE:
-    def _pdf_header_footer(canvas, doc):
-        canvas.saveState()
-        width, height = A4
-        # Cabecera
-        canvas.setFont('Helvetica-Bold', 12)
-        canvas.setFillColor(colors.HexColor('#0066CC'))
-        canvas.drawCentredString(width / 2.0, height - 30, 'Isis Med - Histórico de citas')
-        # Línea debajo de la cabecera
-        canvas.setStrokeColor(colors.HexColor('#0066CC'))
-        canvas.setLineWidth(1)
-        canvas.line(40, height - 36, width - 40, height - 36)
-
-        # Pie de página: número de página a la derecha
-        page_num_text = f"Página {doc.page}"
-        canvas.setFont('Helvetica', 9)
-        canvas.setFillColor(colors.grey)
-        canvas.drawRightString(width - 40, 20, page_num_text)
-        canvas.restoreState()
+from app.reportes import (
+    REPORTLAB_AVAILABLE, FILTROS_EXPORTACION, MIMETYPES,
+    obtener_info, consultar_historico, describir_exportacion, escribir_excel, escribir_pdf
+)
+from app.exportaciones import cola_exportaciones, ESTADO_PENDIENTE, ESTADO_COMPLETADO
+from app.models import Paciente, Doctor
+from app.disponibilidad import minuto_del_dia
+from app.versiones import (respuesta_condicional, RECURSO_PACIENTES, RECURSO_DOCTORES, recurso_doctor,
+                           recurso_paciente)
+from app.estadisticas import (PERIODOS, consultar as consultar_estadisticas, pendientes as estadisticas_pendientes,
+                              refrescar as refrescar_estadisticas)
 
 # Configurar logger para auditoría
 logger = logging.getLogger(__name__)
 
 historico_bp = Blueprint('historico', __name__)
 
-# Constantes de seguridad
-MAX_RECORDS_EXPORT = 10000  # Máximo de registros a exportar
-MAX_FILE_SIZE = 10 * 1024 * 1024  # 10 MB máximo
+# Paginación de las APIs de histórico
+HISTORICO_LIMITE_POR_DEFECTO = 50
+HISTORICO_LIMITE_MAXIMO = 500
+
+def codificar_cursor(fecha, hora, id_cita):
+    """Cursor opaco con la posición (fecha, hora, id_cita) de la última fila entregada"""
+    segundos = int(hora.total_seconds())  # MySQLdb devuelve TIME como timedelta
+    valor = f"{fecha.isoformat()}|{segundos}|{id_cita}"
+    return base64.urlsafe_b64encode(valor.encode()).decode().rstrip('=')
+
+
+def decodificar_cursor(cursor):
+    """Devuelve (fecha, hora 'HH:MM:SS', id_cita) o lanza ValueError si el cursor no es válido"""
+    try:
+        relleno = '=' * (-len(cursor) % 4)
+        fecha_str, segundos, id_cita = base64.urlsafe_b64decode(cursor + relleno).decode().split('|')
+        fecha = datetime.strptime(fecha_str, '%Y-%m-%d').date()
+        segundos = int(segundos)
+        hora = f"{segundos // 3600:02d}:{segundos % 3600 // 60:02d}:{segundos % 60:02d}"
+        return fecha, hora, int(id_cita)
+    except Exception:
+        raise ValueError('Cursor inválido')
 
-# Mapeo de estados para visualización
-MAPEO_ESTADOS = {
-    'completada': 'Completada',
-    'cancelada': 'Cancelada'
-}
 
-def mapear_estado(estado_bd):
-    """Convierte estado de BD a nombre para mostrar"""
-    if not estado_bd:
-        return 'Desconocido'
-    estado_lower = estado_bd.lower().strip()
-    return MAPEO_ESTADOS.get(estado_lower, estado_bd)
+def consultar_historico_paginado(cur, columna, valor):
+    """
+    Página del histórico filtrado por `columna` (c.id_paciente o c.id_doctor).
+
+    Usa paginación por clave (keyset) sobre (fecha, hora, id_cita) descendente:
+    cada página es un recorrido acotado del índice, sin OFFSET, así que el
+    costo no crece con la cantidad de histórico.
+
+    Returns:
+        Tupla (citas, next_cursor); next_cursor es None en la última página
+    """
+    limite = request.args.get('limit', HISTORICO_LIMITE_POR_DEFECTO, type=int)
+    limite = max(1, min(limite, HISTORICO_LIMITE_MAXIMO))
+
+    query = f'''
+        SELECT 
+            c.id_cita,
+            DATE_FORMAT(c.fecha, '%%d/%%m/%%Y') as fecha,
+            DATE_FORMAT(c.hora, '%%H:%%i') as hora,
+            c.estado,
+            c.motivo,
+            CONCAT(p.nombre, ' ', p.apellido) as paciente,
+            CONCAT(d.nombre, ' ', d.apellido) as doctor,
+            c.fecha,
+            c.hora
+        FROM citas c 
+        JOIN pacientes p ON c.id_paciente = p.id_paciente
+        JOIN doctores d ON c.id_doctor = d.id_doctor          
+        WHERE {columna} = %s AND c.estado IN ('completada', 'cancelada')
+    '''
+    params = [valor]
+
+    cursor = request.args.get('cursor')
+    if cursor:
+        fecha, hora, id_cita = decodificar_cursor(cursor)
+        query += '''
+            AND (c.fecha < %s
+                 OR (c.fecha = %s AND (c.hora < %s
+                                       OR (c.hora = %s AND c.id_cita < %s))))
+        '''
+        params.extend([fecha, fecha, hora, hora, id_cita])
+
+    query += ' ORDER BY c.fecha DESC, c.hora DESC, c.id_cita DESC LIMIT %s'
+    params.append(limite + 1)
+
+    cur.execute(query, params)
+    filas = cur.fetchall()
+
+    # Nombres de las columnas visibles (las dos últimas solo sirven para el cursor)
+    columns = [desc[0] for desc in cur.description][:7]
+
+    next_cursor = None
+    if len(filas) > limite:
+        filas = filas[:limite]
+        ultima = filas[-1]
+        next_cursor = codificar_cursor(ultima[7], ultima[8], ultima[0])
+
+    citas = [dict(zip(columns, row[:7])) for row in filas]
+    return citas, next_cursor
+
 
 @historico_bp.route('/fecha')
 @login_required
@@ -75,85 +124,72 @@ def historico_fecha():
     # Si hay filtros, consultar la base de datos
     cur = mysql.connection.cursor()
     try:
-        # Construir la consulta base
-        query = '''
-            SELECT 
-                c.id_cita,
-                c.fecha,
-                c.hora,
-                c.estado,
-                c.motivo,
-                p.nombre,
-                p.apellido, 
-                d.nombre,
-                d.apellido
-            FROM citas c 
-            JOIN pacientes p ON c.id_paciente = p.id_paciente 
-            JOIN doctores d ON c.id_doctor = d.id_doctor
-            WHERE c.estado IN ('completada', 'cancelada')
-        '''
-
-        params = []
-
-        # Añadir filtros si se proporcionaron
-        if fecha_inicio:
-            query += " AND c.fecha >= %s"
-            params.append(fecha_inicio)
-
-        if fecha_fin:
-            query += " AND c.fecha <= %s"
-            params.append(fecha_fin)
-
-        # Ordenar los resultados
-        query += " ORDER BY c.fecha DESC, c.hora DESC"
-
-        # Ejecutar la consulta
-        cur.execute(query, params)
-        citas = cur.fetchall()
-
+        citas = consultar_historico_fecha(cur, fecha_inicio, fecha_fin)
         return render_template('historico/historico_fecha.html', citas=citas,
                                fecha_inicio=fecha_inicio, fecha_fin=fecha_fin)
     finally:
         cur.close()
 
 
+def consultar_historico_fecha(cur, fecha_inicio, fecha_fin):
+    """Citas completadas y canceladas entre las fechas (cualquiera puede faltar), más recientes primero"""
+    # Construir la consulta base
+    query = '''
+        SELECT 
+            c.id_cita,
+            c.fecha,
+            c.hora,
+            c.estado,
+            c.motivo,
+            p.nombre,
+            p.apellido, 
+            d.nombre,
+            d.apellido
+        FROM citas c 
+        JOIN pacientes p ON c.id_paciente = p.id_paciente 
+        JOIN doctores d ON c.id_doctor = d.id_doctor
+        WHERE c.estado IN ('completada', 'cancelada')
+    '''
+
+    params = []
+
+    # Añadir filtros si se proporcionaron
+    if fecha_inicio:
+        query += " AND c.fecha >= %s"
+        params.append(fecha_inicio)
+
+    if fecha_fin:
+        query += " AND c.fecha <= %s"
+        params.append(fecha_fin)
+
+    # Ordenar los resultados
+    query += " ORDER BY c.fecha DESC, c.hora DESC"
+
+    # Ejecutar la consulta
+    cur.execute(query, params)
+    return cur.fetchall()
+
+
 @historico_bp.route('/paciente')
 @login_required
 def historico_paciente():
-    cur = mysql.connection.cursor()
-    try:
-        # Obtener la lista de pacientes para el selector
-        cur.execute('''
-            SELECT id_paciente, nombre, apellido 
-            FROM pacientes
-            ORDER BY apellido, nombre
-        ''')
-        pacientes = cur.fetchall()
-        return render_template('historico/historico_paciente.html', pacientes=pacientes)
-    finally:
-        cur.close()
+    # Lista de pacientes para el selector (cacheada)
+    pacientes = Paciente.obtener_todos(orden='apellido')
+    return render_template('historico/historico_paciente.html', pacientes=pacientes)
 
 
 @historico_bp.route('/doctor')
 @login_required
 def historico_doctor():
-    cur = mysql.connection.cursor()
-    try:
-        # Obtener la lista de doctores para el selector
-        cur.execute('''
-            SELECT id_doctor, nombre, apellido 
-            FROM doctores
-            ORDER BY apellido, nombre
-        ''')
-        doctores = cur.fetchall()
-        return render_template('historico/historico_doctor.html', doctores=doctores)
-    finally:
-        cur.close()
+    # Lista de doctores para el selector (cacheada)
+    doctores = Doctor.obtener_todos(orden='apellido')
+    return render_template('historico/historico_doctor.html', doctores=doctores)
 
 
 @historico_bp.route('/api/paciente/<int:paciente_id>')
 @login_required
 @limiter.limit("100 per minute")
+@respuesta_condicional(lambda paciente_id: [recurso_paciente(paciente_id), RECURSO_PACIENTES, RECURSO_DOCTORES])
 def api_historico_paciente(paciente_id):
     """
     API para obtener histórico de citas de un paciente.
@@ -176,35 +212,15 @@ def api_historico_paciente(paciente_id):
         # 2. Registrar auditoría
         logger.info(f"Usuario {current_user.id} consultó histórico del paciente {paciente_id}")
         
-        # 4. Obtener datos
-        cur.execute('''
-            SELECT 
-                c.id_cita,
-                DATE_FORMAT(c.fecha, '%%d/%%m/%%Y') as fecha,
-                DATE_FORMAT(c.hora, '%%H:%%i') as hora,
-                c.estado,
-                c.motivo,
-                CONCAT(p.nombre, ' ', p.apellido) as paciente,
-                CONCAT(d.nombre, ' ', d.apellido) as doctor    
-            FROM citas c 
-            JOIN pacientes p ON c.id_paciente = p.id_paciente
-            JOIN doctores d ON c.id_doctor = d.id_doctor          
-            WHERE c.id_paciente = %s AND c.estado IN ('completada', 'cancelada')
-            ORDER BY c.fecha DESC, c.hora DESC
-        ''', (paciente_id,))
-
-        # Obtener los nombres de las columnas
-        columns = [desc[0] for desc in cur.description]
-
-        # Convertir los resultados a una lista de diccionarios
-        citas = []
-        for row in cur.fetchall():
-            # Crear un diccionario para esta fila
-            cita = dict(zip(columns, row))
-            citas.append(cita)
+        # 4. Obtener una página de datos
+        try:
+            citas, next_cursor = consultar_historico_paginado(cur, 'c.id_paciente', paciente_id)
+        except ValueError as e:
+            cur.close()
+            return jsonify({"error": str(e)}), 400
 
         cur.close()
-        return jsonify(citas)
+        return jsonify({"citas": citas, "next_cursor": next_cursor})
     
     except Exception as e:
         logger.error(f"Error en api_historico_paciente (paciente_id={paciente_id}): {str(e)}", exc_info=True)
@@ -217,6 +233,7 @@ def api_historico_paciente(paciente_id):
 @historico_bp.route('/api/doctor/<int:doctor_id>')
 @login_required
 @limiter.limit("100 per minute")
+@respuesta_condicional(lambda doctor_id: [recurso_doctor(doctor_id), RECURSO_PACIENTES, RECURSO_DOCTORES])
 def api_historico_doctor(doctor_id):
     """
     API para obtener histórico de citas de un doctor.
@@ -238,35 +255,15 @@ def api_historico_doctor(doctor_id):
         # 2. Registrar auditoría
         logger.info(f"Usuario {current_user.id} consultó histórico del doctor {doctor_id}")
         
-        # 4. Obtener datos
-        cur.execute('''
-            SELECT 
-                c.id_cita,
-                DATE_FORMAT(c.fecha, '%%d/%%m/%%Y') as fecha,
-                DATE_FORMAT(c.hora, '%%H:%%i') as hora,
-                c.estado,
-                c.motivo,
-                CONCAT(p.nombre, ' ', p.apellido) as paciente,
-                CONCAT(d.nombre, ' ', d.apellido) as doctor    
-            FROM citas c 
-            JOIN pacientes p ON c.id_paciente = p.id_paciente
-            JOIN doctores d ON c.id_doctor = d.id_doctor          
-            WHERE c.id_doctor = %s AND c.estado IN ('completada', 'cancelada')
-            ORDER BY c.fecha DESC, c.hora DESC
-        ''', (doctor_id,))
-
-        # Obtener los nombres de las columnas
-        columns = [desc[0] for desc in cur.description]
-
-        # Convertir los resultados a una lista de diccionarios
-        citas = []
-        for row in cur.fetchall():
-            # Crear un diccionario para esta fila
-            cita = dict(zip(columns, row))
-            citas.append(cita)
+        # 4. Obtener una página de datos
+        try:
+            citas, next_cursor = consultar_historico_paginado(cur, 'c.id_doctor', doctor_id)
+        except ValueError as e:
+            cur.close()
+            return jsonify({"error": str(e)}), 400
 
         cur.close()
-        return jsonify(citas)
+        return jsonify({"citas": citas, "next_cursor": next_cursor})
     
     except Exception as e:
         logger.error(f"Error en api_historico_doctor (doctor_id={doctor_id}): {str(e)}", exc_info=True)
@@ -284,69 +281,9 @@ def exportar_excel_doctor(doctor_id):
     - Requiere autenticación
     - Solo admin o el doctor mismo puede exportar
     - Rate limiting más restrictivo: 20 solicitudes por minuto
-    - Límite de registros: 10000
+    - Exportación en streaming: sin límite de registros y memoria acotada
     """
-    try:
-        cur = mysql.connection.cursor()
-        
-        # 1. Validación: Verificar que el doctor exista
-        cur.execute('SELECT nombre, apellido FROM doctores WHERE id_doctor = %s', (doctor_id,))
-        doctor_info = cur.fetchone()
-
-        if not doctor_info:
-            cur.close()
-            logger.warning(f"Usuario {current_user.id} intentó exportar datos de doctor inexistente: {doctor_id}")
-            return jsonify({"error": "Doctor no encontrado"}), 404
-
-        # 2. Validar límite de registros
-        cur.execute('''
-            SELECT COUNT(*) as count FROM citas 
-            WHERE id_doctor = %s AND estado IN ('completada', 'cancelada')
-        ''', (doctor_id,))
-        
-        count_result = cur.fetchone()
-        record_count = count_result[0] if count_result else 0
-        
-        if record_count > MAX_RECORDS_EXPORT:
-            cur.close()
-            logger.warning(f"Intento de exportar {record_count} registros (máx: {MAX_RECORDS_EXPORT}) por usuario {current_user.id}")
-            return jsonify({
-                "error": f"Demasiados registros ({record_count}). Máximo permitido: {MAX_RECORDS_EXPORT}"
-            }), 400
-        
-        # 4. Registrar auditoría
-        logger.info(f"Usuario {current_user.id} exportó histórico del doctor {doctor_id} ({record_count} registros)")
-        
-        # 5. Obtener las citas
-        cur.execute('''
-            SELECT 
-                c.id_cita,
-                DATE_FORMAT(c.fecha, '%%d/%%m/%%Y') as fecha,
-                DATE_FORMAT(c.hora, '%%H:%%i') as hora,
-                c.estado,
-                c.motivo,
-                CONCAT(p.nombre, ' ', p.apellido) as paciente,
-                CONCAT(d.nombre, ' ', d.apellido) as doctor    
-            FROM citas c 
-            JOIN pacientes p ON c.id_paciente = p.id_paciente
-            JOIN doctores d ON c.id_doctor = d.id_doctor          
-            WHERE c.id_doctor = %s AND c.estado IN ('completada', 'cancelada')
-            ORDER BY c.fecha DESC, c.hora DESC
-        ''', (doctor_id,))
-
-        citas = cur.fetchall()
-        cur.close()
-
-        # 6. Generar el Excel
-        doctor_nombre = f"{doctor_info[0]} {doctor_info[1]}"
-        titulo = f"Histórico de citas - Dr. {doctor_nombre}"
-        nombre_archivo = f"Historico_Doctor_{doctor_info[1]}_{doctor_info[0]}_{datetime.now().strftime('%d%m%Y_%H%M%S')}.xlsx"
-
-        return generar_excel_historico(citas, titulo, nombre_archivo)
-
-    except Exception as e:
-        logger.error(f"Error al exportar Excel del doctor {doctor_id}: {str(e)}", exc_info=True)
-        return jsonify({"error": "Error interno del servidor"}), 500
+    return exportar_historico('doctor', 'excel', (doctor_id,))
 
 
 @historico_bp.route('/exportar/paciente/<int:paciente_id>')
@@ -360,468 +297,321 @@ def exportar_excel_paciente(paciente_id):
     - Requiere autenticación
     - Solo admin o el paciente mismo puede exportar
     - Rate limiting más restrictivo: 20 solicitudes por minuto
-    - Límite de registros: 10000
+    - Exportación en streaming: sin límite de registros y memoria acotada
     """
-    try:
-        cur = mysql.connection.cursor()
-        
-        # 1. Validación: Verificar que el paciente exista
-        cur.execute('SELECT nombre, apellido FROM pacientes WHERE id_paciente = %s', (paciente_id,))
-        paciente_info = cur.fetchone()
-        
-        if not paciente_info:
-            cur.close()
-            logger.warning(f"Usuario {current_user.id} intentó exportar datos de paciente inexistente: {paciente_id}")
-            return jsonify({"error": "Paciente no encontrado"}), 404
-        
-        # 2. Validar límite de registros
-        cur.execute('''
-            SELECT COUNT(*) as count FROM citas 
-            WHERE id_paciente = %s AND estado IN ('completada', 'cancelada')
-        ''', (paciente_id,))
-        
-        count_result = cur.fetchone()
-        record_count = count_result[0] if count_result else 0
-        
-        if record_count > MAX_RECORDS_EXPORT:
-            cur.close()
-            logger.warning(f"Intento de exportar {record_count} registros (máx: {MAX_RECORDS_EXPORT}) por usuario {current_user.id}")
-            return jsonify({
-                "error": f"Demasiados registros ({record_count}). Máximo permitido: {MAX_RECORDS_EXPORT}"
-            }), 400
-        
-        # 4. Registrar auditoría
-        logger.info(f"Usuario {current_user.id} exportó histórico del paciente {paciente_id} ({record_count} registros)")
-        
-        # 5. Obtener las citas
-        cur.execute('''
-            SELECT 
-                c.id_cita,
-                DATE_FORMAT(c.fecha, '%%d/%%m/%%Y') as fecha,
-                DATE_FORMAT(c.hora, '%%H:%%i') as hora,
-                c.estado,
-                c.motivo,
-                CONCAT(p.nombre, ' ', p.apellido) as paciente,
-                CONCAT(d.nombre, ' ', d.apellido) as doctor    
-            FROM citas c 
-            JOIN pacientes p ON c.id_paciente = p.id_paciente
-            JOIN doctores d ON c.id_doctor = d.id_doctor          
-            WHERE c.id_paciente = %s AND c.estado IN ('completada', 'cancelada')
-            ORDER BY c.fecha DESC, c.hora DESC
-        ''', (paciente_id,))
-
-        citas = cur.fetchall()
-        cur.close()
-
-        # 6. Generar el Excel
-        paciente_nombre = f"{paciente_info[0]} {paciente_info[1]}"
-        titulo = f"Histórico de citas - Paciente: {paciente_nombre}"
-        nombre_archivo = f"Historico_Paciente_{paciente_info[1]}_{paciente_info[0]}_{datetime.now().strftime('%d%m%Y_%H%M%S')}.xlsx"
-
-        return generar_excel_historico(citas, titulo, nombre_archivo)
-
-    except Exception as e:
-        logger.error(f"Error al exportar Excel del paciente {paciente_id}: {str(e)}", exc_info=True)
-        return jsonify({"error": "Error interno del servidor"}), 500
+    return exportar_historico('paciente', 'excel', (paciente_id,))
 
 
 @historico_bp.route('/exportar/pdf/doctor/<int:doctor_id>')
 @login_required
 @limiter.limit("20 per minute")
 def exportar_pdf_doctor(doctor_id):
-        """Exportar histórico de un doctor a PDF."""
-        if not REPORTLAB_AVAILABLE:
-            return jsonify({"error": "La generación de PDF requiere la librería reportlab (instalar reportlab)"}), 501
-        try:
-            cur = mysql.connection.cursor()
-            cur.execute('SELECT nombre, apellido FROM doctores WHERE id_doctor = %s', (doctor_id,))
-            doctor_info = cur.fetchone()
-            if not doctor_info:
-                cur.close()
-                return jsonify({"error": "Doctor no encontrado"}), 404
-
-            # Obtener citas
-            cur.execute('''
-                SELECT 
-                    DATE_FORMAT(c.fecha, '%%d/%%m/%%Y') as fecha,
-                    DATE_FORMAT(c.hora, '%%H:%%i') as hora,
-                    CONCAT(p.nombre, ' ', p.apellido) as paciente,
-                    c.motivo,
-                    c.estado
-                FROM citas c
-                JOIN pacientes p ON c.id_paciente = p.id_paciente
-                WHERE c.id_doctor = %s AND c.estado IN ('completada', 'cancelada')
-                ORDER BY c.fecha DESC, c.hora DESC
-            ''', (doctor_id,))
-
-            citas = cur.fetchall()
-            cur.close()
-
-            # Crear PDF
-            buffer = io.BytesIO()
-            doc = SimpleDocTemplate(buffer, pagesize=A4)
-            styles = getSampleStyleSheet()
-            elements = []
-
-            titulo = f"Histórico de citas - Dr. {doctor_info[0]} {doctor_info[1]}"
-            elements.append(Paragraph(titulo, styles['Title']))
-            elements.append(Spacer(1, 12))
-            elements.append(Paragraph(f"Generado: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}", styles['Normal']))
-            elements.append(Spacer(1, 12))
-
-            # Tabla
-            data = [['Fecha', 'Hora', 'Paciente', 'Motivo', 'Estado']]
-            for row in citas:
-                estado = mapear_estado(row[4])
-                data.append([row[0], row[1], row[2], row[3] or '', estado])
-
-            table = Table(data, repeatRows=1)
-            table.setStyle(TableStyle([
-                ('BACKGROUND', (0,0), (-1,0), colors.HexColor('#0066CC')),
-                ('TEXTCOLOR', (0,0), (-1,0), colors.white),
-                ('ALIGN', (0,0), (-1,-1), 'LEFT'),
-                ('GRID', (0,0), (-1,-1), 0.5, colors.grey),
-                ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
-                ('ROWBACKGROUNDS', (0,1), (-1,-1), [colors.white, colors.HexColor('#F8F9FA')])
-            ]))
-
-            elements.append(table)
-            doc.build(elements, onFirstPage=_pdf_header_footer, onLaterPages=_pdf_header_footer)
-            buffer.seek(0)
-
-            filename = f"Historico_Doctor_{doctor_info[1]}_{doctor_info[0]}_{datetime.now().strftime('%d%m%Y_%H%M%S')}.pdf"
-            return send_file(buffer, as_attachment=True, download_name=filename, mimetype='application/pdf')
-
-        except Exception as e:
-            logger.error(f"Error al generar PDF doctor {doctor_id}: {str(e)}", exc_info=True)
-            return jsonify({"error": "Error interno del servidor"}), 500
+    """Exportar histórico de un doctor a PDF."""
+    return exportar_historico('doctor', 'pdf', (doctor_id,))
 
 
 @historico_bp.route('/exportar/pdf/paciente/<int:paciente_id>')
 @login_required
 @limiter.limit("20 per minute")
 def exportar_pdf_paciente(paciente_id):
-        """Exportar histórico de un paciente a PDF."""
-        if not REPORTLAB_AVAILABLE:
-            return jsonify({"error": "La generación de PDF requiere la librería reportlab (instalar reportlab)"}), 501
-        try:
-            cur = mysql.connection.cursor()
-            cur.execute('SELECT nombre, apellido FROM pacientes WHERE id_paciente = %s', (paciente_id,))
-            paciente_info = cur.fetchone()
-            if not paciente_info:
-                cur.close()
-                return jsonify({"error": "Paciente no encontrado"}), 404
-
-            cur.execute('''
-                SELECT 
-                    DATE_FORMAT(c.fecha, '%%d/%%m/%%Y') as fecha,
-                    DATE_FORMAT(c.hora, '%%H:%%i') as hora,
-                    CONCAT(d.nombre, ' ', d.apellido) as doctor,
-                    c.motivo,
-                    c.estado
-                FROM citas c
-                JOIN doctores d ON c.id_doctor = d.id_doctor
-                WHERE c.id_paciente = %s AND c.estado IN ('completada', 'cancelada')
-                ORDER BY c.fecha DESC, c.hora DESC
-            ''', (paciente_id,))
-
-            citas = cur.fetchall()
-            cur.close()
-
-            buffer = io.BytesIO()
-            doc = SimpleDocTemplate(buffer, pagesize=A4)
-            styles = getSampleStyleSheet()
-            elements = []
-
-            titulo = f"Histórico de citas - Paciente: {paciente_info[0]} {paciente_info[1]}"
-            elements.append(Paragraph(titulo, styles['Title']))
-            elements.append(Spacer(1, 12))
-            elements.append(Paragraph(f"Generado: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}", styles['Normal']))
-            elements.append(Spacer(1, 12))
-
-            data = [['Fecha', 'Hora', 'Doctor', 'Motivo', 'Estado']]
-            for row in citas:
-                estado = mapear_estado(row[4])
-                data.append([row[0], row[1], row[2], row[3] or '', estado])
-
-            table = Table(data, repeatRows=1)
-            table.setStyle(TableStyle([
-                ('BACKGROUND', (0,0), (-1,0), colors.HexColor('#0066CC')),
-                ('TEXTCOLOR', (0,0), (-1,0), colors.white),
-                ('ALIGN', (0,0), (-1,-1), 'LEFT'),
-                ('GRID', (0,0), (-1,-1), 0.5, colors.grey),
-                ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
-            ]))
-
-            elements.append(table)
-            # Fondo alterno en filas y header/footer
-            table.setStyle(TableStyle([
-                ('ROWBACKGROUNDS', (0,1), (-1,-1), [colors.white, colors.HexColor('#F8F9FA')])
-            ]))
-            doc.build(elements, onFirstPage=_pdf_header_footer, onLaterPages=_pdf_header_footer)
-            buffer.seek(0)
-
-            filename = f"Historico_Paciente_{paciente_info[1]}_{paciente_info[0]}_{datetime.now().strftime('%d%m%Y_%H%M%S')}.pdf"
-            return send_file(buffer, as_attachment=True, download_name=filename, mimetype='application/pdf')
-
-        except Exception as e:
-            logger.error(f"Error al generar PDF paciente {paciente_id}: {str(e)}", exc_info=True)
-            return jsonify({"error": "Error interno del servidor"}), 500
+    """Exportar histórico de un paciente a PDF."""
+    return exportar_historico('paciente', 'pdf', (paciente_id,))
 
 
 @historico_bp.route('/exportar/pdf/fecha')
 @login_required
 def exportar_pdf_fecha():
     """Exportar histórico por rango de fechas a PDF."""
-    if not REPORTLAB_AVAILABLE:
-        return jsonify({"error": "La generación de PDF requiere la librería reportlab (instalar reportlab)"}), 501
+    params, error = parametros_rango_fechas(request.args)
+    if error:
+        return error
+    return exportar_historico('fecha', 'pdf', params)
+
+
+@historico_bp.route('/exportar/fecha')
+@login_required
+def exportar_excel_fecha():
+    """Exportar histórico por rango de fechas a Excel."""
+    params, error = parametros_rango_fechas(request.args)
+    if error:
+        return error
+    return exportar_historico('fecha', 'excel', params)
+
+
+def parametros_rango_fechas(datos):
+    """Valida fecha_inicio y fecha_fin; devuelve (params, None) o (None, respuesta de error)"""
+    fecha_inicio = datos.get('fecha_inicio')
+    fecha_fin = datos.get('fecha_fin')
+
+    if not fecha_inicio or not fecha_fin:
+        return None, (jsonify({"error": "Se requieren ambas fechas"}), 400)
+
+    # Convertir a objetos de fecha
     try:
-        fecha_inicio = request.args.get('fecha_inicio')
-        fecha_fin = request.args.get('fecha_fin')
-        if not fecha_inicio or not fecha_fin:
-            return jsonify({"error": "Se requieren ambas fechas"}), 400
+        fecha_inicio_obj = datetime.strptime(fecha_inicio, '%Y-%m-%d').date()
+        fecha_fin_obj = datetime.strptime(fecha_fin, '%Y-%m-%d').date()
+    except ValueError:
+        return None, (jsonify({"error": "Formato de fecha inválido"}), 400)
 
-        try:
-            fecha_inicio_obj = datetime.strptime(fecha_inicio, '%Y-%m-%d').date()
-            fecha_fin_obj = datetime.strptime(fecha_fin, '%Y-%m-%d').date()
-        except ValueError:
-            return jsonify({"error": "Formato de fecha inválido"}), 400
+    return (fecha_inicio_obj, fecha_fin_obj), None
 
+
+def exportar_historico(tipo, formato, params):
+    """
+    Genera de forma síncrona el reporte del histórico y lo envía como adjunto.
+
+    Las citas se leen con un cursor del lado del servidor y el archivo se
+    escribe en un temporal en disco que send_file envía por bloques, así que
+    la memoria por worker no depende de la cantidad de registros. Para
+    períodos largos conviene usar las exportaciones en segundo plano.
+    """
+    if formato == 'pdf' and not REPORTLAB_AVAILABLE:
+        return jsonify({"error": "La generación de PDF requiere la librería reportlab (instalar reportlab)"}), 501
+
+    try:
+        # 1. Validación: Verificar que el doctor o paciente exista
         cur = mysql.connection.cursor()
-        cur.execute('''
-            SELECT 
-                DATE_FORMAT(c.fecha, '%%d/%%m/%%Y') as fecha,
-                DATE_FORMAT(c.hora, '%%H:%%i') as hora,
-                CONCAT(p.nombre, ' ', p.apellido) as paciente,
-                CONCAT(d.nombre, ' ', d.apellido) as doctor,
-                c.motivo,
-                c.estado
-            FROM citas c
-            JOIN pacientes p ON c.id_paciente = p.id_paciente
-            JOIN doctores d ON c.id_doctor = d.id_doctor
-            WHERE c.fecha BETWEEN %s AND %s AND c.estado IN ('completada', 'cancelada')
-            ORDER BY c.fecha DESC, c.hora DESC
-        ''', (fecha_inicio_obj, fecha_fin_obj))
-
-        citas = cur.fetchall()
+        info = obtener_info(cur, tipo, params)
         cur.close()
 
-        buffer = io.BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=A4)
-        styles = getSampleStyleSheet()
-        elements = []
-
-        titulo = f"Histórico de citas - Período: {fecha_inicio} al {fecha_fin}"
-        elements.append(Paragraph(titulo, styles['Title']))
-        elements.append(Spacer(1, 12))
-        elements.append(Paragraph(f"Generado: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}", styles['Normal']))
-        elements.append(Spacer(1, 12))
-
-        data = [['Fecha', 'Hora', 'Paciente', 'Doctor', 'Motivo', 'Estado']]
-        for row in citas:
-            estado = mapear_estado(row[5])
-            data.append([row[0], row[1], row[2], row[3], row[4] or '', estado])
-
-        table = Table(data, repeatRows=1)
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0,0), (-1,0), colors.HexColor('#0066CC')),
-            ('TEXTCOLOR', (0,0), (-1,0), colors.white),
-            ('ALIGN', (0,0), (-1,-1), 'LEFT'),
-            ('GRID', (0,0), (-1,-1), 0.5, colors.grey),
-            ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
-        ]))
-
-        elements.append(table)
-        table.setStyle(TableStyle([
-            ('ROWBACKGROUNDS', (0,1), (-1,-1), [colors.white, colors.HexColor('#F8F9FA')])
-        ]))
-        doc.build(elements, onFirstPage=_pdf_header_footer, onLaterPages=_pdf_header_footer)
-        buffer.seek(0)
-
-        filename = f"Historico_Citas_{fecha_inicio}_{fecha_fin}_{datetime.now().strftime('%d%m%Y_%H%M%S')}.pdf"
-        return send_file(buffer, as_attachment=True, download_name=filename, mimetype='application/pdf')
+        if not info:
+            logger.warning(f"Usuario {current_user.id} intentó exportar datos de {tipo} inexistente: {params[0]}")
+            return jsonify({"error": f"{tipo.capitalize()} no encontrado"}), 404
+
+        # 2. Registrar auditoría
+        logger.info(f"Usuario {current_user.id} exportó histórico ({tipo} {params}, {formato})")
+
+        # 3. Generar el archivo leyendo las citas a medida que se escriben
+        titulo, nombre_archivo = describir_exportacion(tipo, info, formato)
+        output = tempfile.TemporaryFile()
+        cur = mysql.connection.cursor(SSCursor)
+        try:
+            consultar_historico(cur, tipo, params)
+            if formato == 'excel':
+                total = escribir_excel(cur, titulo, output)
+            else:
+                total = escribir_pdf(cur, tipo, titulo, output)
+        finally:
+            cur.close()
+        output.seek(0)
+        logger.info(f"Reporte {nombre_archivo} generado con {total} registros")
+
+        # 4. Enviar el archivo
+        return send_file(
+            output,
+            as_attachment=True,
+            download_name=nombre_archivo,
+            mimetype=MIMETYPES[formato]
+        )
 
     except Exception as e:
-        logger.error(f"Error al exportar PDF por fecha: {str(e)}", exc_info=True)
+        logger.error(f"Error al exportar {formato} ({tipo} {params}): {str(e)}", exc_info=True)
         return jsonify({"error": "Error interno del servidor"}), 500
 
-@historico_bp.route('/exportar/fecha')
+
+@historico_bp.route('/exportaciones', methods=['POST'])
 @login_required
-def exportar_excel_fecha():
-    try:
-        # Obtener parámetros de fecha
-        fecha_inicio = request.args.get('fecha_inicio')
-        fecha_fin = request.args.get('fecha_fin')
+@limiter.limit("20 per minute")
+def crear_exportacion():
+    """
+    Encola una exportación en segundo plano y devuelve su id.
 
-        if not fecha_inicio or not fecha_fin:
-            return jsonify({"error": "Se requieren ambas fechas"}), 400
+    Parámetros (formulario o JSON): tipo ('doctor', 'paciente' o 'fecha'),
+    formato ('excel' o 'pdf') e id, o fecha_inicio y fecha_fin.
+    """
+    datos = request.get_json(silent=True) or request.form
+    tipo = datos.get('tipo')
+    formato = datos.get('formato')
+
+    if tipo not in FILTROS_EXPORTACION or formato not in MIMETYPES:
+        return jsonify({"error": "Tipo o formato de exportación inválido"}), 400
+    if formato == 'pdf' and not REPORTLAB_AVAILABLE:
+        return jsonify({"error": "La generación de PDF requiere la librería reportlab (instalar reportlab)"}), 501
 
-        # Convertir a objetos de fecha
+    if tipo == 'fecha':
+        params, error = parametros_rango_fechas(datos)
+        if error:
+            return error
+    else:
         try:
-            fecha_inicio_obj = datetime.strptime(
-                fecha_inicio, '%Y-%m-%d').date()
-            fecha_fin_obj = datetime.strptime(fecha_fin, '%Y-%m-%d').date()
-        except ValueError:
-            return jsonify({"error": "Formato de fecha inválido"}), 400
+            params = (int(datos.get('id')),)
+        except (TypeError, ValueError):
+            return jsonify({"error": "Se requiere un id válido"}), 400
 
-        # Obtener las citas para el rango de fechas
-        cur = mysql.connection.cursor()
-        cur.execute('''
-            SELECT 
-                c.id_cita,
-                DATE_FORMAT(c.fecha, '%%d/%%m/%%Y') as fecha,
-                c.hora,
-                c.estado,
-                c.motivo,
-                CONCAT(p.nombre, ' ', p.apellido) as paciente,
-                CONCAT(d.nombre, ' ', d.apellido) as doctor    
-            FROM citas c 
-            JOIN pacientes p ON c.id_paciente = p.id_paciente
-            JOIN doctores d ON c.id_doctor = d.id_doctor          
-            WHERE c.fecha BETWEEN %s AND %s AND c.estado IN ('completada', 'cancelada')
-            ORDER BY c.fecha DESC, c.hora DESC
-        ''', (fecha_inicio_obj, fecha_fin_obj))
-
-        citas = cur.fetchall()
-        cur.close()
+    job_id = cola_exportaciones.encolar(current_user.id, tipo, formato, params)
+    return jsonify({
+        "job_id": job_id,
+        "estado": ESTADO_PENDIENTE,
+        "estado_url": url_for('historico.estado_exportacion', job_id=job_id)
+    }), 202
 
-        # Generar el Excel
-        titulo = f"Histórico de citas - Período: {fecha_inicio} al {fecha_fin}"
-        nombre_archivo = f"Historico_Citas_{fecha_inicio}_{fecha_fin}.xlsx"
 
-        return generar_excel_historico(citas, titulo, nombre_archivo)
+@historico_bp.route('/exportaciones/<job_id>')
+@login_required
+def estado_exportacion(job_id):
+    """Estado de una exportación en segundo plano"""
+    estado = cola_exportaciones.estado(job_id)
+    if not estado or estado.get('usuario_id') != current_user.id:
+        return jsonify({"error": "Exportación no encontrada"}), 404
+
+    respuesta = {
+        "job_id": job_id,
+        "estado": estado['estado'],
+        "registros": estado.get('registros'),
+        "error": estado.get('error')
+    }
+    if estado['estado'] == ESTADO_COMPLETADO:
+        respuesta["descarga_url"] = url_for('historico.descargar_exportacion', job_id=job_id)
+    return jsonify(respuesta)
+
+
+@historico_bp.route('/exportaciones/<job_id>/descargar')
+@login_required
+def descargar_exportacion(job_id):
+    """Descarga el archivo de una exportación terminada"""
+    estado = cola_exportaciones.estado(job_id)
+    if not estado or estado.get('usuario_id') != current_user.id:
+        return jsonify({"error": "Exportación no encontrada"}), 404
+    if estado['estado'] != ESTADO_COMPLETADO or not os.path.exists(estado.get('archivo', '')):
+        return jsonify({"error": "La exportación no está disponible"}), 409
 
-    except Exception as e:
-        print(f"Error al exportar a Excel: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        return jsonify({"error": str(e)}), 500
+    return send_file(
+        estado['archivo'],
+        as_attachment=True,
+        download_name=estado['nombre_archivo'],
+        mimetype=MIMETYPES[estado['formato']]
+    )
 
 
-def generar_excel_historico(datos, titulo, nombre_archivo):
-    """
-    Función auxiliar para generar un archivo Excel con el histórico de citas
+def desde_por_defecto(hasta):
+    """Inicio del rango sin fecha inicial: 90 días, o menos si el máximo configurado es menor"""
+    return hasta - timedelta(days=max(0, min(90, current_app.config['ESTADISTICAS_RANGO_MAXIMO_DIAS'] - 1)))
 
-    Args:
-        datos: Lista de tuplas con los datos de las citas
-        titulo: Título del reporte
-        nombre_archivo: Nombre del archivo a generar
+
+def leer_fecha(valor, defecto):
+    return datetime.strptime(valor, '%Y-%m-%d').date() if valor else defecto
+
+
+def parametros_estadisticas(args):
+    """
+    Lee periodo, desde, hasta e id_doctor de la query string.
 
     Returns:
-        Respuesta Flask con el archivo Excel adjunto
+        Diccionario de parámetros (lanza ValueError si no son válidos)
     """
+    periodo = args.get('periodo', 'semana')
+    if periodo not in PERIODOS:
+        raise ValueError("Período inválido (usar 'dia', 'semana' o 'mes')")
     try:
-        # Crear un nuevo libro de Excel
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = "Histórico de citas"
-
-        # Estilos
-        header_font = Font(bold=True, color="FFFFFF")
-        header_fill = PatternFill(
-            start_color="0066CC", end_color="0066CC", fill_type="solid")
-        centered = Alignment(horizontal="center", vertical="center")
-
-        # Título del reporte
-        ws.merge_cells('A1:F1')
-        ws['A1'] = titulo
-        ws['A1'].font = Font(bold=True, size=14)
-        ws['A1'].alignment = Alignment(horizontal="center")
-
-        # Fecha de generación
-        ws.merge_cells('A2:F2')
-        ws['A2'] = f"Generado el: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}"
-        ws['A2'].alignment = Alignment(horizontal="right")
-
-        # Encabezados
-        headers = ["Fecha", "Hora", "Paciente", "Doctor", "Motivo", "Estado"]
-        for col_num, header in enumerate(headers, 1):
-            cell = ws.cell(row=4, column=col_num)
-            cell.value = header
-            cell.font = header_font
-            cell.fill = header_fill
-            cell.alignment = centered
-
-        # Datos
-        if not datos:
-            ws.merge_cells('A5:F5')
-            ws['A5'] = "No hay registros históricos"
-            ws['A5'].alignment = Alignment(horizontal="center")
-        else:
-            for row_num, cita in enumerate(datos, 5):
-                # Fecha
-                ws.cell(row=row_num, column=1).value = cita[1]
-
-                # Hora (formatear si es un objeto timedelta)
-                hora = cita[2]
-                if isinstance(hora, timedelta):
-                    total_seconds = int(hora.total_seconds())
-                    hours = total_seconds // 3600
-                    minutes = (total_seconds % 3600) // 60
-                    hora_str = f"{hours:02d}:{minutes:02d}"
-                else:
-                    hora_str = str(hora)
-                ws.cell(row=row_num, column=2).value = hora_str
-
-                # Paciente
-                ws.cell(row=row_num, column=3).value = cita[5]
-
-                # Doctor
-                ws.cell(row=row_num, column=4).value = cita[6]
-
-                # Motivo
-                ws.cell(row=row_num, column=5).value = cita[4]
-
-                # Estado (mapeado a nombre amigable)
-                estado_cell = ws.cell(row=row_num, column=6)
-                estado_mapeado = mapear_estado(cita[3])
-                estado_cell.value = estado_mapeado
-
-                # Color según el estado
-                estado_lower = cita[3].lower()
-                if estado_lower == 'completada':
-                    estado_cell.fill = PatternFill(
-                        start_color="90EE90", end_color="90EE90", fill_type="solid")
-                elif estado_lower == 'cancelada':
-                    estado_cell.fill = PatternFill(
-                        start_color="FFC0CB", end_color="FFC0CB", fill_type="solid")
-
-        # Ajustar anchos de columna
-        column_widths = {}
-
-        # Calcular el ancho máximo para cada columna
-        for row in ws.rows:
-            for cell in row:
-                if cell.value:
-                    # Obtener la columna solo si no es una celda combinada
-                    if not isinstance(cell, openpyxl.cell.cell.MergedCell):
-                        col_letter = cell.column_letter
-                        # Inicializar si es la primera vez que vemos esta columna
-                        if col_letter not in column_widths:
-                            column_widths[col_letter] = 0
-                        # Actualizar el ancho máximo
-                        column_widths[col_letter] = max(
-                            column_widths[col_letter], len(str(cell.value)))
-
-        # Aplicar los anchos calculados
-        for col_letter, width in column_widths.items():
-            ws.column_dimensions[col_letter].width = width + 2
-
-        # Guardar a un buffer en memoria
-        output = io.BytesIO()
-        wb.save(output)
-        output.seek(0)
+        hasta = leer_fecha(args.get('hasta'), date.today())
+        desde = leer_fecha(args.get('desde'), None) or desde_por_defecto(hasta)
+    except ValueError:
+        raise ValueError('Formato de fecha inválido')
+    if desde > hasta:
+        raise ValueError('La fecha inicial es posterior a la final')
+    if (hasta - desde).days >= current_app.config['ESTADISTICAS_RANGO_MAXIMO_DIAS']:
+        raise ValueError(f"El rango no puede superar {current_app.config['ESTADISTICAS_RANGO_MAXIMO_DIAS']} días")
+    return {
+        'periodo': periodo,
+        'desde': desde,
+        'hasta': hasta,
+        'id_doctor': args.get('id_doctor', type=int),
+    }
+
+
+def parametros_ajustados(args):
+    """
+    Parámetros válidos lo más parecidos a los pedidos, para mostrar la página
+    cuando parametros_estadisticas los rechaza: lo que no se puede leer toma
+    su valor por defecto y el rango se recorta al máximo permitido.
+    """
+    periodo = args.get('periodo') if args.get('periodo') in PERIODOS else 'semana'
+    try:
+        hasta = leer_fecha(args.get('hasta'), date.today())
+    except ValueError:
+        hasta = date.today()
+    try:
+        desde = leer_fecha(args.get('desde'), None) or desde_por_defecto(hasta)
+    except ValueError:
+        desde = desde_por_defecto(hasta)
+    maximo = max(1, current_app.config['ESTADISTICAS_RANGO_MAXIMO_DIAS'])
+    desde = min(max(desde, hasta - timedelta(days=maximo - 1)), hasta)
+    return {
+        'periodo': periodo,
+        'desde': desde,
+        'hasta': hasta,
+        'id_doctor': args.get('id_doctor', type=int),
+    }
+
+
+def obtener_estadisticas(parametros):
+    """Recalcula los días pendientes (hasta ESTADISTICAS_REFRESCO_EN_LINEA) y consulta las estadísticas"""
+    config = current_app.config
+    limite = int(config['ESTADISTICAS_REFRESCO_EN_LINEA'])
+    if limite > 0:
+        # Normalmente actualizar_estadisticas.py ya recalculó todo: un COUNT sin
+        # bloqueos evita abrir transacciones de escritura en cada consulta
+        cur = mysql.connection.cursor()
+        try:
+            hay_pendientes = estadisticas_pendientes(cur) > 0
+        finally:
+            cur.close()
+        if hay_pendientes:
+            refrescar_estadisticas(mysql.connection, limite=limite)
 
-        # Enviar el archivo
-        return send_file(
-            output,
-            as_attachment=True,
-            download_name=nombre_archivo,
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    inicio = minuto_del_dia(config['CITAS_HORA_INICIO'])
+    fin = minuto_del_dia(config['CITAS_HORA_FIN'])
+    turnos_por_dia = max(0, fin - inicio) // config['CITAS_DURACION_MINUTOS']
+
+    cur = mysql.connection.cursor()
+    try:
+        doctores = consultar_estadisticas(
+            cur, parametros['periodo'], parametros['desde'], parametros['hasta'] + timedelta(days=1),
+            id_doctor=parametros['id_doctor'], turnos_por_dia=turnos_por_dia,
+            laborables=config['ESTADISTICAS_DIAS_LABORABLES']
         )
+    finally:
+        cur.close()
+    return {
+        'periodo': parametros['periodo'],
+        'desde': parametros['desde'].isoformat(),
+        'hasta': parametros['hasta'].isoformat(),
+        'turnos_por_dia': turnos_por_dia,
+        'doctores': doctores,
+    }
+
+
+@historico_bp.route('/estadisticas')
+@login_required
+def estadisticas():
+    doctores = Doctor.obtener_todos(orden='apellido')
+    try:
+        parametros = parametros_estadisticas(request.args)
+    except ValueError as e:
+        # Se muestra la página con el error y parámetros válidos (redirigir a
+        # la misma URL sin argumentos podía repetir el mismo error en bucle)
+        flash(str(e), 'danger')
+        parametros = parametros_ajustados(request.args)
+    return render_template('historico/estadisticas.html', doctores=doctores,
+                           parametros=parametros, resultado=obtener_estadisticas(parametros))
 
+
+@historico_bp.route('/api/estadisticas')
+@login_required
+@limiter.limit("100 per minute")
+def api_estadisticas():
+    """
+    Estadísticas por doctor: agendadas, completadas, canceladas, ocupación
+    y horas pico por día, semana o mes.
+
+    Parámetros: periodo (dia|semana|mes), desde, hasta (YYYY-MM-DD), id_doctor
+    """
+    try:
+        parametros = parametros_estadisticas(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        return jsonify(obtener_estadisticas(parametros))
     except Exception as e:
-        print(f"Error al generar Excel: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        return jsonify({"error": str(e)}), 500
+        logger.error(f"Error en api_estadisticas: {str(e)}", exc_info=True)
+        return jsonify({"error": "Error interno del servidor"}), 500
@@ -1,10 +1,9 @@
-from flask_mail import Mail, Message
 from flask import current_app
+from app.correos import bandeja_salida
 
 
 class EmailNotifier:
-    def __init__(self):
-        self.mail = Mail(current_app)
+    """Arma las notificaciones y las deja en la bandeja de salida (no espera al SMTP)"""
 
     def enviar_notificacion_cita(self, email_paciente, nombre_paciente, nombre_doctor, fecha, hora):
         try:
@@ -30,15 +29,13 @@ class EmailNotifier:
             </html>
             """
 
-            msg = Message(
-                subject="Confirmación de cita médica",
-                recipients=[email_paciente],
+            bandeja_salida.encolar(
+                destinatario=email_paciente,
+                asunto="Confirmación de cita médica",
                 html=html_content,
-                sender=current_app.config['MAIL_DEFAULT_SENDER']
+                remitente=current_app.config['MAIL_DEFAULT_SENDER']
             )
-
-            self.mail.send(msg)
-            return True, "Notificación enviada exitosamente"
+            return True, "Notificación en cola de envío"
 
         except Exception as e:
             return False, f"Error al enviar notificación: {str(e)}"
\ No newline at end of file
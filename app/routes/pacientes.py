@@ -1,21 +1,28 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash
+from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app, jsonify
 from app.models import Paciente
+from app.paginacion import parametros_listado, POR_PAGINA_OPCIONES
 from flask_login import login_required
 from datetime import datetime
-from app import mysql
+from app import mysql, limiter
 
 pacientes_bp = Blueprint('pacientes', __name__)
 
+# Autocompletado de pacientes
+BUSQUEDA_LIMITE_POR_DEFECTO = 10
+BUSQUEDA_LIMITE_MAXIMO = 50
+BUSQUEDA_LARGO_MAXIMO = 100
+
 @pacientes_bp.route('/')
 @login_required
 def index():
-    cur = mysql.connection.cursor()
+    parametros = parametros_listado(request.args, current_app.config['LISTADO_POR_PAGINA'])
     try:
-        cur.execute('SELECT * FROM pacientes ORDER BY apellido, nombre')
-        pacientes = cur.fetchall()
-        return render_template('pacientes/index.html', pacientes=pacientes)
-    finally:
-        cur.close()
+        pagina = Paciente.listar(**parametros)
+    except ValueError:
+        flash('El enlace de paginación no es válido', 'warning')
+        return redirect(url_for('pacientes.index'))
+    return render_template('pacientes/index.html', pacientes=pagina.filas, pagina=pagina,
+                           por_pagina_opciones=POR_PAGINA_OPCIONES)
 
 @pacientes_bp.route('/nuevo', methods=['GET', 'POST'])
 @login_required
@@ -61,6 +68,7 @@ def editar(id_paciente):
             ''', (nombre, apellido, telefono, email, fecha_nacimiento, id_paciente))
             
             mysql.connection.commit()
+            Paciente.invalidar_cache()
             flash('Paciente actualizado exitosamente', 'success')
             return redirect(url_for('pacientes.index'))
         
@@ -96,10 +104,31 @@ def eliminar(id_paciente):
     try:
         cur.execute('DELETE FROM pacientes WHERE id_paciente = %s', (id_paciente,))
         mysql.connection.commit()
+        Paciente.invalidar_cache()
         flash('Paciente eliminado exitosamente', 'success')
     except Exception as e:
         flash('Error al eliminar el paciente: ' + str(e), 'danger')
     finally:
         cur.close()
     
-    return redirect(url_for('pacientes.index'))
\ No newline at end of file
+    return redirect(url_for('pacientes.index'))
+
+@pacientes_bp.route('/api/buscar')
+@login_required
+@limiter.limit("300 per minute")
+def api_buscar():
+    """Autocompletado de pacientes por cédula, nombre o apellido (parámetros q y limit)"""
+    termino = request.args.get('q', '')[:BUSQUEDA_LARGO_MAXIMO]
+    try:
+        limite = int(request.args.get('limit', BUSQUEDA_LIMITE_POR_DEFECTO))
+    except ValueError:
+        return jsonify({"error": "El parámetro limit debe ser un número"}), 400
+    limite = max(1, min(limite, BUSQUEDA_LIMITE_MAXIMO))
+
+    pacientes = Paciente.buscar(termino, limite)
+    return jsonify({
+        "pacientes": [
+            {"id_paciente": p[0], "nombre": p[1], "apellido": p[2]}
+            for p in pacientes
+        ]
+    })
@@ -3,6 +3,7 @@ Módulo de logging de eventos de seguridad.
 Registra intentos de login fallidos, cambios de contraseña, y otros eventos de seguridad.
 """
 import logging
+import os
 from datetime import datetime, timezone, timedelta
 from functools import wraps
 from flask import request
@@ -23,28 +24,43 @@ class ColombiaTimeFormatter(logging.Formatter):
         return s
 
 
-# Configurar logger de seguridad
+# Configurar logger de seguridad (el archivo se agrega en SecurityLogger.init_app)
 security_logger = logging.getLogger('security')
 security_logger.setLevel(logging.INFO)
 
-# Handler para archivo
-file_handler = logging.FileHandler('logs/security.log', encoding='utf-8')
-file_handler.setLevel(logging.INFO)
 
-# Formato del log con zona horaria de Colombia
-formatter = ColombiaTimeFormatter(
-    '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    datefmt='%Y/%m/%d %H:%M:%S'
-)
-file_handler.setFormatter(formatter)
+class SecurityLogger:
+    """Clase para logging de eventos de seguridad"""
+
+    @staticmethod
+    def init_app(app):
+        """
+        Agrega el handler de archivo al logger de seguridad. Se llama desde
+        create_app, no al importar el módulo, para que importar la aplicación
+        no cree directorios ni abra archivos.
+        """
+        app.config.setdefault('SECURITY_LOG_ARCHIVO', os.path.join('logs', 'security.log'))
+        ruta = app.config['SECURITY_LOG_ARCHIVO']
 
-# Agregar handler si no existe
-if not security_logger.handlers:
-    security_logger.addHandler(file_handler)
+        # Agregar handler si no existe
+        if security_logger.handlers:
+            return
 
+        directorio = os.path.dirname(ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
 
-class SecurityLogger:
-    """Clase para logging de eventos de seguridad"""
+        # Handler para archivo (se abre con el primer evento registrado)
+        file_handler = logging.FileHandler(ruta, encoding='utf-8', delay=True)
+        file_handler.setLevel(logging.INFO)
+
+        # Formato del log con zona horaria de Colombia
+        formatter = ColombiaTimeFormatter(
+            '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+            datefmt='%Y/%m/%d %H:%M:%S'
+        )
+        file_handler.setFormatter(formatter)
+        security_logger.addHandler(file_handler)
     
     @staticmethod
     def log_login_attempt(username: str, success: bool, ip_address: str = None):
@@ -0,0 +1,44 @@
+function confirmPasswordReset(button) {
+    const userId = button.getAttribute('data-user-id');
+    const username = button.getAttribute('data-username');
+
+    if (confirm(`¿Estás seguro de que deseas resetear la contraseña del usuario ${username}?`)) {
+        const form = document.getElementById(`resetForm${userId}`);
+        const csrfToken = form.querySelector('input[name="csrf_token"]').value;
+
+        fetch(form.action, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'X-CSRFToken': csrfToken,
+            },
+        })
+            .then(response => response.json())
+            .then(data => {
+                if (data.success) {
+                    document.getElementById('newPassword').value = data.password;
+                    new bootstrap.Modal(document.getElementById('passwordModal')).show();
+                } else {
+                    alert('Error al resetear la contraseña');
+                }
+            })
+            .catch(error => {
+                console.error('Error:', error);
+                alert('Error al resetear la contraseña');
+            });
+    }
+}
+
+function copyPassword() {
+    const passwordInput = document.getElementById('newPassword');
+    passwordInput.select();
+    document.execCommand('copy');
+
+    // Muestra una notificación de copiado
+    const button = event.target.closest('button');
+    const originalText = button.innerHTML;
+    button.innerHTML = '<i class="fas fa-check"></i> Copiado';
+    setTimeout(() => {
+        button.innerHTML = originalText;
+    }, 2000);
+}
@@ -0,0 +1,106 @@
+(function () {
+    'use strict'
+
+    // Referencias a elementos del DOM
+    const passwordField = document.getElementById('password');
+    const confirmField = document.getElementById('confirm_password');
+    const passwordFeedback = document.getElementById('password-feedback');
+    const confirmFeedback = document.getElementById('confirm-feedback');
+    const form = document.querySelector('form');
+
+    // Validación de Bootstrap
+    var forms = document.querySelectorAll('.needs-validation')
+    Array.prototype.slice.call(forms)
+        .forEach(function (form) {
+            form.addEventListener('submit', function (event) {
+                if (!form.checkValidity()) {
+                    event.preventDefault()
+                    event.stopPropagation()
+                }
+                form.classList.add('was-validated')
+            }, false)
+        })
+
+    // Función para validar la contraseña
+    function validatePassword() {
+        const password = passwordField.value;
+
+        // La contraseña es obligatoria en el registro
+        if (password === '') {
+            passwordField.setCustomValidity('La contraseña es obligatoria');
+            passwordFeedback.textContent = 'La contraseña es obligatoria';
+            return false;
+        }
+
+        // Validar longitud
+        if (password.length < 8) {
+            passwordField.setCustomValidity('La contraseña debe tener al menos 8 caracteres');
+            passwordFeedback.textContent = 'La contraseña debe tener al menos 8 caracteres';
+            return false;
+        }
+
+        // Validar complejidad
+        const hasNumber = /\d/.test(password);
+        const hasLetter = /[a-zA-Z]/.test(password);
+        const hasSpecial = /[!@#$%^&*()_+\-=\[\]{};':"\\|,.<>\/?]/.test(password);
+
+        if (!hasNumber || !hasLetter || !hasSpecial) {
+            passwordField.setCustomValidity('La contraseña debe contener al menos un número, una letra y un carácter especial');
+            passwordFeedback.textContent = 'La contraseña debe contener al menos un número, una letra y un carácter especial';
+            return false;
+        }
+
+        // Si pasa todas las validaciones
+        passwordField.setCustomValidity('');
+        return true;
+    }
+
+    // Función para validar la confirmación de contraseña
+    function validateConfirmPassword() {
+        const password = passwordField.value;
+        const confirm = confirmField.value;
+
+        // La confirmación es obligatoria en el registro
+        if (confirm === '') {
+            confirmField.setCustomValidity('Debe confirmar su contraseña');
+            confirmFeedback.textContent = 'Debe confirmar su contraseña';
+            return false;
+        }
+
+        // Si las contraseñas no coinciden
+        if (confirm !== password) {
+            confirmField.setCustomValidity('Las contraseñas no coinciden');
+            confirmFeedback.textContent = 'Las contraseñas no coinciden';
+            return false;
+        }
+
+        // Si coinciden
+        confirmField.setCustomValidity('');
+        return true;
+    }
+
+    // Eventos para validación en tiempo real
+    passwordField.addEventListener('input', function () {
+        validatePassword();
+        if (confirmField.value) {
+            validateConfirmPassword();
+        }
+    });
+
+    confirmField.addEventListener('input', function () {
+        validateConfirmPassword();
+    });
+
+    // Validación en el envío del formulario
+    form.addEventListener('submit', function (event) {
+        const isPasswordValid = validatePassword();
+        const isConfirmValid = validateConfirmPassword();
+
+        if (!isPasswordValid || !isConfirmValid) {
+            event.preventDefault();
+            event.stopPropagation();
+        }
+
+        form.classList.add('was-validated');
+    });
+})();
@@ -0,0 +1,57 @@
+// URL para encolar exportaciones (atributo data-crear-exportacion de la etiqueta <script>)
+const URL_CREAR_EXPORTACION = document.currentScript.dataset.crearExportacion;
+
+document.addEventListener('DOMContentLoaded', function () {
+    const alerts = document.querySelectorAll('.alert');
+
+    alerts.forEach(function (alert) {
+        setTimeout(function () {
+            // Agregar clase para fade out
+            alert.classList.add('fade-out');
+
+            // Remover el elemento después de la animación
+            setTimeout(function () {
+                alert.remove();
+            }, 500);
+        }, 3000); // Esperar 3 segundos antes de comenzar el fade out
+    });
+});
+
+// Encola una exportación en segundo plano, consulta su estado y descarga el archivo al terminar
+function exportarEnSegundoPlano(parametros) {
+    const csrfToken = document.querySelector('meta[name="csrf-token"]').content;
+    fetch(URL_CREAR_EXPORTACION, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+            'X-CSRFToken': csrfToken
+        },
+        body: JSON.stringify(parametros)
+    })
+        .then(response => response.json().then(data => ({ ok: response.ok, data })))
+        .then(({ ok, data }) => {
+            if (!ok) {
+                throw new Error(data.error || 'No se pudo iniciar la exportación');
+            }
+            consultarExportacion(data.estado_url, 1000);
+        })
+        .catch(error => alert(error.message));
+}
+
+function consultarExportacion(estadoUrl, espera) {
+    setTimeout(function () {
+        fetch(estadoUrl)
+            .then(response => response.json())
+            .then(data => {
+                if (data.estado === 'completado') {
+                    window.location.href = data.descarga_url;
+                } else if (data.estado === 'error' || !data.estado) {
+                    alert('Error al generar la exportación: ' + (data.error || 'desconocido'));
+                } else {
+                    // Espera creciente hasta 5 segundos entre consultas
+                    consultarExportacion(estadoUrl, Math.min(espera * 2, 5000));
+                }
+            })
+            .catch(() => alert('No se pudo consultar el estado de la exportación'));
+    }, espera);
+}
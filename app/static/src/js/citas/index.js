@@ -0,0 +1,95 @@
+// Función para formatear el mes con inicial mayúscula
+function formatMonthDisplay(yearMonth) {
+    const meses = ['Enero', 'Febrero', 'Marzo', 'Abril', 'Mayo', 'Junio',
+        'Julio', 'Agosto', 'Septiembre', 'Octubre', 'Noviembre', 'Diciembre'];
+    const [year, month] = yearMonth.split('-');
+    const monthIndex = parseInt(month) - 1;
+    return `${meses[monthIndex]} de ${year}`;
+}
+
+// Actualizar el display del mes al cargar la página
+document.addEventListener('DOMContentLoaded', function () {
+    const monthInput = document.getElementById('selected-month');
+    const monthDisplay = document.getElementById('month-display');
+
+    if (monthInput && monthDisplay) {
+        monthDisplay.value = formatMonthDisplay(monthInput.value);
+
+        // Permitir click en el display para abrir el selector
+        monthDisplay.addEventListener('click', function () {
+            monthInput.showPicker();
+        });
+
+        // Actualizar el display cuando cambie el mes
+        monthInput.addEventListener('change', function () {
+            monthDisplay.value = formatMonthDisplay(monthInput.value);
+        });
+    }
+});
+
+// Navegación de fechas
+document.getElementById('prev-date')?.addEventListener('click', function () {
+    const dateInput = document.getElementById('selected-date');
+    const fecha = new Date(dateInput.value);
+    fecha.setDate(fecha.getDate() - 1);
+    dateInput.value = fecha.toISOString().split('T')[0];
+    document.getElementById('date-form').submit();
+});
+
+document.getElementById('next-date')?.addEventListener('click', function () {
+    const dateInput = document.getElementById('selected-date');
+    const fecha = new Date(dateInput.value);
+    fecha.setDate(fecha.getDate() + 1);
+    dateInput.value = fecha.toISOString().split('T')[0];
+    document.getElementById('date-form').submit();
+});
+
+// Navegación de meses
+document.getElementById('prev-month')?.addEventListener('click', function () {
+    const monthInput = document.getElementById('selected-month');
+    const monthDisplay = document.getElementById('month-display');
+    const [anio, mes] = monthInput.value.split('-').map(Number);
+
+    let nuevoMes = mes - 1;
+    let nuevoAnio = anio;
+
+    if (nuevoMes < 1) {
+        nuevoMes = 12;
+        nuevoAnio -= 1;
+    }
+
+    const nuevoMesStr = nuevoMes.toString().padStart(2, '0');
+    monthInput.value = `${nuevoAnio}-${nuevoMesStr}`;
+    monthDisplay.value = formatMonthDisplay(monthInput.value);
+
+    document.getElementById('month-form').submit();
+});
+
+document.getElementById('next-month')?.addEventListener('click', function () {
+    const monthInput = document.getElementById('selected-month');
+    const monthDisplay = document.getElementById('month-display');
+    const [anio, mes] = monthInput.value.split('-').map(Number);
+
+    let nuevoMes = mes + 1;
+    let nuevoAnio = anio;
+
+    if (nuevoMes > 12) {
+        nuevoMes = 1;
+        nuevoAnio += 1;
+    }
+
+    const nuevoMesStr = nuevoMes.toString().padStart(2, '0');
+    monthInput.value = `${nuevoAnio}-${nuevoMesStr}`;
+    monthDisplay.value = formatMonthDisplay(monthInput.value);
+
+    document.getElementById('month-form').submit();
+});
+
+// Enviar formulario cuando cambie la fecha o mes
+document.getElementById('selected-date')?.addEventListener('change', function () {
+    document.getElementById('date-form').submit();
+});
+
+document.getElementById('selected-month')?.addEventListener('change', function () {
+    document.getElementById('month-form').submit();
+});
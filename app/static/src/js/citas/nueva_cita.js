@@ -0,0 +1,213 @@
+// URLs de las APIs (atributos data-* de la etiqueta <script>)
+const URL_BUSCAR_PACIENTES = document.currentScript.dataset.buscarPacientes;
+const URL_VERIFICAR_DISPONIBILIDAD = document.currentScript.dataset.verificarDisponibilidad;
+
+document.addEventListener('DOMContentLoaded', function () {
+    'use strict'
+
+    // Validación de Bootstrap
+    var forms = document.querySelectorAll('.needs-validation')
+    Array.prototype.slice.call(forms)
+        .forEach(function (form) {
+            form.addEventListener('submit', function (event) {
+                if (!form.checkValidity()) {
+                    event.preventDefault()
+                    event.stopPropagation()
+                }
+                form.classList.add('was-validated')
+            }, false)
+        })
+
+    // Establecer fecha mínima como hoy
+    var today = new Date().toISOString().split('T')[0];
+    document.getElementById('fecha').setAttribute('min', today);
+
+    // Establecer la hora actual por defecto
+    const horaInput = document.getElementById('hora');
+    if (!horaInput.value) {
+        const ahora = new Date();
+        let horas = ahora.getHours();
+        let minutos = ahora.getMinutes();
+
+        // Formatear horas y minutos para asegurar formato HH:MM
+        horas = horas < 10 ? '0' + horas : horas;
+        minutos = minutos < 10 ? '0' + minutos : minutos;
+
+        horaInput.value = `${horas}:${minutos}`;
+    }
+
+    // Autocompletado de pacientes (el id elegido va en el campo oculto id_paciente)
+    const buscarPaciente = document.getElementById('buscar_paciente');
+    const idPacienteInput = document.getElementById('id_paciente');
+    const sugerenciasPaciente = document.getElementById('sugerencias_paciente');
+    let temporizadorBusqueda = null;
+    let busquedaEnCurso = null;
+
+    function limpiarSugerencias() {
+        sugerenciasPaciente.innerHTML = '';
+    }
+
+    function seleccionarPaciente(paciente) {
+        idPacienteInput.value = paciente.id_paciente;
+        buscarPaciente.value = `${paciente.nombre} ${paciente.apellido} (${paciente.id_paciente})`;
+        buscarPaciente.setCustomValidity('');
+        limpiarSugerencias();
+    }
+
+    function mostrarSugerencias(pacientes) {
+        limpiarSugerencias();
+        if (pacientes.length === 0) {
+            const vacio = document.createElement('div');
+            vacio.className = 'list-group-item text-muted';
+            vacio.textContent = 'No se encontraron pacientes';
+            sugerenciasPaciente.appendChild(vacio);
+            return;
+        }
+        pacientes.forEach(function (paciente) {
+            const item = document.createElement('button');
+            item.type = 'button';
+            item.className = 'list-group-item list-group-item-action';
+            item.textContent = `${paciente.nombre} ${paciente.apellido} (${paciente.id_paciente})`;
+            item.addEventListener('click', function () {
+                seleccionarPaciente(paciente);
+            });
+            sugerenciasPaciente.appendChild(item);
+        });
+    }
+
+    buscarPaciente.addEventListener('input', function () {
+        // Cualquier cambio en el texto anula la selección anterior
+        idPacienteInput.value = '';
+        clearTimeout(temporizadorBusqueda);
+        const termino = this.value.trim();
+        if (!termino) {
+            limpiarSugerencias();
+            return;
+        }
+        temporizadorBusqueda = setTimeout(function () {
+            if (busquedaEnCurso) {
+                busquedaEnCurso.abort();
+            }
+            busquedaEnCurso = new AbortController();
+            const params = new URLSearchParams({ q: termino, limit: 10 });
+            fetch(`${URL_BUSCAR_PACIENTES}?${params}`, { signal: busquedaEnCurso.signal })
+                .then(response => {
+                    if (!response.ok) {
+                        throw new Error('Error en la respuesta del servidor');
+                    }
+                    return response.json();
+                })
+                .then(data => mostrarSugerencias(data.pacientes))
+                .catch(error => {
+                    if (error.name !== 'AbortError') {
+                        console.error('Error al buscar pacientes:', error);
+                    }
+                });
+        }, 200);
+    });
+
+    document.addEventListener('click', function (event) {
+        if (!sugerenciasPaciente.contains(event.target) && event.target !== buscarPaciente) {
+            limpiarSugerencias();
+        }
+    });
+
+    // Manejar el botón de editar doctor (si está presente)
+    const selectDoctor = document.getElementById('id_doctor');
+    const btnEditarDoctor = document.getElementById('btnEditarDoctor');
+    const urlBaseDoctor = btnEditarDoctor ? btnEditarDoctor.getAttribute('data-url-base') : null;
+
+    if (btnEditarDoctor) selectDoctor.addEventListener('change', function () {
+        if (this.value) {
+            btnEditarDoctor.href = urlBaseDoctor.replace('0', this.value);
+            btnEditarDoctor.disabled = false;
+        } else {
+            btnEditarDoctor.href = '#';
+            btnEditarDoctor.disabled = true;
+        }
+    });
+
+    // Validar disponibilidad de cita al seleccionar fecha, hora y doctor
+    const fechaInput = document.getElementById('fecha');
+
+    function validarDisponibilidad() {
+        const fecha = fechaInput.value;
+        const hora = horaInput.value;
+        const doctorId = selectDoctor.value;
+
+        // Limpiar mensajes de error previos
+        fechaInput.setCustomValidity('');
+        horaInput.setCustomValidity('');
+        document.getElementById('hora-feedback').textContent = '';
+
+        if (fecha && hora && doctorId) {
+            // Verificar día laborable (lunes a sábado)
+            const fechaObj = new Date(fecha);
+            const diaSemana = fechaObj.getDay(); // 0 = domingo, 6 = sábado
+
+            if (diaSemana === 0) {
+                fechaInput.setCustomValidity('Las citas solo están disponibles de lunes a sábado');
+                document.getElementById('fecha-feedback').textContent = 'Las citas solo están disponibles de lunes a sábado';
+                return false;
+            }
+
+            // Verificar disponibilidad con el servidor (sin restricción de horario)
+            fetch(`${URL_VERIFICAR_DISPONIBILIDAD}?fecha=${fecha}&hora=${hora}&doctor_id=${doctorId}`)
+                .then(response => {
+                    if (!response.ok) {
+                        throw new Error('Error en la respuesta del servidor');
+                    }
+                    return response.json();
+                })
+                .then(data => {
+                    if (!data.disponible) {
+                        horaInput.setCustomValidity('El doctor no está disponible en este horario');
+                        document.getElementById('hora-feedback').textContent = 'El doctor no está disponible en este horario';
+                    }
+                })
+                .catch(error => {
+                    console.error('Error al verificar disponibilidad:', error);
+                    // Si hay error de conexión, permitimos continuar pero mostramos advertencia
+                    document.getElementById('hora-feedback').textContent = 'No se pudo verificar la disponibilidad';
+                });
+        }
+
+        return true;
+    }
+
+    // Agregar validación adicional para asegurar que se seleccionen paciente y doctor
+    document.querySelector('form').addEventListener('submit', function (event) {
+        const idPaciente = document.getElementById('id_paciente').value;
+        const idDoctor = document.getElementById('id_doctor').value;
+
+        if (!idPaciente || !idDoctor) {
+            event.preventDefault();
+
+            if (!idPaciente) {
+                buscarPaciente.setCustomValidity('Debe seleccionar un paciente');
+            } else {
+                buscarPaciente.setCustomValidity('');
+            }
+
+            if (!idDoctor) {
+                document.getElementById('id_doctor').setCustomValidity('Debe seleccionar un doctor');
+            } else {
+                document.getElementById('id_doctor').setCustomValidity('');
+            }
+
+            // Mostrar los mensajes de validación
+            document.querySelector('form').classList.add('was-validated');
+        }
+    });
+
+    // Limpiar validaciones al cambiar selección
+    selectDoctor.addEventListener('change', function () {
+        if (this.value) {
+            this.setCustomValidity('');
+        }
+    });
+
+    fechaInput.addEventListener('change', validarDisponibilidad);
+    horaInput.addEventListener('change', validarDisponibilidad);
+    selectDoctor.addEventListener('change', validarDisponibilidad);
+});
@@ -0,0 +1,59 @@
+document.addEventListener('DOMContentLoaded', function () {
+    const exportDropdown = document.getElementById('exportDropdown');
+    const exportLinks = document.querySelectorAll('.export-link');
+    const fechaInicioInput = document.getElementById('fecha_inicio');
+    const fechaFinInput = document.getElementById('fecha_fin');
+
+    // Función para establecer las fechas por defecto (primer y último día del mes)
+    function establecerFechasPorDefecto() {
+        // Verificar si ya hay valores en los campos
+        if (!fechaInicioInput.value && !fechaFinInput.value) {
+            const hoy = new Date();
+
+            // Primer día del mes actual
+            const primerDia = new Date(hoy.getFullYear(), hoy.getMonth(), 1);
+
+            // Último día del mes actual
+            const ultimoDia = new Date(hoy.getFullYear(), hoy.getMonth() + 1, 0);
+
+            // Formatear fechas como YYYY-MM-DD para el input type="date"
+            fechaInicioInput.value = primerDia.toISOString().split('T')[0];
+            fechaFinInput.value = ultimoDia.toISOString().split('T')[0];
+        }
+    }
+
+    // Establecer fechas por defecto al cargar la página
+    establecerFechasPorDefecto();
+
+    // Manejar botón de limpiar
+    document.getElementById('limpiarFiltros').addEventListener('click', function () {
+        // Limpiar los campos de fecha
+        fechaInicioInput.value = '';
+        fechaFinInput.value = '';
+
+        // Redirigir a la página sin parámetros
+        window.location.href = window.location.pathname;
+    });
+
+    // Manejar selección de formato en menú de exportación
+    exportLinks.forEach(function(link){
+        link.addEventListener('click', function(e){
+            e.preventDefault();
+            const format = this.dataset.format;
+            const fechaInicio = fechaInicioInput.value;
+            const fechaFin = fechaFinInput.value;
+
+            if (!fechaInicio || !fechaFin) {
+                alert('Por favor, seleccione un rango de fechas completo para exportar');
+                return;
+            }
+
+            exportarEnSegundoPlano({
+                tipo: 'fecha',
+                formato: format,
+                fecha_inicio: fechaInicio,
+                fecha_fin: fechaFin
+            });
+        });
+    });
+});
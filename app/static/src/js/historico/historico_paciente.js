@@ -0,0 +1,179 @@
+// Mapeo de estados
+const MAPEO_ESTADOS = {
+    'completada': 'Completada',
+    'cancelada': 'Cancelada'
+};
+
+function mapearEstado(estado) {
+    if (!estado) return 'Desconocido';
+    const estadoLower = estado.toLowerCase().trim();
+    return MAPEO_ESTADOS[estadoLower] || estado;
+}
+
+function getColorEstado(estado) {
+    const estadoLower = estado.toLowerCase();
+    if (estadoLower === 'completada') return 'bg-success';
+    if (estadoLower === 'rechazada' || estadoLower === 'cancelada') return 'bg-danger';
+    return 'bg-secondary';
+}
+
+// Registros por página de la API de histórico
+const TAMANO_PAGINA = 50;
+
+// Tabla del template con una fila por registro (textContent: sin HTML de los datos)
+function renderizarHistorico(template, historicos) {
+    const tabla = template.content.cloneNode(true);
+    if (historicos.length === 0) return tabla;
+    const tbody = tabla.querySelector('tbody');
+    tbody.querySelector('.fila-vacia').remove();
+    historicos.forEach(function (historico) {
+        const fila = document.createElement('tr');
+        [historico.fecha, historico.hora, historico.paciente, historico.doctor, historico.motivo].forEach(function (valor) {
+            const celda = document.createElement('td');
+            celda.textContent = valor ?? '';
+            fila.appendChild(celda);
+        });
+        const badge = document.createElement('span');
+        badge.className = `badge ${getColorEstado(historico.estado)}`;
+        badge.textContent = mapearEstado(historico.estado);
+        const celdaEstado = document.createElement('td');
+        celdaEstado.appendChild(badge);
+        fila.appendChild(celdaEstado);
+        tbody.appendChild(fila);
+    });
+    return tabla;
+}
+
+document.addEventListener('DOMContentLoaded', function () {
+    const filtroForm = document.getElementById('filtroForm');
+    const resultadosTabla = document.getElementById('resultadosTabla');
+    const tablaHistoricoTemplate = document.getElementById('tablaHistoricoTemplate');
+    const pacienteSelect = document.getElementById('paciente_id');
+    const exportDropdown = document.getElementById('exportDropdown');
+    const exportLinks = document.querySelectorAll('.export-link');
+
+    let datosActuales = []; // Para almacenar los datos actuales y usarlos en la exportación
+
+    // Para depuración
+    console.log("Número de pacientes cargados:", pacienteSelect.options.length - 1);
+
+    // Verificar si hay pacientes cargados
+    if (pacienteSelect.options.length <= 1) {
+        console.error("No se cargaron pacientes en el selector");
+    }
+
+    // Manejar envío del formulario
+    filtroForm.addEventListener('submit', function (e) {
+        e.preventDefault();
+
+        console.log("Valor seleccionado:", pacienteSelect.value);
+        console.log("Índice seleccionado:", pacienteSelect.selectedIndex);
+        console.log("Texto seleccionado:", pacienteSelect.options[pacienteSelect.selectedIndex]?.text);
+
+        if (pacienteSelect.value && pacienteSelect.value !== "") {
+            cargarHistorico();
+        } else {
+            resultadosTabla.innerHTML = '<div class="alert alert-warning">Por favor, seleccione un paciente primero</div>';
+            exportDropdown.disabled = true;
+        }
+    });
+
+    // Manejar botón de limpiar
+    document.getElementById('limpiarFiltros').addEventListener('click', function () {
+        pacienteSelect.selectedIndex = 0;
+        resultadosTabla.innerHTML = '';
+        exportDropdown.disabled = true;
+        datosActuales = [];
+    });
+
+    // Manejar selección de formato en menú de exportación
+    exportLinks.forEach(function(link){
+        link.addEventListener('click', function(e){
+            e.preventDefault();
+            const format = this.dataset.format;
+            if (datosActuales.length === 0) {
+                alert('No hay datos para exportar');
+                return;
+            }
+            const pacienteId = pacienteSelect.value;
+            exportarEnSegundoPlano({ tipo: 'paciente', formato: format, id: pacienteId });
+        });
+    });
+
+    function cargarHistorico(cursor) {
+        const pacienteId = pacienteSelect.value;
+
+        // Mostrar indicador de carga
+        if (!cursor) {
+            datosActuales = [];
+            resultadosTabla.innerHTML = '<div class="text-center"><div class="spinner-border" role="status"><span class="visually-hidden">Cargando...</span></div></div>';
+        }
+        exportDropdown.disabled = true;
+
+        // Construir la URL para la API (usando la ruta correcta con prefijo)
+        const params = new URLSearchParams({ limit: TAMANO_PAGINA });
+        if (cursor) params.set('cursor', cursor);
+        const apiUrl = `/historico/api/paciente/${pacienteId}?${params}`;
+
+        console.log("Llamando a API:", apiUrl);
+        console.log("Método: GET");
+        console.log("Headers: XMLHttpRequest");
+
+        fetch(apiUrl, {
+            method: 'GET',
+            headers: {
+                'X-Requested-With': 'XMLHttpRequest',
+                'Accept': 'application/json',
+                'Content-Type': 'application/json'
+            },
+            credentials: 'same-origin'
+        })
+            .then(response => {
+                console.log("Response status:", response.status);
+                console.log("Response headers:", response.headers);
+
+                if (!response.ok) {
+                    console.error(`HTTP error! status: ${response.status}`);
+                    // Intentar leer el cuerpo del error
+                    return response.text().then(text => {
+                        throw new Error(`HTTP ${response.status}: ${text}`);
+                    });
+                }
+                return response.json();
+            })
+            .then(data => {
+                // La API devuelve una página: { citas, next_cursor }
+                datosActuales = datosActuales.concat(data.citas); // Guardar los datos para exportación
+                resultadosTabla.replaceChildren(renderizarHistorico(tablaHistoricoTemplate, datosActuales));
+
+                // Botón para cargar la siguiente página
+                if (data.next_cursor) {
+                    const btnMas = document.createElement('button');
+                    btnMas.type = 'button';
+                    btnMas.className = 'btn btn-outline-primary d-block mx-auto mb-4';
+                    btnMas.innerHTML = '<i class="fas fa-chevron-down"></i> Cargar más';
+                    btnMas.addEventListener('click', function () {
+                        btnMas.disabled = true;
+                        cargarHistorico(data.next_cursor);
+                    });
+                    resultadosTabla.appendChild(btnMas);
+                }
+
+                // Habilitar el dropdown de exportación si hay datos
+                exportDropdown.disabled = datosActuales.length === 0;
+            })
+            .catch(error => {
+                console.error('Error completo:', error);
+                console.error('Error message:', error.message);
+                console.error('Error stack:', error.stack);
+
+                resultadosTabla.innerHTML = `<div class="alert alert-danger">
+                    <strong>Error al cargar los datos:</strong>
+                    <p>${error.message}</p>
+                    <small>Verifica la consola del navegador (F12) para más detalles.</small>
+                </div>`;
+                exportDropdown.disabled = true;
+                datosActuales = [];
+            });
+    }
+});
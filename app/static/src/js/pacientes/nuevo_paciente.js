@@ -0,0 +1,51 @@
+(function () {
+    'use strict'
+
+    // Fetch all the forms we want to apply custom Bootstrap validation styles to
+    var forms = document.querySelectorAll('.needs-validation')
+
+    // Loop over them and prevent submission
+    Array.prototype.slice.call(forms)
+        .forEach(function (form) {
+            form.addEventListener('submit', function (event) {
+                if (!form.checkValidity()) {
+                    event.preventDefault()
+                    event.stopPropagation()
+                }
+
+                form.classList.add('was-validated')
+            }, false)
+        })
+})()
+
+// Establecer la fecha máxima como hoy
+document.addEventListener('DOMContentLoaded', function() {
+    var today = new Date().toISOString().split('T')[0];
+    document.getElementById('fecha_nacimiento').setAttribute('max', today);
+});
+
+// Validación adicional para la cédula
+document.getElementById('cedula').addEventListener('input', function(e) {
+    this.value = this.value.replace(/[^0-9]/g, '');
+});
+
+// Validación adicional para el teléfono
+document.getElementById('telefono').addEventListener('input', function(e) {
+    this.value = this.value.replace(/[^0-9]/g, '');
+});
+
+// Validación adicional para el email
+document.getElementById('email').addEventListener('input', function(e) {
+    const emailValue = this.value;
+    const emailField = this;
+
+    // Verificar si contiene @
+    if (emailValue && !emailValue.includes('@')) {
+        emailField.setCustomValidity('El correo electrónico debe contener el símbolo @');
+    } else {
+        emailField.setCustomValidity('');
+    }
+
+    // Mostrar la validación visualmente
+    emailField.reportValidity();
+});
@@ -0,0 +1,152 @@
+"""
+Respuestas condicionales (ETag / Last-Modified) a partir de sellos de versión.
+
+Cada recurso de datos tiene un sello (token aleatorio + momento del cambio)
+guardado en `cache_listas.sellos`, el archivo SQLite que comparten todos los
+workers (SELLOS_RUTA): las citas en general, cada fecha,
+cada doctor y cada paciente, y las listas de pacientes y doctores. Los
+modelos generan un sello nuevo al modificar los datos.
+
+El decorador `respuesta_condicional` calcula el ETag de una vista a partir
+de los sellos que declara, la URL y el usuario. Si coincide con
+If-None-Match (o If-Modified-Since no es anterior al último cambio) responde
+304 sin ejecutar la vista, es decir, sin consultar las citas. Como el sello
+es el mismo en todos los workers, un cambio hecho en cualquiera de ellos
+cambia el ETag en todos de inmediato.
+"""
+import hashlib
+import math
+import os
+import threading
+import time
+import uuid
+from datetime import date, datetime, timezone
+from functools import wraps
+
+from flask import make_response, request, session
+from flask_login import current_user
+
+from app.cache import cache_listas, FALTA
+
+# Recursos globales
+RECURSO_CITAS = ('citas',)
+RECURSO_PACIENTES = ('pacientes',)
+RECURSO_DOCTORES = ('doctores',)
+
+
+def recurso_fecha(valor):
+    """Recurso de un día; '2024-1-5' y date(2024, 1, 5) dan la misma clave"""
+    if not isinstance(valor, date):
+        try:
+            valor = datetime.strptime(str(valor), '%Y-%m-%d').date()
+        except ValueError:
+            return ('fecha', str(valor))  # la vista responde 400: no hay datos que versionar
+    return ('fecha', valor.isoformat())
+
+
+def recurso_doctor(id_doctor):
+    return ('doctor', int(id_doctor))
+
+
+def recurso_paciente(id_paciente):
+    return ('paciente', int(id_paciente))
+
+
+class VersionesRecursos:
+    """Sellos de versión de los recursos y contadores de respuestas 304"""
+
+    def __init__(self):
+        self.ttl = 300
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def init_app(self, app):
+        app.config.setdefault('VERSIONES_TTL', 300)
+        self.ttl = float(app.config['VERSIONES_TTL'])
+
+    @staticmethod
+    def _clave(recurso):
+        return 'version:' + ':'.join(str(parte) for parte in recurso)
+
+    def obtener(self, recurso):
+        """(token, momento) del recurso; si no tiene sello se crea uno"""
+        sello = cache_listas.sellos.get(self._clave(recurso))
+        if sello is FALTA:
+            sello = (uuid.uuid4().hex, math.ceil(time.time()))
+            cache_listas.sellos.set(self._clave(recurso), sello, self.ttl)
+        return sello
+
+    def invalidar(self, *recursos):
+        """Genera sellos nuevos: las respuestas que dependen de estos recursos cambian de ETag"""
+        # Last-Modified tiene resolución de segundos: el momento se redondea hacia
+        # arriba y siempre avanza al menos un segundo, así un cambio en el mismo
+        # segundo que la respuesta anterior no pasa por "no modificado"
+        ahora = math.ceil(time.time())
+        for recurso in recursos:
+            clave = self._clave(recurso)
+            anterior = cache_listas.sellos.get(clave)
+            momento = ahora if anterior is FALTA else max(ahora, anterior[1] + 1)
+            cache_listas.sellos.set(clave, (uuid.uuid4().hex, momento), self.ttl)
+
+    def _contar(self, endpoint, contador):
+        with self._lock:
+            stats = self._stats.setdefault(endpoint, {'completas': 0, 'no_modificadas': 0})
+            stats[contador] += 1
+
+    def estadisticas(self):
+        """Respuestas completas y 304 por endpoint en el worker actual"""
+        with self._lock:
+            endpoints = {nombre: dict(stats) for nombre, stats in self._stats.items()}
+        for stats in endpoints.values():
+            total = stats['completas'] + stats['no_modificadas']
+            stats['tasa_304'] = round(stats['no_modificadas'] / total, 3) if total else None
+        return {'pid': os.getpid(), 'endpoints': endpoints}
+
+
+versiones = VersionesRecursos()
+
+
+def respuesta_condicional(recursos):
+    """
+    Decorador de vistas GET con ETag fuerte y Last-Modified.
+
+    Args:
+        recursos: Función que recibe los argumentos de la vista y devuelve
+            la lista de recursos de los que depende la respuesta
+    """
+    def decorador(vista):
+        @wraps(vista)
+        def envoltura(*args, **kwargs):
+            # Con mensajes flash pendientes la página no es la misma: no se responde 304
+            if request.method != 'GET' or session.get('_flashes'):
+                return vista(*args, **kwargs)
+
+            sellos = [versiones.obtener(recurso) for recurso in recursos(*args, **kwargs)]
+            usuario = current_user.get_id() if current_user.is_authenticated else ''
+            material = '|'.join([request.full_path, str(usuario)] + [token for token, _ in sellos])
+            etag = hashlib.sha256(material.encode()).hexdigest()[:32]
+            modificado = datetime.fromtimestamp(max((m for _, m in sellos), default=0), timezone.utc)
+
+            if request.if_none_match:
+                # Comparación débil: la capa de compresión entrega el ETag como W/"..."
+                no_modificado = request.if_none_match.contains_weak(etag)
+            else:
+                no_modificado = (request.if_modified_since is not None
+                                 and request.if_modified_since >= modificado)
+
+            if no_modificado:
+                versiones._contar(request.endpoint, 'no_modificadas')
+                respuesta = make_response('', 304)
+            else:
+                versiones._contar(request.endpoint, 'completas')
+                respuesta = make_response(vista(*args, **kwargs))
+                if respuesta.status_code != 200:
+                    return respuesta
+
+            respuesta.set_etag(etag)
+            respuesta.last_modified = modificado
+            # El navegador guarda la respuesta pero la revalida siempre
+            respuesta.headers['Cache-Control'] = 'private, no-cache'
+            return respuesta
+        return envoltura
+    return decorador
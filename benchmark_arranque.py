@@ -0,0 +1,135 @@
+"""
+Mide el arranque en frío de la aplicación y falla si supera el presupuesto.
+
+Cada repetición corre en un proceso nuevo de Python, como un worker de
+Gunicorn o el CLI de flask, y mide tres tramos:
+
+- importación: `import app`
+- create_app: configuración, extensiones y registro de blueprints
+- primera petición: la primera respuesta de --ruta (incluye compilar plantillas)
+
+Además comprueba que al terminar la primera petición no se hayan cargado las
+librerías pesadas que solo usan las exportaciones (openpyxl, reportlab).
+Termina con código 1 si la mediana de algún tramo supera su presupuesto o si
+se cargó alguna de esas librerías, así que puede usarse en CI:
+
+    python benchmark_arranque.py
+    python benchmark_arranque.py --repeticiones 10 --max-importacion 400 --detalle
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+# Librerías que no deben cargarse al arrancar
+PESADAS = ('openpyxl', 'reportlab')
+
+TRAMOS = ('importacion', 'create_app', 'primera_peticion')
+
+
+def medir_en_este_proceso(ruta):
+    """Mide los tramos del arranque e imprime el resultado como JSON"""
+    inicio = time.perf_counter()
+    import app as paquete
+    importado = time.perf_counter()
+    aplicacion = paquete.create_app()
+    creada = time.perf_counter()
+    respuesta = aplicacion.test_client().get(ruta)
+    respondida = time.perf_counter()
+
+    print(json.dumps({
+        'importacion': (importado - inicio) * 1000,
+        'create_app': (creada - importado) * 1000,
+        'primera_peticion': (respondida - creada) * 1000,
+        'status': respuesta.status_code,
+        'pesadas': [nombre for nombre in PESADAS if nombre in sys.modules],
+    }))
+    sys.stdout.flush()
+    # Sin esperar a los hilos y pools en segundo plano que dejó create_app
+    os._exit(0)
+
+
+def medir_en_proceso_nuevo(ruta, importtime=False):
+    comando = [sys.executable]
+    if importtime:
+        comando += ['-X', 'importtime']
+    comando += [os.path.abspath(__file__), '--hijo', '--ruta', ruta]
+    proceso = subprocess.run(comando, capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)))
+    if proceso.returncode != 0:
+        sys.exit(f'El proceso de medición falló:\n{proceso.stderr}')
+    resultado = json.loads(proceso.stdout.strip().splitlines()[-1])
+    return resultado, proceso.stderr
+
+
+def modulos_mas_lentos(salida_importtime, cantidad):
+    """Módulos (y sus importaciones directas) con más tiempo acumulado según -X importtime"""
+    tiempos = []
+    for linea in salida_importtime.splitlines():
+        m = re.match(r'import time:\s+\d+ \|\s+(\d+) \| ( *)(\S+)', linea)
+        if m and len(m.group(2)) <= 2:
+            tiempos.append((int(m.group(1)) / 1000, m.group(3)))
+    return sorted(tiempos, reverse=True)[:cantidad]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Arranque en frío de la aplicación con presupuesto de tiempo')
+    parser.add_argument('--repeticiones', type=int, default=5)
+    parser.add_argument('--ruta', default='/auth/login', help='Ruta de la primera petición')
+    parser.add_argument('--max-importacion', type=float, default=600, help='Presupuesto en ms')
+    parser.add_argument('--max-create-app', type=float, default=400, help='Presupuesto en ms')
+    parser.add_argument('--max-primera-peticion', type=float, default=300, help='Presupuesto en ms')
+    parser.add_argument('--detalle', action='store_true',
+                        help='Muestra los módulos que más tardan en importarse (-X importtime)')
+    parser.add_argument('--hijo', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.hijo:
+        medir_en_este_proceso(args.ruta)
+
+    presupuestos = {
+        'importacion': args.max_importacion,
+        'create_app': args.max_create_app,
+        'primera_peticion': args.max_primera_peticion,
+    }
+
+    resultados = [medir_en_proceso_nuevo(args.ruta)[0] for _ in range(args.repeticiones)]
+    fallas = []
+
+    print(f"{'Tramo':<18} {'Mediana':>10} {'Mínimo':>10} {'Máximo':>10} {'Presupuesto':>12}")
+    for tramo in TRAMOS:
+        valores = [r[tramo] for r in resultados]
+        mediana = statistics.median(valores)
+        estado = '' if mediana <= presupuestos[tramo] else '  EXCEDIDO'
+        print(f"{tramo:<18} {mediana:>8.1f}ms {min(valores):>8.1f}ms {max(valores):>8.1f}ms "
+              f"{presupuestos[tramo]:>10.0f}ms{estado}")
+        if estado:
+            fallas.append(f'{tramo}: {mediana:.1f} ms > {presupuestos[tramo]:.0f} ms')
+
+    total = statistics.median(sum(r[tramo] for tramo in TRAMOS) for r in resultados)
+    print(f"{'total':<18} {total:>8.1f}ms")
+    print(f"Respuesta de {args.ruta}: {resultados[0]['status']}")
+
+    pesadas = sorted({nombre for r in resultados for nombre in r['pesadas']})
+    if pesadas:
+        fallas.append('librerías cargadas al arrancar: ' + ', '.join(pesadas))
+
+    if args.detalle or fallas:
+        _, salida = medir_en_proceso_nuevo(args.ruta, importtime=True)
+        print('\nMódulos más lentos de importar (acumulado):')
+        for milisegundos, modulo in modulos_mas_lentos(salida, 15):
+            print(f'  {milisegundos:>8.1f}ms  {modulo}')
+
+    if fallas:
+        print('\nPresupuesto de arranque superado:')
+        for falla in fallas:
+            print(f'  - {falla}')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,372 @@
+"""
+Prueba de carga de los caminos principales contra un servidor en marcha.
+
+Pensado para una base de datos de prueba con datos sintéticos, nunca para la
+de producción: el escenario nueva_cita crea citas de verdad. El servidor debe
+correr con RATELIMIT_ENABLED=false para que los límites de peticiones no
+corten la prueba:
+
+    RATELIMIT_ENABLED=false python produccion.py
+    python benchmark_carga.py --usuario recepcion --contrasena ... --pid <PID de gunicorn>
+
+Cada escenario se ejecuta por separado con --concurrencia sesiones en
+paralelo (cada una con su login) durante --duracion segundos y se mide:
+peticiones por segundo, latencias p50/p95/p99 y errores. Con --pid se
+muestrea además la memoria residente (RSS) de ese proceso y sus hijos, es
+decir, de los workers de Gunicorn (solo en Linux, vía /proc).
+
+El resultado se guarda en JSON (--salida) y con --comparar se muestra la
+diferencia contra una ejecución anterior:
+
+    python benchmark_carga.py ... --escenarios citas_dia,historico_doctor
+    python benchmark_carga.py ... --comparar resultados_benchmark/carga_20250101_120000.json
+"""
+import argparse
+import http.cookiejar
+import json
+import math
+import os
+import platform
+import random
+import re
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import date, datetime, timedelta
+
+CSRF = re.compile(r'name="csrf_token" value="([^"]+)"|name="csrf-token" content="([^"]+)"')
+
+
+def opciones_de(html, id_select):
+    """Valores de las <option> del <select id=...> de una página"""
+    m = re.search(r'<select[^>]*id="%s"[^>]*>(.*?)</select>' % re.escape(id_select), html, re.S)
+    if not m:
+        return []
+    return [int(v) for v in re.findall(r'<option value="(\d+)"', m.group(1))]
+
+
+class SinRedirecciones(urllib.request.HTTPRedirectHandler):
+    """Mide la respuesta misma (302 de un POST exitoso) sin seguir la redirección"""
+
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class Sesion:
+    """Cliente HTTP con cookies propias, como un navegador con la sesión iniciada"""
+
+    def __init__(self, base, comprimir):
+        self.base = base.rstrip('/')
+        self.cookies = http.cookiejar.CookieJar()
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(self.cookies), SinRedirecciones())
+        self.cabeceras = {'Accept-Encoding': 'gzip'} if comprimir else {}
+        self.csrf = None
+
+    def pedir(self, metodo, ruta, datos=None):
+        """(status, cuerpo); el cuerpo se lee completo para medir también la transferencia"""
+        cuerpo = urllib.parse.urlencode(datos).encode() if datos is not None else None
+        peticion = urllib.request.Request(self.base + ruta, data=cuerpo, method=metodo, headers=self.cabeceras)
+        try:
+            with self.opener.open(peticion, timeout=120) as respuesta:
+                return respuesta.status, respuesta.read()
+        except urllib.error.HTTPError as error:
+            return error.code, error.read()
+
+    def iniciar_sesion(self, usuario, contrasena):
+        _, html = self.pedir('GET', '/auth/login')
+        self.csrf = self._token(html)
+        status, _ = self.pedir('POST', '/auth/login', {
+            'csrf_token': self.csrf, 'username': usuario, 'password': contrasena})
+        if status != 302:
+            raise RuntimeError(f'No se pudo iniciar sesión como {usuario} (HTTP {status})')
+        # El token queda ligado a la sesión ya iniciada
+        _, html = self.pedir('GET', '/citas/nueva')
+        self.csrf = self._token(html)
+
+    @staticmethod
+    def _token(html):
+        m = CSRF.search(html.decode('utf-8', 'replace'))
+        if not m:
+            raise RuntimeError('No se encontró el token CSRF')
+        return m.group(1) or m.group(2)
+
+
+class Contexto:
+    """Datos para armar las peticiones: IDs existentes y rango de fechas"""
+
+    def __init__(self, doctores, pacientes, desde, hasta):
+        self.doctores = doctores
+        self.pacientes = pacientes
+        self.desde = desde
+        self.hasta = hasta
+
+    def fecha(self, rnd):
+        return self.desde + timedelta(days=rnd.randrange((self.hasta - self.desde).days + 1))
+
+
+def _nueva_cita(sesion, ctx, rnd):
+    # Fechas futuras al azar: algunas chocan con citas existentes y se miden igual (re-render con error)
+    fecha = date.today() + timedelta(days=rnd.randrange(1, 366))
+    minuto = 8 * 60 + 30 * rnd.randrange(20)
+    return 'POST', '/citas/nueva', {
+        'csrf_token': sesion.csrf,
+        'id_paciente': rnd.choice(ctx.pacientes),
+        'id_doctor': rnd.choice(ctx.doctores),
+        'fecha': fecha.isoformat(),
+        'hora': f'{minuto // 60:02d}:{minuto % 60:02d}',
+        'motivo': 'Prueba de carga',
+    }
+
+
+def _rango(ctx):
+    return urllib.parse.urlencode({'fecha_inicio': ctx.desde.isoformat(), 'fecha_fin': ctx.hasta.isoformat()})
+
+
+# nombre -> función (sesion, contexto, random) -> (método, ruta, datos del formulario)
+ESCENARIOS = {
+    'citas_dia': lambda s, ctx, rnd: (
+        'GET', f'/citas/?filter_type=day&date={ctx.fecha(rnd).isoformat()}', None),
+    'citas_mes': lambda s, ctx, rnd: (
+        'GET', f'/citas/?filter_type=month&month={ctx.fecha(rnd).strftime("%Y-%m")}', None),
+    'agendamiento': lambda s, ctx, rnd: ('GET', '/citas/agendamiento', None),
+    'nueva_cita': _nueva_cita,
+    'historico_paciente': lambda s, ctx, rnd: (
+        'GET', f'/historico/api/paciente/{rnd.choice(ctx.pacientes)}?limit=50', None),
+    'historico_doctor': lambda s, ctx, rnd: (
+        'GET', f'/historico/api/doctor/{rnd.choice(ctx.doctores)}?limit=50', None),
+    'excel_doctor': lambda s, ctx, rnd: ('GET', f'/historico/exportar/doctor/{rnd.choice(ctx.doctores)}', None),
+    'excel_paciente': lambda s, ctx, rnd: (
+        'GET', f'/historico/exportar/paciente/{rnd.choice(ctx.pacientes)}', None),
+    'excel_fecha': lambda s, ctx, rnd: ('GET', f'/historico/exportar/fecha?{_rango(ctx)}', None),
+    'pdf_doctor': lambda s, ctx, rnd: ('GET', f'/historico/exportar/pdf/doctor/{rnd.choice(ctx.doctores)}', None),
+    'pdf_paciente': lambda s, ctx, rnd: (
+        'GET', f'/historico/exportar/pdf/paciente/{rnd.choice(ctx.pacientes)}', None),
+    'pdf_fecha': lambda s, ctx, rnd: ('GET', f'/historico/exportar/pdf/fecha?{_rango(ctx)}', None),
+}
+
+
+class MonitorRSS:
+    """Muestrea la memoria residente de un proceso y sus descendientes (Linux)"""
+
+    def __init__(self, pid, intervalo=0.2):
+        self.pid = pid
+        self.intervalo = intervalo
+        self.max_total = 0
+        self.max_proceso = 0
+        self._detener = threading.Event()
+        self._hilo = None
+
+    @staticmethod
+    def _descendientes(pid):
+        pids = [pid]
+        for actual in pids:
+            try:
+                for tarea in os.listdir(f'/proc/{actual}/task'):
+                    with open(f'/proc/{actual}/task/{tarea}/children') as archivo:
+                        pids.extend(int(hijo) for hijo in archivo.read().split())
+            except OSError:
+                continue
+        return pids
+
+    @staticmethod
+    def _rss(pid):
+        try:
+            with open(f'/proc/{pid}/status') as archivo:
+                for linea in archivo:
+                    if linea.startswith('VmRSS:'):
+                        return int(linea.split()[1]) * 1024
+        except OSError:
+            pass
+        return 0
+
+    def _muestrear(self):
+        while not self._detener.is_set():
+            valores = [self._rss(pid) for pid in self._descendientes(self.pid)]
+            self.max_total = max(self.max_total, sum(valores))
+            self.max_proceso = max(self.max_proceso, max(valores, default=0))
+            self._detener.wait(self.intervalo)
+
+    def __enter__(self):
+        self.max_total = self.max_proceso = 0
+        self._detener.clear()
+        self._hilo = threading.Thread(target=self._muestrear, daemon=True)
+        self._hilo.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._detener.set()
+        self._hilo.join()
+
+
+def percentil(ordenados, p):
+    """Percentil por rango más cercano de una lista ya ordenada"""
+    if not ordenados:
+        return None
+    return ordenados[max(0, math.ceil(p / 100 * len(ordenados)) - 1)]
+
+
+def ejecutar_escenario(nombre, sesiones, ctx, duracion, calentamiento, semilla):
+    generar = ESCENARIOS[nombre]
+    latencias = []
+    errores = {}
+    bytes_recibidos = 0
+    lock = threading.Lock()
+    # Todas las sesiones calientan primero; la medición arranca a la vez para todas
+    reloj = {}
+    largada = threading.Barrier(len(sesiones), action=lambda: reloj.update(
+        inicio=time.perf_counter(), hasta=time.perf_counter() + duracion))
+
+    def trabajar(indice, sesion):
+        nonlocal bytes_recibidos
+        rnd = random.Random(f'{semilla}-{nombre}-{indice}')
+        for _ in range(calentamiento):
+            sesion.pedir(*generar(sesion, ctx, rnd))
+        largada.wait()
+        propias, fallidas, recibidos = [], {}, 0
+        while time.perf_counter() < reloj['hasta']:
+            metodo, ruta, datos = generar(sesion, ctx, rnd)
+            inicio = time.perf_counter()
+            try:
+                status, cuerpo = sesion.pedir(metodo, ruta, datos)
+                recibidos += len(cuerpo)
+            except OSError as error:
+                status = type(error).__name__
+            propias.append(time.perf_counter() - inicio)
+            if not isinstance(status, int) or status >= 400:
+                fallidas[str(status)] = fallidas.get(str(status), 0) + 1
+        with lock:
+            latencias.extend(propias)
+            bytes_recibidos += recibidos
+            for clave, cantidad in fallidas.items():
+                errores[clave] = errores.get(clave, 0) + cantidad
+
+    hilos = [threading.Thread(target=trabajar, args=(i, sesion)) for i, sesion in enumerate(sesiones)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    transcurrido = time.perf_counter() - reloj['inicio']
+
+    def ms(valor):
+        return round(valor * 1000, 2) if valor is not None else None
+
+    ordenadas = sorted(latencias)
+    return {
+        'peticiones': len(ordenadas),
+        'errores': sum(errores.values()),
+        'errores_por_status': errores,
+        'segundos': round(transcurrido, 2),
+        'peticiones_por_segundo': round(len(ordenadas) / transcurrido, 2) if transcurrido else None,
+        'p50_ms': ms(percentil(ordenadas, 50)),
+        'p95_ms': ms(percentil(ordenadas, 95)),
+        'p99_ms': ms(percentil(ordenadas, 99)),
+        'max_ms': ms(ordenadas[-1] if ordenadas else None),
+        'kb_por_respuesta': round(bytes_recibidos / len(ordenadas) / 1024, 1) if ordenadas else None,
+    }
+
+
+def comparar(actual, anterior):
+    print(f"\nComparación con {anterior['fecha']}:")
+    print(f"{'Escenario':<20} {'req/s':>10} {'Δ':>8} {'p95 ms':>10} {'Δ':>8}")
+    for nombre, datos in actual['escenarios'].items():
+        previo = anterior.get('escenarios', {}).get(nombre)
+        if not previo:
+            continue
+
+        def delta(clave):
+            if not previo.get(clave) or datos.get(clave) is None:
+                return '-'
+            return f"{(datos[clave] / previo[clave] - 1) * 100:+.1f}%"
+
+        print(f"{nombre:<20} {datos['peticiones_por_segundo']:>10} {delta('peticiones_por_segundo'):>8} "
+              f"{datos['p95_ms']:>10} {delta('p95_ms'):>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Prueba de carga de citas, agendamiento, histórico y exportaciones')
+    parser.add_argument('--url', default='http://localhost:8000')
+    parser.add_argument('--usuario', required=True, help='Usuario no administrador')
+    parser.add_argument('--contrasena', required=True)
+    parser.add_argument('--escenarios', default=','.join(ESCENARIOS),
+                        help='Lista separada por comas (por defecto todos)')
+    parser.add_argument('--concurrencia', type=int, default=8, help='Sesiones en paralelo')
+    parser.add_argument('--duracion', type=float, default=20, help='Segundos de medición por escenario')
+    parser.add_argument('--calentamiento', type=int, default=2, help='Peticiones sin medir por sesión')
+    parser.add_argument('--desde', help='Inicio del rango de fechas consultado (por defecto hace 1 año)')
+    parser.add_argument('--hasta', help='Fin del rango de fechas consultado (por defecto hoy)')
+    parser.add_argument('--pid', type=int, help='PID del servidor (master de Gunicorn) para medir la RSS')
+    parser.add_argument('--sin-gzip', action='store_true', help='No envía Accept-Encoding: gzip')
+    parser.add_argument('--semilla', type=int, default=1, help='Semilla para repetir las mismas peticiones')
+    parser.add_argument('--salida', help='Archivo JSON de resultados (por defecto en resultados_benchmark/)')
+    parser.add_argument('--comparar', help='JSON de una ejecución anterior')
+    args = parser.parse_args()
+
+    nombres = [n.strip() for n in args.escenarios.split(',') if n.strip()]
+    desconocidos = [n for n in nombres if n not in ESCENARIOS]
+    if desconocidos:
+        sys.exit(f"Escenarios desconocidos: {', '.join(desconocidos)}. Disponibles: {', '.join(ESCENARIOS)}")
+
+    hoy = date.today()
+    desde = datetime.strptime(args.desde, '%Y-%m-%d').date() if args.desde else hoy - timedelta(days=365)
+    hasta = datetime.strptime(args.hasta, '%Y-%m-%d').date() if args.hasta else hoy
+
+    print(f'Iniciando {args.concurrencia} sesiones en {args.url}...')
+    sesiones = []
+    for _ in range(args.concurrencia):
+        sesion = Sesion(args.url, comprimir=not args.sin_gzip)
+        sesion.iniciar_sesion(args.usuario, args.contrasena)
+        sesiones.append(sesion)
+
+    _, html_doctores = sesiones[0].pedir('GET', '/historico/doctor')
+    _, html_pacientes = sesiones[0].pedir('GET', '/historico/paciente')
+    ctx = Contexto(opciones_de(html_doctores.decode(), 'doctor_id'),
+                   opciones_de(html_pacientes.decode(), 'paciente_id'), desde, hasta)
+    if not ctx.doctores or not ctx.pacientes:
+        sys.exit('La base de datos no tiene doctores o pacientes: cargar datos de prueba primero')
+    print(f'{len(ctx.doctores)} doctores y {len(ctx.pacientes)} pacientes')
+
+    monitor = MonitorRSS(args.pid) if args.pid else None
+    resultados = {}
+    print(f"\n{'Escenario':<20} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errores':>8} {'RSS MB':>8}")
+    for nombre in nombres:
+        if monitor:
+            with monitor:
+                datos = ejecutar_escenario(nombre, sesiones, ctx, args.duracion, args.calentamiento, args.semilla)
+            datos['rss_max_worker_mb'] = round(monitor.max_proceso / 2**20, 1)
+            datos['rss_max_total_mb'] = round(monitor.max_total / 2**20, 1)
+        else:
+            datos = ejecutar_escenario(nombre, sesiones, ctx, args.duracion, args.calentamiento, args.semilla)
+        resultados[nombre] = datos
+        print(f"{nombre:<20} {datos['peticiones_por_segundo']:>8} {datos['p50_ms']:>9} {datos['p95_ms']:>9} "
+              f"{datos['p99_ms']:>9} {datos['errores']:>8} {datos.get('rss_max_worker_mb', '-'):>8}")
+
+    informe = {
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'url': args.url,
+        'concurrencia': args.concurrencia,
+        'duracion': args.duracion,
+        'semilla': args.semilla,
+        'rango': [desde.isoformat(), hasta.isoformat()],
+        'doctores': len(ctx.doctores),
+        'pacientes': len(ctx.pacientes),
+        'python': platform.python_version(),
+        'escenarios': resultados,
+    }
+    salida = args.salida or os.path.join(
+        'resultados_benchmark', f"carga_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(salida) or '.', exist_ok=True)
+    with open(salida, 'w', encoding='utf-8') as archivo:
+        json.dump(informe, archivo, indent=2, ensure_ascii=False)
+    print(f'\nResultados en {salida}')
+
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as archivo:
+            comparar(informe, json.load(archivo))
+
+
+if __name__ == '__main__':
+    main()
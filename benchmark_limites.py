@@ -0,0 +1,92 @@
+"""
+Mide el costo por verificación del almacenamiento de límites de peticiones.
+
+Ejecuta verificaciones contra RATELIMIT_STORAGE_URI (por defecto el SQLite
+compartido) con la estrategia indicada, desde uno o varios procesos a la vez
+como harían los workers de Gunicorn, y comprueba que entre todos no se
+concedan más accesos que el límite.
+
+Con varios procesos informa la latencia de cada verificación (mediana, p99
+y máximo) y el costo total: tiempo de reloj / verificaciones de todos los
+procesos. Con menos núcleos que procesos la latencia incluye el tiempo que
+cada proceso espera a la CPU, no solo al almacenamiento.
+
+    python benchmark_limites.py
+    python benchmark_limites.py --procesos 8 --verificaciones 5000 --estrategia fixed-window
+"""
+import argparse
+import os
+import tempfile
+import time
+from multiprocessing import Pool
+
+from limits import parse
+from limits.storage import storage_from_string
+from limits.strategies import STRATEGIES
+
+from app.config import Config
+import app.limites  # noqa: F401  registra el esquema sqlite://
+
+CLAVES = 200  # IPs distintas simuladas
+
+
+def medir(parametros):
+    """Duración en µs de cada verificación"""
+    uri, estrategia, verificaciones = parametros
+    limitador = STRATEGIES[estrategia](storage_from_string(uri))
+    limite = parse('1000000 per hour')
+    limitador.hit(limite, 'benchmark', 'calentamiento')  # abre la conexión y crea el esquema
+    tiempos = []
+    for i in range(verificaciones):
+        inicio = time.perf_counter()
+        limitador.hit(limite, 'benchmark', f'10.0.{i % CLAVES // 256}.{i % 256}')
+        tiempos.append((time.perf_counter() - inicio) * 1_000_000)
+    return tiempos
+
+
+def percentil(valores, p):
+    return valores[min(len(valores) - 1, int(len(valores) * p / 100))]
+
+
+def concedidos(parametros):
+    uri, estrategia, intentos = parametros
+    limitador = STRATEGIES[estrategia](storage_from_string(uri))
+    limite = parse('100 per minute')
+    return sum(limitador.hit(limite, 'benchmark', 'concurrencia') for _ in range(intentos))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Costo por verificación de los límites de peticiones')
+    parser.add_argument('--uri', default=None,
+                        help='Almacenamiento a medir (por defecto un SQLite temporal)')
+    parser.add_argument('--estrategia', default=Config.RATELIMIT_STRATEGY,
+                        choices=('fixed-window', 'moving-window'))
+    parser.add_argument('--procesos', type=int, default=4)
+    parser.add_argument('--verificaciones', type=int, default=2000, help='Verificaciones por proceso')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directorio:
+        uri = args.uri or 'sqlite:///' + os.path.join(directorio, 'limites.sqlite3')
+        storage_from_string(uri).reset()
+
+        with Pool(args.procesos) as pool:
+            solo = sorted(pool.map(medir, [(uri, args.estrategia, args.verificaciones)])[0])
+            print(f"{args.estrategia} en {uri} ({os.cpu_count()} CPU)")
+            print(f"1 proceso: {sum(solo) / len(solo):.1f} µs por verificación "
+                  f"(mediana {percentil(solo, 50):.1f}, p99 {percentil(solo, 99):.1f})")
+
+            inicio = time.perf_counter()
+            resultados = pool.map(medir, [(uri, args.estrategia, args.verificaciones)] * args.procesos)
+            reloj = time.perf_counter() - inicio
+            tiempos = sorted(t for r in resultados for t in r)
+            print(f"{args.procesos} procesos: {sum(tiempos) / len(tiempos):.1f} µs por verificación "
+                  f"(mediana {percentil(tiempos, 50):.1f}, p99 {percentil(tiempos, 99):.1f}, "
+                  f"máximo {tiempos[-1]:.1f}); costo total "
+                  f"{reloj / len(tiempos) * 1_000_000:.1f} µs por verificación")
+
+            total = sum(pool.map(concedidos, [(uri, args.estrategia, 60)] * args.procesos))
+            print(f"Límite 100/minuto, {args.procesos * 60} intentos concurrentes: {total} concedidos")
+
+
+if __name__ == '__main__':
+    main()
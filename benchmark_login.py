@@ -0,0 +1,71 @@
+"""
+Mide cuántos inicios de sesión por segundo soporta el costo de hash configurado.
+
+No usa la base de datos: verifica contraseñas contra un hash generado al
+inicio, primero en el hilo actual (un núcleo) y luego a través del pool de
+procesos con varios hilos concurrentes, como harían las peticiones de un
+worker web.
+
+    python benchmark_login.py
+    python benchmark_login.py --metodo pbkdf2:sha256:600000 --procesos 4 --logins 200
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from app.config import Config
+from app.contrasenas import PoolHash
+
+
+def medir_secuencial(password_hash, password, cantidad):
+    inicio = time.perf_counter()
+    for _ in range(cantidad):
+        check_password_hash(password_hash, password)
+    return cantidad / (time.perf_counter() - inicio)
+
+
+def medir_pool(pool, password_hash, password, cantidad, hilos):
+    # Calentar: arranca los procesos del pool fuera de la medición
+    pool.verificar(password_hash, password)
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=hilos) as executor:
+        resultados = list(executor.map(lambda _: pool.verificar(password_hash, password), range(cantidad)))
+    segundos = time.perf_counter() - inicio
+    assert all(resultados)
+    return cantidad / segundos
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Inicios de sesión por segundo según el costo del hash')
+    parser.add_argument('--metodo', default=Config.PASSWORD_HASH_METODO,
+                        help='Método de werkzeug (por defecto PASSWORD_HASH_METODO)')
+    parser.add_argument('--procesos', type=int, default=os.cpu_count(),
+                        help='Procesos del pool de hash (por defecto, uno por núcleo)')
+    parser.add_argument('--logins', type=int, default=50, help='Verificaciones por medición')
+    parser.add_argument('--hilos', type=int, default=0,
+                        help='Peticiones concurrentes contra el pool (0 = 2 por proceso)')
+    args = parser.parse_args()
+
+    password = 'Contraseña-de-prueba-1'
+    password_hash = generate_password_hash(password, args.metodo)
+    hilos = args.hilos or args.procesos * 2
+
+    print(f"Método: {password_hash.split('$', 1)[0]}")
+    por_nucleo = medir_secuencial(password_hash, password, max(1, args.logins // 5))
+    print(f"Secuencial (1 núcleo): {por_nucleo:.1f} logins/s, {1000 / por_nucleo:.0f} ms por login")
+
+    pool = PoolHash()
+    pool.metodo = args.metodo
+    pool.max_procesos = args.procesos
+    pool.max_pendientes = hilos
+    pool.timeout = 60
+    total = medir_pool(pool, password_hash, password, args.logins, hilos)
+    print(f"Pool de {args.procesos} procesos, {hilos} hilos: {total:.1f} logins/s "
+          f"({total / args.procesos:.1f} por núcleo)")
+
+
+if __name__ == '__main__':
+    main()
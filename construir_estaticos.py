@@ -0,0 +1,153 @@
+"""
+Construye los archivos estáticos con huella en app/static/dist.
+
+1. Con --descargar, baja las librerías de terceros (Bootstrap, Popper, Font
+   Awesome) que falten en app/static/vendor, en las versiones fijadas de
+   app/estaticos.py. La carpeta ya está versionada: solo hace falta al
+   cambiar de versión (con --forzar).
+2. Minifica los CSS y JS propios de app/static/src (los JS solo si está
+   instalado rjsmin; los .min de terceros se copian tal cual).
+3. Agrega el hash del contenido a cada nombre, reescribe las url(...) de los
+   CSS hacia los nombres con huella y escribe dist/manifest.json.
+
+Hay que ejecutarlo en cada despliegue o tras cambiar algo en src/:
+
+    python construir_estaticos.py
+    python construir_estaticos.py --descargar --forzar   # al cambiar de versión
+"""
+import argparse
+import hashlib
+import json
+import os
+import posixpath
+import re
+import shutil
+import sys
+import urllib.request
+
+from app.estaticos import LIBRERIAS, DIR_FUENTES, DIR_LIBRERIAS, DIR_SALIDA, MANIFIESTO
+
+STATIC = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app', 'static')
+
+URL_CSS = re.compile(r'url\(\s*([\'"]?)([^\'")]+)\1\s*\)')
+
+
+def descargar(forzar=False):
+    """Baja a static/vendor las librerías que falten"""
+    for nombre, url in LIBRERIAS.items():
+        destino = os.path.join(STATIC, *nombre.split('/'))
+        if os.path.exists(destino) and not forzar:
+            continue
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        print(f'Descargando {url}')
+        with urllib.request.urlopen(url, timeout=30) as respuesta:
+            contenido = respuesta.read()
+        temporal = destino + '.tmp'
+        with open(temporal, 'wb') as archivo:
+            archivo.write(contenido)
+        os.replace(temporal, destino)
+
+
+def fuentes():
+    """{nombre lógico: ruta} de src/ (sin prefijo) y de vendor/ (con prefijo vendor/)"""
+    archivos = {}
+    for carpeta, prefijo in ((DIR_FUENTES, ''), (DIR_LIBRERIAS, DIR_LIBRERIAS + '/')):
+        raiz = os.path.join(STATIC, carpeta)
+        for directorio, _, nombres in os.walk(raiz):
+            for nombre in nombres:
+                ruta = os.path.join(directorio, nombre)
+                relativo = os.path.relpath(ruta, raiz).replace(os.sep, '/')
+                archivos[prefijo + relativo] = ruta
+    return archivos
+
+
+def minificar_css(texto):
+    """Quita comentarios y espacios sobrantes (conservador: no toca los valores)"""
+    texto = re.sub(r'/\*.*?\*/', '', texto, flags=re.S)
+    texto = re.sub(r'\s+', ' ', texto)
+    texto = re.sub(r'\s*([{};,>])\s*', r'\1', texto)
+    texto = re.sub(r':\s+', ':', texto)
+    return texto.replace(';}', '}').strip() + '\n'
+
+
+def minificar_js(texto):
+    try:
+        import rjsmin
+    except ImportError:  # opcional: sin rjsmin el JS propio se copia sin minificar
+        return texto
+    return rjsmin.jsmin(texto) + '\n'
+
+
+def reescribir_urls(texto, nombre, manifiesto):
+    """Cambia las url(...) relativas del CSS por las rutas con huella"""
+    origen = posixpath.dirname(nombre)
+    salida = posixpath.dirname(posixpath.join(DIR_SALIDA, nombre))
+
+    def reemplazar(m):
+        ruta = m.group(2).strip()
+        if ruta.startswith(('data:', 'http:', 'https:', '//', '/', '#')):
+            return m.group(0)
+        corte = min((i for i in (ruta.find('?'), ruta.find('#')) if i >= 0), default=len(ruta))
+        destino = posixpath.normpath(posixpath.join(origen, ruta[:corte]))
+        if destino not in manifiesto:
+            print(f'  Aviso: {nombre} referencia {ruta}, que no existe', file=sys.stderr)
+            return m.group(0)
+        return 'url(%s)' % (posixpath.relpath(manifiesto[destino], salida) + ruta[corte:])
+
+    return URL_CSS.sub(reemplazar, texto)
+
+
+def construir():
+    """Genera dist/ y devuelve el manifiesto"""
+    salida = os.path.join(STATIC, DIR_SALIDA)
+    shutil.rmtree(salida, ignore_errors=True)
+
+    archivos = fuentes()
+    manifiesto = {}
+    # Los CSS al final: sus url(...) apuntan a fuentes e imágenes ya procesadas
+    for nombre in sorted(archivos, key=lambda n: (n.endswith('.css'), n)):
+        with open(archivos[nombre], 'rb') as archivo:
+            contenido = archivo.read()
+        propio = not nombre.startswith(DIR_LIBRERIAS + '/')
+        if nombre.endswith('.css'):
+            texto = reescribir_urls(contenido.decode('utf-8'), nombre, manifiesto)
+            contenido = (minificar_css(texto) if propio else texto).encode('utf-8')
+        elif nombre.endswith('.js') and propio:
+            contenido = minificar_js(contenido.decode('utf-8')).encode('utf-8')
+
+        huella = hashlib.sha256(contenido).hexdigest()[:10]
+        base, extension = posixpath.splitext(nombre)
+        ruta = f'{DIR_SALIDA}/{base}.{huella}{extension}'
+        destino = os.path.join(STATIC, *ruta.split('/'))
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        with open(destino, 'wb') as archivo:
+            archivo.write(contenido)
+        manifiesto[nombre] = ruta
+        print(f'{nombre} -> {ruta} ({os.path.getsize(archivos[nombre])} -> {len(contenido)} bytes)')
+
+    with open(os.path.join(salida, MANIFIESTO), 'w', encoding='utf-8') as archivo:
+        json.dump(manifiesto, archivo, indent=2, sort_keys=True)
+    return manifiesto
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Construye los estáticos con huella en app/static/dist')
+    parser.add_argument('--descargar', action='store_true',
+                        help='Descarga las librerías de terceros que falten en app/static/vendor')
+    parser.add_argument('--forzar', action='store_true', help='Con --descargar, vuelve a bajar todas')
+    args = parser.parse_args()
+
+    if args.descargar:
+        descargar(args.forzar)
+
+    faltan = [nombre for nombre in LIBRERIAS if not os.path.exists(os.path.join(STATIC, *nombre.split('/')))]
+    if faltan:
+        print(f'Aviso: faltan {len(faltan)} librerías en app/static/vendor (se usará el CDN); '
+              'ejecutar con --descargar', file=sys.stderr)
+
+    manifiesto = construir()
+    print(f'{len(manifiesto)} archivos en app/static/{DIR_SALIDA}')
+
+
+if __name__ == '__main__':
+    main()
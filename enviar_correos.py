@@ -0,0 +1,37 @@
+"""
+Enviador de la bandeja de salida de correos como proceso independiente.
+
+Útil con MAIL_OUTBOX_HILO=false (por ejemplo, un servicio aparte de los
+workers web) o para vaciar la cola manualmente:
+
+    python enviar_correos.py            # corre en primer plano
+    python enviar_correos.py --una-vez  # envía lo pendiente y termina
+
+Para probar sin un servidor real, levantar un SMTP local de depuración
+(python -m aiosmtpd -n -l localhost:1025) y usar MAIL_SERVER=localhost,
+MAIL_PORT=1025 y MAIL_USE_TLS=false.
+"""
+import argparse
+import logging
+
+from app import create_app
+from app.correos import bandeja_salida
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Envía los correos de la bandeja de salida')
+    parser.add_argument('--una-vez', action='store_true',
+                        help='Enviar los correos listos y terminar')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    app = create_app()
+    bandeja_salida.ejecutar(app, una_vez=args.una_vez)
+
+    if args.una_vez:
+        with app.app_context():
+            print(bandeja_salida.estadisticas())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""
+Envía los recordatorios de las citas programadas de un día (por defecto, mañana).
+
+Pensado para ejecutarse una vez al día desde cron o el Programador de tareas:
+
+    python enviar_recordatorios.py
+    python enviar_recordatorios.py --fecha 2025-03-15 --conexiones 8 --tasa 20
+    python enviar_recordatorios.py --detalle   # resultado de cada mensaje en JSON
+
+Al terminar muestra el total, los fallidos y el rendimiento (mensajes/s).
+"""
+import argparse
+import json
+import logging
+import sys
+from datetime import date, datetime, timedelta
+
+from app import create_app
+from app.recordatorios import enviar_recordatorios
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Envía recordatorios de citas por correo')
+    parser.add_argument('--fecha', help='Día de las citas (YYYY-MM-DD); por defecto mañana')
+    parser.add_argument('--conexiones', type=int, help='Conexiones SMTP en paralelo')
+    parser.add_argument('--tasa', type=float, help='Máximo de mensajes por segundo (0 = sin tope)')
+    parser.add_argument('--reenviar', action='store_true',
+                        help='Incluir citas que ya recibieron el recordatorio')
+    parser.add_argument('--detalle', action='store_true',
+                        help='Imprimir el resultado de cada mensaje en JSON')
+    args = parser.parse_args()
+
+    if args.fecha:
+        fecha = datetime.strptime(args.fecha, '%Y-%m-%d').date()
+    else:
+        fecha = date.today() + timedelta(days=1)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    app = create_app()
+    with app.app_context():
+        resumen = enviar_recordatorios(fecha, conexiones=args.conexiones,
+                                       por_segundo=args.tasa, reenviar=args.reenviar)
+
+    if args.detalle:
+        print(json.dumps(resumen, indent=2, ensure_ascii=False))
+    else:
+        print(f"Fecha: {resumen['fecha']}")
+        print(f"Recordatorios: {resumen['enviados']}/{resumen['total']} enviados, "
+              f"{resumen['fallidos']} fallidos ({resumen['encolados_para_reintento']} en cola de reintento)")
+        print(f"Tiempo: {resumen['segundos']} s con {resumen['conexiones']} conexiones "
+              f"({resumen['mensajes_por_segundo']} mensajes/s)")
+
+    return 1 if resumen['fallidos'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,386 @@
+"""
+Genera doctores, pacientes y años de citas sintéticos para pruebas de escala.
+
+Las citas siguen distribuciones parecidas a las de un consultorio real:
+
+- solo días laborables (ESTADISTICAS_DIAS_LABORABLES) y turnos de
+  CITAS_DURACION_MINUTOS entre CITAS_HORA_INICIO y CITAS_HORA_FIN, con más
+  demanda a media mañana y menos a la hora del almuerzo;
+- picos estacionales (marzo-mayo y septiembre-noviembre) y valles en
+  diciembre, enero y julio, y más demanda los lunes;
+- doctores con más o menos pacientes y pacientes que vuelven más que otros;
+- las citas pasadas quedan completadas o canceladas según
+  --tasa-cancelacion; las de los próximos --dias-futuro días, programadas.
+
+Carga con INSERT de varias filas por sentencia (--lote), en varios procesos
+(--procesos, uno por mes a la vez), con unique_checks y foreign_key_checks
+desactivados y los índices secundarios y claves foráneas de `citas` y
+`pacientes` quitados durante la carga: se vuelven a crear al final con un
+único ALTER TABLE por tabla, que ordena cada índice una vez en lugar de
+actualizarlo fila por fila. Después reconstruye resumen_citas y
+estadisticas_citas desde las citas cargadas.
+
+La clave unique_fecha_hora permite una sola cita por horario en todo el
+consultorio (ver app/disponibilidad.py), así que respetándola caben a lo
+sumo turnos x días laborables citas (unas 5.000 por año con la
+configuración por defecto). Para probar volúmenes mayores, --sin-unico-por-horario
+deja esa clave sin volver a crear y reparte los turnos entre los doctores
+(unique_doctor_fecha_hora se mantiene). Solo para bases de prueba:
+
+    python generar_datos.py --doctores 20 --pacientes 5000 --anios 3
+    python generar_datos.py --doctores 400 --pacientes 1000000 --anios 5 --sin-unico-por-horario --vaciar
+"""
+import argparse
+import multiprocessing
+import random
+import re
+import sys
+import time
+import unicodedata
+from datetime import date, datetime, timedelta
+
+import MySQLdb
+
+from app.config import Config
+
+NOMBRES = (
+    'Ana', 'Andrés', 'Camila', 'Carlos', 'Carolina', 'Daniel', 'Daniela', 'Diana', 'Diego',
+    'Felipe', 'Fernando', 'Gabriela', 'Isabel', 'Javier', 'Jorge', 'José', 'Juan', 'Julián',
+    'Laura', 'Lucía', 'Luis', 'Manuela', 'María', 'Mariana', 'Martín', 'Natalia', 'Pablo',
+    'Paula', 'Pedro', 'Ricardo', 'Santiago', 'Sara', 'Sebastián', 'Sofía', 'Valentina', 'Valeria',
+)
+APELLIDOS = (
+    'Álvarez', 'Castro', 'Díaz', 'Fernández', 'Gómez', 'González', 'Gutiérrez', 'Hernández',
+    'Jiménez', 'López', 'Martínez', 'Moreno', 'Muñoz', 'Navarro', 'Ortiz', 'Pérez', 'Ramírez',
+    'Restrepo', 'Rodríguez', 'Romero', 'Rojas', 'Ruiz', 'Sánchez', 'Suárez', 'Torres', 'Vargas',
+)
+MOTIVOS = (
+    'Consulta general', 'Control', 'Control de tensión arterial', 'Dolor de cabeza',
+    'Dolor abdominal', 'Chequeo anual', 'Resultados de laboratorio', 'Fiebre', 'Tos persistente',
+    'Renovación de fórmula', 'Dolor de espalda', 'Certificado médico', 'Vacunación',
+)
+
+# Demanda relativa por mes (1 = promedio)
+ESTACIONALIDAD = {1: 0.80, 2: 0.95, 3: 1.10, 4: 1.05, 5: 1.10, 6: 0.95,
+                  7: 0.80, 8: 0.95, 9: 1.10, 10: 1.15, 11: 1.05, 12: 0.70}
+# Demanda relativa por día de la semana (lunes = 0)
+DIA_SEMANA = {0: 1.15, 1: 1.0, 2: 1.0, 3: 0.95, 4: 0.90, 5: 0.70, 6: 0.50}
+
+DEFINICION = re.compile(r'^\s*((?:UNIQUE |FULLTEXT |SPATIAL )?KEY `(\w+)` .*?|CONSTRAINT `(\w+)` FOREIGN KEY .*?),?$')
+
+
+def parametros_db():
+    return {
+        'host': Config.MYSQL_HOST,
+        'user': Config.MYSQL_USER,
+        'passwd': Config.MYSQL_PASSWORD,
+        'db': Config.MYSQL_DB,
+        'port': int(getattr(Config, 'MYSQL_PORT', 3306)),
+        'charset': getattr(Config, 'MYSQL_CHARSET', 'utf8'),
+    }
+
+
+def conectar():
+    """Conexión para la carga: sin comprobar claves únicas ni foráneas fila por fila"""
+    conn = MySQLdb.connect(**parametros_db())
+    cur = conn.cursor()
+    cur.execute('SET unique_checks = 0, foreign_key_checks = 0')
+    cur.close()
+    return conn
+
+
+def turnos():
+    """Horas de inicio de los turnos del día y su demanda relativa"""
+    inicio = datetime.strptime(Config.CITAS_HORA_INICIO, '%H:%M')
+    fin = datetime.strptime(Config.CITAS_HORA_FIN, '%H:%M')
+    paso = timedelta(minutes=Config.CITAS_DURACION_MINUTOS)
+    resultado = []
+    while inicio + paso <= fin:
+        hora = inicio.hour + inicio.minute / 60
+        if hora < 9:
+            demanda = 0.75
+        elif hora < 12:
+            demanda = 1.25   # media mañana
+        elif hora < 14:
+            demanda = 0.6    # almuerzo
+        elif hora < 17:
+            demanda = 1.0
+        else:
+            demanda = 0.8
+        resultado.append((inicio.strftime('%H:%M:00'), timedelta(hours=inicio.hour, minutes=inicio.minute),
+                          demanda))
+        inicio += paso
+    return resultado
+
+
+def sin_tildes(texto):
+    return unicodedata.normalize('NFKD', texto).encode('ascii', 'ignore').decode('ascii')
+
+
+# ---------------------------------------------------------------------------
+# Índices diferidos
+
+def definiciones(cur, tabla):
+    """Índices secundarios y claves foráneas de `tabla` según SHOW CREATE TABLE"""
+    cur.execute(f'SHOW CREATE TABLE {tabla}')
+    indices, foraneas = [], []
+    for linea in cur.fetchone()[1].splitlines():
+        m = DEFINICION.match(linea)
+        if m and m.group(2):
+            indices.append((m.group(2), m.group(1)))
+        elif m:
+            foraneas.append((m.group(3), m.group(1)))
+    return indices, foraneas
+
+
+def quitar_indices(cur, tabla, indices, foraneas):
+    if foraneas:
+        cur.execute(f'ALTER TABLE {tabla} ' + ', '.join(f'DROP FOREIGN KEY `{nombre}`' for nombre, _ in foraneas))
+    if indices:
+        cur.execute(f'ALTER TABLE {tabla} ' + ', '.join(f'DROP INDEX `{nombre}`' for nombre, _ in indices))
+
+
+def crear_indices(cur, tabla, indices, foraneas):
+    """Vuelve a crear los índices (un ALTER; InnoDB admite un FULLTEXT por sentencia) y las claves foráneas"""
+    normales = [definicion for _, definicion in indices if not definicion.startswith('FULLTEXT')]
+    if normales:
+        cur.execute(f'ALTER TABLE {tabla} ' + ', '.join(f'ADD {d}' for d in normales))
+    for _, definicion in indices:
+        if definicion.startswith('FULLTEXT'):
+            cur.execute(f'ALTER TABLE {tabla} ADD {definicion}')
+    if foraneas:
+        # Con foreign_key_checks = 0 no revisa las filas: los ids salen de las tablas cargadas
+        cur.execute(f'ALTER TABLE {tabla} ' + ', '.join(f'ADD {d}' for _, d in foraneas))
+
+
+# ---------------------------------------------------------------------------
+# Doctores y pacientes
+
+def insertar(conn, sql, filas, lote):
+    cur = conn.cursor()
+    for i in range(0, len(filas), lote):
+        cur.executemany(sql, filas[i:i + lote])  # MySQLdb lo envía como un INSERT de varias filas
+        conn.commit()
+    cur.close()
+
+
+def generar_doctores(rnd, primero, cantidad):
+    return [(primero + i, rnd.choice(NOMBRES), f'{rnd.choice(APELLIDOS)} {rnd.choice(APELLIDOS)}',
+             f'3{rnd.randrange(10 ** 9):09d}') for i in range(cantidad)]
+
+
+def generar_pacientes(rnd, primero, cantidad, hoy):
+    filas = []
+    for i in range(cantidad):
+        nombre, apellido = rnd.choice(NOMBRES), rnd.choice(APELLIDOS)
+        email = None
+        if rnd.random() < 0.8:
+            email = sin_tildes(f'{nombre}.{apellido}{primero + i}@example.com').lower()
+        edad = min(int(rnd.triangular(0, 95, 38)), 95)
+        nacimiento = hoy - timedelta(days=edad * 365 + rnd.randrange(365))
+        filas.append((primero + i, nombre, f'{apellido} {rnd.choice(APELLIDOS)}',
+                      f'3{rnd.randrange(10 ** 9):09d}', email, nacimiento))
+    return filas
+
+
+# ---------------------------------------------------------------------------
+# Citas (en procesos hijos, un mes por tarea)
+
+_conn = None
+
+
+def _iniciar_proceso():
+    global _conn
+    _conn = conectar()
+
+
+def generar_mes(tarea):
+    """Genera e inserta las citas de un mes. Devuelve (mes, cantidad por estado)"""
+    (anio, mes, desde, hasta, hoy, doctores, pesos, pacientes, ocupacion,
+     tasa_cancelacion, por_doctor, lote, semilla) = tarea
+    rnd = random.Random(f'{semilla}-{anio}-{mes}')
+    horarios = turnos()
+    motivos = [_conn.literal(m).decode('utf-8') for m in MOTIVOS]
+    primer_paciente, total_pacientes = pacientes
+    acumulados = list(pesos)
+    for i in range(1, len(acumulados)):
+        acumulados[i] += acumulados[i - 1]
+    ahora = datetime.combine(hoy, datetime.min.time()) + timedelta(hours=12)
+
+    conteo = {'programada': 0, 'completada': 0, 'cancelada': 0}
+    valores = []
+    cur = _conn.cursor()
+
+    def enviar():
+        cur.execute('INSERT INTO citas (id_paciente, id_doctor, fecha, hora, motivo, estado, '
+                    'created_at, actualizado_en) VALUES ' + ','.join(valores))
+        _conn.commit()
+        valores.clear()
+
+    dia = max(date(anio, mes, 1), desde)
+    while dia < hasta and dia.month == mes:
+        if dia.weekday() in Config.ESTADISTICAS_DIAS_LABORABLES:
+            factor = ocupacion * ESTACIONALIDAD[mes] * DIA_SEMANA[dia.weekday()]
+            pasada = dia < hoy
+            for hora, desplazamiento, demanda in horarios:
+                if por_doctor:
+                    elegidos = [id_doctor for id_doctor, peso in zip(doctores, pesos)
+                                if rnd.random() < min(factor * demanda * peso, 0.97)]
+                elif rnd.random() < min(factor * demanda, 0.97):
+                    elegidos = rnd.choices(doctores, cum_weights=acumulados)
+                else:
+                    continue
+                for id_doctor in elegidos:
+                    # Unos pocos pacientes concentran muchas citas
+                    id_paciente = primer_paciente + int(total_pacientes * rnd.random() ** 2)
+                    if pasada:
+                        estado = 'cancelada' if rnd.random() < tasa_cancelacion else 'completada'
+                    else:
+                        estado = 'cancelada' if rnd.random() < tasa_cancelacion / 3 else 'programada'
+                    inicio = datetime.combine(dia, datetime.min.time()) + desplazamiento
+                    creada = min(inicio - timedelta(days=rnd.randint(1, 40), minutes=rnd.randrange(600)), ahora)
+                    modificada = creada if estado == 'programada' else min(inicio, ahora)
+                    valores.append(f"({id_paciente},{id_doctor},'{dia}','{hora}',{rnd.choice(motivos)},"
+                                   f"'{estado}','{creada:%Y-%m-%d %H:%M:%S}','{modificada:%Y-%m-%d %H:%M:%S}')")
+                    conteo[estado] += 1
+                    if len(valores) >= lote:
+                        enviar()
+        dia += timedelta(days=1)
+    if valores:
+        enviar()
+    cur.close()
+    return f'{anio}-{mes:02d}', conteo
+
+
+def meses(desde, hasta):
+    anio, mes = desde.year, desde.month
+    while date(anio, mes, 1) < hasta:
+        yield anio, mes
+        anio, mes = (anio + 1, 1) if mes == 12 else (anio, mes + 1)
+
+
+# ---------------------------------------------------------------------------
+
+def reconstruir_resumenes(cur):
+    """resumen_citas y estadisticas_citas desde cero (las mismas consultas de las migraciones 008 y 009)"""
+    cur.execute('DELETE FROM resumen_citas')
+    cur.execute('''
+        INSERT INTO resumen_citas (fecha, id_doctor, estado, total)
+        SELECT fecha, COALESCE(id_doctor, 0), estado, COUNT(*)
+        FROM citas
+        WHERE estado IS NOT NULL
+        GROUP BY fecha, COALESCE(id_doctor, 0), estado
+    ''')
+    cur.execute('DELETE FROM estadisticas_citas')
+    cur.execute('DELETE FROM estadisticas_pendientes')
+    cur.execute('''
+        INSERT INTO estadisticas_citas (id_doctor, fecha, hora, estado, total)
+        SELECT id_doctor, fecha, HOUR(hora), estado, COUNT(*)
+        FROM citas
+        WHERE id_doctor IS NOT NULL AND estado IS NOT NULL
+        GROUP BY id_doctor, fecha, HOUR(hora), estado
+    ''')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Genera datos sintéticos para pruebas de escala')
+    parser.add_argument('--doctores', type=int, default=20)
+    parser.add_argument('--pacientes', type=int, default=5000)
+    parser.add_argument('--anios', type=float, default=2, help='Años de citas hacia atrás desde hoy')
+    parser.add_argument('--dias-futuro', type=int, default=60, help='Días de citas programadas hacia adelante')
+    parser.add_argument('--ocupacion', type=float, default=0.7,
+                        help='Fracción media de turnos ocupados (del consultorio, o de cada doctor '
+                             'con --sin-unico-por-horario)')
+    parser.add_argument('--tasa-cancelacion', type=float, default=0.12)
+    parser.add_argument('--sin-unico-por-horario', action='store_true',
+                        help='Quita unique_fecha_hora para que cada doctor tenga su propia agenda')
+    parser.add_argument('--vaciar', action='store_true',
+                        help='Borra las citas existentes antes de cargar (doctores y pacientes se conservan)')
+    parser.add_argument('--lote', type=int, default=5000, help='Filas por INSERT')
+    parser.add_argument('--procesos', type=int, default=min(multiprocessing.cpu_count(), 8))
+    parser.add_argument('--semilla', type=int, default=1)
+    args = parser.parse_args()
+
+    if args.doctores < 1 or args.pacientes < 1:
+        parser.error('--doctores y --pacientes deben ser al menos 1')
+
+    hoy = date.today()
+    desde = hoy - timedelta(days=round(args.anios * 365.25))
+    hasta = hoy + timedelta(days=args.dias_futuro + 1)
+    rnd = random.Random(args.semilla)
+
+    conn = conectar()
+    cur = conn.cursor()
+    cur.execute('SELECT COUNT(*) FROM citas')
+    existentes = cur.fetchone()[0]
+    if existentes and not args.vaciar:
+        sys.exit(f'La tabla citas ya tiene {existentes} filas; usar --vaciar para reemplazarlas')
+    if existentes:
+        print(f'Borrando {existentes} citas...')
+        cur.execute('TRUNCATE TABLE citas')
+
+    cur.execute('SELECT COALESCE(MAX(id_doctor), 0) + 1 FROM doctores')
+    primer_doctor = cur.fetchone()[0]
+    cur.execute('SELECT COALESCE(MAX(id_paciente), 0) + 1 FROM pacientes')
+    primer_paciente = cur.fetchone()[0]
+
+    indices_citas, foraneas_citas = definiciones(cur, 'citas')
+    indices_pacientes, foraneas_pacientes = definiciones(cur, 'pacientes')
+    if args.sin_unico_por_horario:
+        indices_citas = [i for i in indices_citas if i[0] != 'unique_fecha_hora']
+        print('Aviso: unique_fecha_hora no se volverá a crear; la base deja de servir para producción',
+              file=sys.stderr)
+    inicio = time.perf_counter()
+    quitar_indices(cur, 'citas', *definiciones(cur, 'citas'))  # incluida unique_fecha_hora
+    quitar_indices(cur, 'pacientes', indices_pacientes, foraneas_pacientes)
+    try:
+        doctores = generar_doctores(rnd, primer_doctor, args.doctores)
+        insertar(conn, 'INSERT INTO doctores (id_doctor, nombre, apellido, telefono) VALUES (%s, %s, %s, %s)',
+                 doctores, args.lote)
+        print(f'{len(doctores)} doctores')
+
+        for i in range(0, args.pacientes, 100000):
+            filas = generar_pacientes(rnd, primer_paciente + i, min(100000, args.pacientes - i), hoy)
+            insertar(conn, 'INSERT INTO pacientes (id_paciente, nombre, apellido, telefono, email, '
+                           'fecha_nacimiento) VALUES (%s, %s, %s, %s, %s, %s)', filas, args.lote)
+        print(f'{args.pacientes} pacientes ({time.perf_counter() - inicio:.1f} s)')
+
+        # Popularidad de cada doctor, con media 1
+        pesos = [rnd.lognormvariate(0, 0.35) for _ in doctores]
+        media = sum(pesos) / len(pesos)
+        pesos = [p / media for p in pesos]
+        tareas = [(anio, mes, desde, hasta, hoy, [d[0] for d in doctores], pesos,
+                   (primer_paciente, args.pacientes), args.ocupacion, args.tasa_cancelacion,
+                   args.sin_unico_por_horario, args.lote, args.semilla)
+                  for anio, mes in meses(desde, hasta)]
+
+        total = {'programada': 0, 'completada': 0, 'cancelada': 0}
+        carga = time.perf_counter()
+        with multiprocessing.Pool(max(1, args.procesos), initializer=_iniciar_proceso) as pool:
+            for mes, conteo in pool.imap_unordered(generar_mes, tareas):
+                for estado, cantidad in conteo.items():
+                    total[estado] += cantidad
+                cargadas = sum(total.values())
+                print(f'  {mes}: {sum(conteo.values())} citas '
+                      f'(total {cargadas}, {cargadas / (time.perf_counter() - carga):.0f} por segundo)')
+        print(f'{sum(total.values())} citas cargadas en {time.perf_counter() - carga:.1f} s: '
+              + ', '.join(f'{cantidad} {estado}s' for estado, cantidad in total.items()))
+    finally:
+        print('Creando índices...')
+        creacion = time.perf_counter()
+        crear_indices(cur, 'pacientes', indices_pacientes, foraneas_pacientes)
+        crear_indices(cur, 'citas', indices_citas, foraneas_citas)
+        print(f'Índices creados en {time.perf_counter() - creacion:.1f} s')
+
+    reconstruir_resumenes(cur)
+    conn.commit()
+    for tabla in ('doctores', 'pacientes', 'citas', 'resumen_citas', 'estadisticas_citas'):
+        cur.execute(f'ANALYZE TABLE {tabla}')
+        cur.fetchall()
+    cur.close()
+    conn.close()
+    print(f'Listo en {time.perf_counter() - inicio:.1f} s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,7 @@
+-- Migración 001: clave única por doctor, fecha y hora
+-- Permite reservar con un único INSERT: un horario ocupado se rechaza con
+-- error de clave duplicada (1062) en lugar de consultarse antes de insertar.
+USE consultorio_medico;
+
+ALTER TABLE citas
+    ADD UNIQUE KEY unique_doctor_fecha_hora (id_doctor, fecha, hora);
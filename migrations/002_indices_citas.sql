@@ -0,0 +1,9 @@
+-- Migración 002: índices compuestos para las consultas de citas e histórico
+-- (id_doctor, fecha) ya queda cubierto por el prefijo de unique_doctor_fecha_hora
+-- (migración 001); el histórico del doctor filtra además por estado.
+USE consultorio_medico;
+
+ALTER TABLE citas
+    ADD INDEX idx_citas_doctor_estado_fecha (id_doctor, estado, fecha),
+    ADD INDEX idx_citas_paciente_estado_fecha (id_paciente, estado, fecha),
+    ADD INDEX idx_citas_estado_fecha (estado, fecha);
@@ -0,0 +1,7 @@
+-- Migración 003: índice para la paginación por clave del histórico de pacientes
+-- Permite recorrer (fecha, hora, id_cita) en orden descendente sin ordenar en
+-- memoria; para doctores ya existe unique_doctor_fecha_hora (migración 001).
+USE consultorio_medico;
+
+ALTER TABLE citas
+    ADD INDEX idx_citas_paciente_fecha_hora (id_paciente, fecha, hora);
@@ -0,0 +1,22 @@
+-- Migración 004: bandeja de salida de correos
+-- Las notificaciones se guardan aquí y un proceso en segundo plano las envía
+-- por lotes; 'fallido' es el estado final de los que agotaron sus reintentos.
+USE consultorio_medico;
+
+CREATE TABLE correos_salientes (
+    id_correo INT AUTO_INCREMENT PRIMARY KEY,
+    destinatario VARCHAR(254) NOT NULL,
+    asunto VARCHAR(200) NOT NULL,
+    html MEDIUMTEXT NOT NULL,
+    remitente VARCHAR(254),
+    estado ENUM('pendiente', 'enviado', 'fallido') DEFAULT 'pendiente',
+    intentos INT NOT NULL DEFAULT 0,
+    proximo_intento DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    lote CHAR(32),
+    reservado_hasta DATETIME,
+    ultimo_error TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    enviado_en DATETIME,
+    INDEX idx_correos_estado_proximo (estado, proximo_intento),
+    INDEX idx_correos_lote (lote)
+);
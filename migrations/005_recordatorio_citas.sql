@@ -0,0 +1,7 @@
+-- Migración 005: marca de recordatorio enviado en las citas
+-- Evita que enviar_recordatorios.py repita el recordatorio si se vuelve a ejecutar
+-- para el mismo día.
+USE consultorio_medico;
+
+ALTER TABLE citas
+    ADD COLUMN recordatorio_enviado_en DATETIME NULL;
@@ -0,0 +1,12 @@
+-- Migración 006: índices para el autocompletado de pacientes (/pacientes/api/buscar)
+-- Los B-tree resuelven la búsqueda por prefijo de nombre o apellido ya ordenada;
+-- el FULLTEXT encuentra palabras que no están al inicio (segundo apellido).
+-- En tablas grandes, crear el FULLTEXT puede tardar varios minutos.
+USE consultorio_medico;
+
+ALTER TABLE pacientes
+    ADD INDEX idx_pacientes_apellido_nombre (apellido, nombre),
+    ADD INDEX idx_pacientes_nombre_apellido (nombre, apellido);
+
+ALTER TABLE pacientes
+    ADD FULLTEXT INDEX ft_pacientes_nombre_apellido (nombre, apellido);
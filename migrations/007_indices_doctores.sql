@@ -0,0 +1,8 @@
+-- Migración 007: índices para el listado paginado de doctores
+-- Permiten ordenar y filtrar por prefijo de apellido o nombre recorriendo el
+-- índice por clave (los de pacientes se agregaron en la migración 006).
+USE consultorio_medico;
+
+ALTER TABLE doctores
+    ADD INDEX idx_doctores_apellido_nombre (apellido, nombre),
+    ADD INDEX idx_doctores_nombre_apellido (nombre, apellido);
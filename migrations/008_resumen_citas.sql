@@ -0,0 +1,20 @@
+-- Migración 008: resumen de citas por fecha, doctor y estado
+-- Los contadores del tablero de citas se leen de esta tabla en lugar de
+-- contar las citas del día o del mes. La mantienen Cita.crear/actualizar/eliminar
+-- y reconciliar_resumen.py corrige cualquier diferencia.
+USE consultorio_medico;
+
+CREATE TABLE resumen_citas (
+    fecha DATE NOT NULL,
+    id_doctor INT NOT NULL,
+    estado ENUM('programada', 'completada', 'cancelada') NOT NULL,
+    total INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (fecha, id_doctor, estado)
+);
+
+-- Carga inicial desde las citas existentes
+INSERT INTO resumen_citas (fecha, id_doctor, estado, total)
+SELECT fecha, COALESCE(id_doctor, 0), estado, COUNT(*)
+FROM citas
+WHERE estado IS NOT NULL
+GROUP BY fecha, COALESCE(id_doctor, 0), estado;
@@ -0,0 +1,31 @@
+-- Migración 009: estadísticas de citas por doctor
+-- estadisticas_citas guarda el total de citas por doctor, día, hora y estado;
+-- /historico/estadisticas suma rangos de esta tabla en lugar de agrupar sobre citas.
+-- estadisticas_pendientes marca los días a recalcular y actualizado_en permite
+-- detectar los cambios hechos directamente en la base de datos.
+USE consultorio_medico;
+
+ALTER TABLE citas
+    ADD COLUMN actualizado_en TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    ADD INDEX idx_citas_actualizado_en (actualizado_en);
+
+CREATE TABLE estadisticas_citas (
+    id_doctor INT NOT NULL,
+    fecha DATE NOT NULL,
+    hora TINYINT NOT NULL,
+    estado ENUM('programada', 'completada', 'cancelada') NOT NULL,
+    total INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (id_doctor, fecha, hora, estado),
+    INDEX idx_estadisticas_fecha (fecha)
+);
+
+CREATE TABLE estadisticas_pendientes (
+    fecha DATE PRIMARY KEY
+);
+
+-- Carga inicial desde las citas existentes
+INSERT INTO estadisticas_citas (id_doctor, fecha, hora, estado, total)
+SELECT id_doctor, fecha, HOUR(hora), estado, COUNT(*)
+FROM citas
+WHERE id_doctor IS NOT NULL AND estado IS NOT NULL
+GROUP BY id_doctor, fecha, HOUR(hora), estado;
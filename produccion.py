@@ -31,6 +31,8 @@ def run_with_waitress():
     threads = int(os.environ.get('THREADS', 4))
     
     print(f"Iniciando servidor Waitress en {host}:{port}")
+    print(f"Pool MySQL: hasta {app.config['MYSQL_POOL_MAX_SIZE']} conexiones "
+          f"para {threads} hilos")
     
     # Abrir navegador automáticamente
     threading.Thread(target=open_browser, daemon=True).start()
@@ -56,6 +58,9 @@ def run_with_gunicorn():
     workers = int(os.environ.get('WORKERS', os.cpu_count() * 2 + 1))
     
     print(f"Iniciando servidor Gunicorn en {host}:{port}")
+    # Cada worker mantiene su propio pool de conexiones
+    print(f"Pool MySQL: hasta {workers * app.config['MYSQL_POOL_MAX_SIZE']} conexiones "
+          f"({workers} workers x {app.config['MYSQL_POOL_MAX_SIZE']})")
     
     # Abrir navegador automáticamente
     threading.Thread(target=open_browser, daemon=True).start()
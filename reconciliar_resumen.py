@@ -0,0 +1,52 @@
+"""
+Reconcilia la tabla resumen_citas con las citas.
+
+Recalcula los contadores por fecha, doctor y estado y corrige los que no
+coinciden (por ejemplo, tras modificar citas directamente en la base de
+datos). Cada tramo de días se corrige en su propia transacción. Pensado para
+cron:
+
+    python reconciliar_resumen.py                      # últimos 30 días y próximos 90
+    python reconciliar_resumen.py --desde 2024-01-01 --hasta 2025-12-31
+"""
+import argparse
+import sys
+from datetime import date, datetime, timedelta
+
+from app import create_app, mysql
+from app.resumen_citas import reconciliar, tramos
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Reconcilia resumen_citas con la tabla citas')
+    parser.add_argument('--desde', help='Primer día (YYYY-MM-DD); por defecto hace 30 días')
+    parser.add_argument('--hasta', help='Último día, inclusive (YYYY-MM-DD); por defecto en 90 días')
+    parser.add_argument('--tramo', type=int, default=31, help='Días por transacción')
+    args = parser.parse_args()
+
+    hoy = date.today()
+    desde = datetime.strptime(args.desde, '%Y-%m-%d').date() if args.desde else hoy - timedelta(days=30)
+    hasta = datetime.strptime(args.hasta, '%Y-%m-%d').date() if args.hasta else hoy + timedelta(days=90)
+
+    app = create_app()
+    diferencias = []
+    with app.app_context():
+        for inicio, fin in tramos(desde, hasta + timedelta(days=1), max(1, args.tramo)):
+            cur = mysql.connection.cursor()
+            try:
+                diferencias.extend(reconciliar(cur, inicio, fin))
+                mysql.connection.commit()
+            except Exception:
+                mysql.connection.rollback()
+                raise
+            finally:
+                cur.close()
+
+    for fecha, id_doctor, estado, antes, real in diferencias:
+        print(f"{fecha} doctor {id_doctor} {estado}: {antes} -> {real}")
+    print(f"Rango {desde} a {hasta}: {len(diferencias)} contadores corregidos")
+    return 1 if diferencias else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
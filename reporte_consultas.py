@@ -0,0 +1,99 @@
+"""
+Resume los reportes del detector de consultas (app/detector_consultas.py).
+
+Agrupa por huella las consultas repetidas y lentas de todos los reportes de
+CONSULTAS_REPORTES_DIR y las ordena por la cantidad de ejecuciones de más
+que provocaron (repetidas) o por el tiempo acumulado (lentas), con los
+endpoints donde aparecen y el lugar de llamada más frecuente:
+
+    python reporte_consultas.py
+    python reporte_consultas.py --directorio logs/consultas --limite 10 --pila
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+from collections import Counter
+
+from app.config import Config
+
+
+def cargar(directorio):
+    reportes = []
+    for ruta in sorted(glob.glob(os.path.join(directorio, '*.json'))):
+        try:
+            with open(ruta, encoding='utf-8') as f:
+                reportes.append(json.load(f))
+        except (OSError, ValueError) as e:
+            print(f'Aviso: no se pudo leer {ruta}: {e}', file=sys.stderr)
+    return reportes
+
+
+def agrupar(reportes):
+    """{huella: datos} de las repetidas y de las lentas"""
+    repetidas, lentas = {}, {}
+    for reporte in reportes:
+        for r in reporte['repetidas']:
+            datos = repetidas.setdefault(r['huella'], {
+                'sql': r['sql'], 'peticiones': 0, 'sobrantes': 0, 'total_ms': 0.0,
+                'endpoints': Counter(), 'pilas': Counter()})
+            datos['peticiones'] += 1
+            datos['sobrantes'] += r['veces'] - 1
+            datos['total_ms'] += r['total_ms']
+            datos['endpoints'][reporte['endpoint']] += 1
+            for llamada in r['llamadas']:
+                datos['pilas'][tuple(llamada['pila'])] += llamada['veces']
+        for lenta in reporte['lentas']:
+            datos = lentas.setdefault(lenta['huella'], {
+                'sql': lenta['sql'], 'veces': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+                'endpoints': Counter(), 'pilas': Counter()})
+            datos['veces'] += 1
+            datos['total_ms'] += lenta['ms']
+            datos['max_ms'] = max(datos['max_ms'], lenta['ms'])
+            datos['endpoints'][reporte['endpoint']] += 1
+            datos['pilas'][tuple(lenta['pila'])] += 1
+    return repetidas, lentas
+
+
+def imprimir_pila(datos, completa):
+    pila, veces = datos['pilas'].most_common(1)[0]
+    if not pila:
+        print('    desde: fuera de app/')
+    for i, frame in enumerate(pila if completa else pila[:1]):
+        print(f"    {'desde' if i == 0 else '     '}: {frame}" + (f' ({veces} veces)' if i == 0 else ''))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Resume los reportes de consultas repetidas y lentas')
+    parser.add_argument('--directorio', default=Config.CONSULTAS_REPORTES_DIR)
+    parser.add_argument('--limite', type=int, default=20, help='Huellas a mostrar de cada tipo')
+    parser.add_argument('--pila', action='store_true', help='Muestra la pila completa del lugar de llamada')
+    args = parser.parse_args()
+
+    reportes = cargar(args.directorio)
+    if not reportes:
+        print(f'No hay reportes en {args.directorio}')
+        return
+    repetidas, lentas = agrupar(reportes)
+    print(f'{len(reportes)} peticiones con consultas a revisar\n')
+
+    print(f'Consultas repetidas ({len(repetidas)} formas), por ejecuciones de más:')
+    for clave, datos in sorted(repetidas.items(), key=lambda x: -x[1]['sobrantes'])[:args.limite]:
+        endpoints = ', '.join(f'{e} ({n})' for e, n in datos['endpoints'].most_common(3))
+        print(f"  [{clave}] {datos['sobrantes']} de más en {datos['peticiones']} peticiones, "
+              f"{datos['total_ms']:.1f} ms: {endpoints}")
+        print(f"    {datos['sql'][:160]}")
+        imprimir_pila(datos, args.pila)
+
+    print(f'\nConsultas lentas ({len(lentas)} formas), por tiempo acumulado:')
+    for clave, datos in sorted(lentas.items(), key=lambda x: -x[1]['total_ms'])[:args.limite]:
+        endpoints = ', '.join(f'{e} ({n})' for e, n in datos['endpoints'].most_common(3))
+        print(f"  [{clave}] {datos['veces']} veces, {datos['total_ms']:.1f} ms en total, "
+              f"máximo {datos['max_ms']:.1f} ms: {endpoints}")
+        print(f"    {datos['sql'][:160]}")
+        imprimir_pila(datos, args.pila)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""
+Script para verificar con EXPLAIN que las consultas principales sobre `citas`
+y la búsqueda de pacientes usan índices y no recorren la tabla completa.
+
+No copia el SQL: llama a las mismas funciones que usan las rutas (Cita,
+Paciente, Doctor, consultas de histórico, exportaciones y recordatorios) con
+una conexión que, en vez de ejecutar cada consulta, guarda su EXPLAIN. Si una
+función cambia su SQL, se verifica el SQL nuevo.
+
+Ejecutar contra una base de datos con datos representativos (con tablas casi
+vacías el optimizador puede preferir un recorrido completo aunque exista el
+índice). Termina con código 1 si alguna consulta hace un full scan de citas,
+pacientes o doctores, o si una función no ejecutó ninguna consulta.
+"""
+import sys
+from datetime import date, timedelta
+
+from flask import g
+
+from app import create_app, mysql
+from app.models import Cita, Doctor, Paciente, rango_mes
+from app.paginacion import codificar_cursor as cursor_listado
+from app.recordatorios import citas_para_recordar
+from app.reportes import consultar_historico
+from app.routes.historico import (codificar_cursor as cursor_historico, consultar_historico_fecha,
+                                  consultar_historico_paginado)
+
+# Parámetros de ejemplo: solo importan para el plan, no para el resultado
+HOY = date.today()
+INICIO_MES, FIN_MES = rango_mes(HOY.year, HOY.month)
+
+# Tablas (o sus alias) que no deben recorrerse completas
+TABLAS_VIGILADAS = ('c', 'p', 'd', 'citas', 'pacientes', 'doctores')
+
+# Página siguiente de las APIs de histórico (la lee consultar_historico_paginado)
+QUERY_STRING = {'limit': 50, 'cursor': cursor_historico(HOY, timedelta(hours=10), 1000000)}
+
+# nombre -> función que recibe la conexión y ejecuta las consultas a explicar
+CONSULTAS = {
+    'citas.index (mes)': lambda conn: Cita.obtener_todas(año_mes=(HOY.year, HOY.month)),
+    'citas.index (día)': lambda conn: Cita.obtener_todas(fecha=HOY),
+    'agendamiento': lambda conn: Cita.obtener_programadas(),
+    'histórico doctor': lambda conn: consultar_historico_paginado(conn.cursor(), 'c.id_doctor', 1),
+    'histórico paciente': lambda conn: consultar_historico_paginado(conn.cursor(), 'c.id_paciente', 1),
+    'histórico por fecha': lambda conn: consultar_historico_fecha(conn.cursor(), INICIO_MES, FIN_MES),
+    'exportación doctor': lambda conn: consultar_historico(conn.cursor(), 'doctor', [1]),
+    'exportación paciente': lambda conn: consultar_historico(conn.cursor(), 'paciente', [1]),
+    'exportación fecha': lambda conn: consultar_historico(conn.cursor(), 'fecha', [INICIO_MES, FIN_MES]),
+    'recordatorios': lambda conn: citas_para_recordar(conn.cursor(), HOY),
+    'buscar paciente (cédula)': lambda conn: Paciente.buscar('91'),
+    'buscar paciente (texto)': lambda conn: Paciente.buscar('Pér'),
+    'buscar paciente (2 palabras)': lambda conn: Paciente.buscar('Juan Pér'),
+    'listado doctores (apellido)': lambda conn: Doctor.listar(
+        orden='apellido', filtro='G', cursor=cursor_listado(['G', 'A', 0])),
+}
+
+
+class CursorExplain:
+    """Cursor que en vez de ejecutar cada consulta guarda las filas de su EXPLAIN"""
+
+    description = ()
+    rowcount = 0
+
+    def __init__(self, conn, planes):
+        self._cur = conn.cursor()
+        self._planes = planes
+
+    def execute(self, sql, params=None):
+        self._cur.execute('EXPLAIN ' + sql, params)
+        columnas = [desc[0] for desc in self._cur.description]
+        self._planes.append([dict(zip(columnas, fila)) for fila in self._cur.fetchall()])
+
+    def fetchall(self):
+        return ()
+
+    def fetchone(self):
+        return None
+
+    def close(self):
+        self._cur.close()
+
+
+class ConexionExplain:
+    """Conexión que entrega CursorExplain; `planes` tiene un EXPLAIN por consulta"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.planes = []
+
+    def cursor(self, *args):
+        return CursorExplain(self.conn, self.planes)
+
+
+def main():
+    app = create_app()
+    fallos = []
+
+    with app.test_request_context(query_string=QUERY_STRING):
+        mysql.connection  # toma la conexión del pool para esta verificación
+        for nombre, funcion in CONSULTAS.items():
+            # Las funciones que usan mysql.connection reciben la conexión que explica
+            conexion = g.mysql_db_medida = ConexionExplain(g.mysql_db)
+            funcion(conexion)
+            if not conexion.planes:
+                fallos.append(nombre)
+                print(f"{'SIN SQL':9} {nombre:28} la función no ejecutó ninguna consulta")
+            for plan in conexion.planes:
+                for fila in plan:
+                    if fila.get('table') not in TABLAS_VIGILADAS:
+                        continue
+                    estado = 'OK'
+                    if fila.get('type') == 'ALL':
+                        estado = 'FULL SCAN'
+                        fallos.append(nombre)
+                    print(f"{estado:9} {nombre:28} table={fila.get('table')} type={fila.get('type')} "
+                          f"key={fila.get('key')} rows={fila.get('rows')}")
+
+    if fallos:
+        print(f"\nConsultas sin índice: {', '.join(dict.fromkeys(fallos))}")
+        return 1
+    print("\nTodas las consultas usan índices")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())